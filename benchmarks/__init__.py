@@ -0,0 +1,5 @@
+"""Benchmarks for the dashboard's ingest, preprocessing and page computations.
+
+Run ``python -m benchmarks --help`` from the repository root, and
+``python -m benchmarks.load_test --help`` for the concurrent-session load test.
+"""
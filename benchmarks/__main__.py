@@ -0,0 +1,145 @@
+"""Run the benchmark scenarios and write a JSON report.
+
+Examples::
+
+    python -m benchmarks --keywords 100 --markets 4 --crawls 60 --output bench.json
+    python -m benchmarks --output new.json --baseline bench.json --threshold 1.25
+
+The ``fetch.*`` scenarios load through an in-process Sheets stub server;
+``--latency-ms``, ``--bandwidth-kbps``, ``--error-rate`` and ``--rate-limit``
+shape its responses.
+
+With ``--baseline`` the median of every scenario is compared against the
+earlier report and the exit status is 1 if any scenario got slower than the
+threshold ratio.
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import time
+
+import pandas as pd
+
+from benchmarks.generator import generate_dataset
+from benchmarks.scenarios import SCENARIOS, build_context, load_app
+from benchmarks.sheets_stub import StubConfig, build_tab_titles, build_workbooks, start_stub
+
+def time_scenario(fn, app, ctx, repeat):
+    """Run a scenario ``repeat`` times (after its untimed setup) and summarise its wall times"""
+    if getattr(fn, 'setup', None) is not None:
+        fn.setup(app, ctx)
+
+    timings = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn(app, ctx)
+        timings.append(time.perf_counter() - started)
+
+    return {
+        'runs': repeat,
+        'min_s': min(timings),
+        'median_s': statistics.median(timings),
+        'mean_s': statistics.mean(timings),
+        'result': result,
+    }
+
+def compare_reports(report, baseline, threshold):
+    """Return (scenario, baseline median, new median, ratio) for scenarios slower than threshold"""
+    regressions = []
+    for name, stats in report['scenarios'].items():
+        previous = baseline.get('scenarios', {}).get(name)
+        if not previous or not previous['median_s']:
+            continue
+        ratio = stats['median_s'] / previous['median_s']
+        if ratio > threshold:
+            regressions.append((name, previous['median_s'], stats['median_s'], ratio))
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description=__doc__.splitlines()[0])
+    parser.add_argument('--keywords', type=int, default=50)
+    parser.add_argument('--markets', type=int, default=4)
+    parser.add_argument('--crawls', type=int, default=30)
+    parser.add_argument('--results', type=int, default=10, help='results per crawl')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--scenario', action='append', default=[],
+                        help='only run scenarios starting with this prefix (repeatable)')
+    parser.add_argument('--latency-ms', type=float, default=0, help='stub server latency per request')
+    parser.add_argument('--bandwidth-kbps', type=float, default=0, help='stub server bandwidth cap')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='stub server 500 probability')
+    parser.add_argument('--rate-limit', type=int, default=0, help='stub server requests per second before 429s')
+    parser.add_argument('--output', help='write the JSON report here instead of stdout')
+    parser.add_argument('--baseline', help='earlier JSON report to compare against')
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help='slowdown ratio that counts as a regression (default 1.25)')
+    args = parser.parse_args(argv)
+
+    app = load_app()
+    sizes = {
+        'keywords': args.keywords,
+        'markets': args.markets,
+        'crawls': args.crawls,
+        'results_per_crawl': args.results,
+        'seed': args.seed,
+    }
+    stub_config = StubConfig(latency_ms=args.latency_ms, bandwidth_kbps=args.bandwidth_kbps,
+                             error_rate=args.error_rate, rate_limit=args.rate_limit, seed=args.seed)
+    dataset = generate_dataset(args.keywords, args.markets, args.crawls, args.results, args.seed)
+    ctx = build_context(app, dataset)
+
+    server, base_url = start_stub(build_workbooks(dataset, app.SERP_SHEET_ID, app.LLM_SHEET_ID), stub_config,
+                                  titles=build_tab_titles(dataset, app.SERP_SHEET_ID, app.LLM_SHEET_ID))
+    os.environ['DASHBOARD_SHEETS_BASE_URL'] = base_url
+
+    report = {
+        'generated_at': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'sizes': sizes,
+        'stub': vars(stub_config),
+        'rows': {'serp': len(ctx['serp_raw']), 'llm': len(ctx['llm_raw'])},
+        'scenarios': {},
+    }
+
+    for name, fn in SCENARIOS.items():
+        if args.scenario and not any(name.startswith(prefix) for prefix in args.scenario):
+            continue
+        report['scenarios'][name] = time_scenario(fn, app, ctx, args.repeat)
+        print(f"{name:<40} {report['scenarios'][name]['median_s'] * 1000:10.1f} ms", file=sys.stderr)
+
+    report['stub']['stats'] = dict(server.stub.stats)
+    report['transport'] = {key: value for key, value in app.get_data_source().transport.stats().items() if key != 'recent'}
+    server.shutdown()
+    shutil.rmtree(ctx['mirror_dir'], ignore_errors=True)
+
+    text = json.dumps(report, indent=2, default=str)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get('sizes') != sizes:
+            print("warning: baseline was generated with different sizes", file=sys.stderr)
+
+        regressions = compare_reports(report, baseline, args.threshold)
+        for name, before, after, ratio in regressions:
+            print(f"REGRESSION {name}: {before * 1000:.1f} ms -> {after * 1000:.1f} ms ({ratio:.2f}x)", file=sys.stderr)
+        if regressions:
+            return 1
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,130 @@
+"""Synthetic data shaped like the dashboard's Google Sheets.
+
+Produces the Main config tab, one tab per keyword and market (addressed by
+GID), and the append-only LLM results sheet made of "Start" blocks.
+"""
+
+import datetime
+import random
+
+import pandas as pd
+
+import data_sources
+
+# (location, language) pairs, in the order markets are assigned to keywords
+MARKETS = [
+    ('es', 'es'), ('it', 'it'), ('fr', 'fr'), ('ph', 'en'), ('dz', 'fr'),
+    ('au', 'en'), ('us', 'en'), ('uk', 'en'), ('de', 'de'), ('nl', 'nl'),
+]
+
+FIRST_GID = 100000
+
+RECHARGE_SENTINELS = ['Not Ranking', 'Lost']
+
+def _result_url(rnd, position, recharge_location=None):
+    """A result URL; a few are wrapped in the HTML artifacts the sheets contain"""
+    if recharge_location:
+        url = f"https://www.recharge.com/{recharge_location}/mobile-top-up"
+    else:
+        url = f"https://www.site{rnd.randint(1, 400)}.com/page-{position}"
+
+    if rnd.random() < 0.1:
+        url = f'<div style="background: #fff;" class="res">{url}</div>'
+    return url
+
+def generate_dataset(keywords=50, markets=4, crawls=30, results_per_crawl=10, seed=0,
+                     start=datetime.datetime(2025, 1, 1, 6, 0)):
+    """Generate a dataset with ``keywords * markets`` keyword tabs.
+
+    Returns a dict with the ``main`` config frame, ``tabs`` (GID -> frame),
+    ``titles`` (GID -> tab title, Main is GID 0) and the raw ``llm`` sheet frame. Crawls are 12 hours apart; rows of one crawl
+    are spread over up to ten minutes, as in the real sheets.
+    """
+    rnd = random.Random(seed)
+    markets = max(1, min(markets, len(MARKETS)))
+
+    main_rows = []
+    tabs = {}
+    titles = {0: 'Main'}
+    llm_rows = []
+    gid = FIRST_GID
+
+    for keyword_index in range(keywords):
+        keyword = f"mobile top up {keyword_index}"
+
+        for location, language in MARKETS[:markets]:
+            main_rows.append({
+                'Recharge URL': f"https://www.recharge.com/{location}/mobile-top-up",
+                'Keyword': keyword,
+                'Language': language,
+                'Location': location,
+                'Sheet': f"GID: {gid}",
+            })
+
+            tab_rows = []
+            for crawl in range(crawls):
+                crawl_time = start + datetime.timedelta(hours=12 * crawl, seconds=rnd.randint(0, 600))
+
+                recharge_position = rnd.choice(list(range(1, results_per_crawl + 1)) + RECHARGE_SENTINELS)
+                row = {
+                    'Date/Time': crawl_time.strftime('%Y-%m-%dT%H:%M:%S.000Z'),
+                    'Keyword': keyword,
+                    'Recharge Position': recharge_position,
+                    'Position Change': rnd.choice(['Improved', 'Declined', 'No change', 'New']),
+                    'AI Overview': rnd.choice(['', '#ERROR!', f"AI overview text for {keyword}"]),
+                }
+                for position in range(1, results_per_crawl + 1):
+                    is_recharge = position == recharge_position
+                    row[f'Position {position}'] = _result_url(rnd, position, location if is_recharge else None)
+                tab_rows.append(row)
+
+                # LLM block for the same keyword, market and crawl
+                llm_rows.append({
+                    'Keyword': keyword,
+                    'Time': crawl_time.strftime('%H:%M:%S'),
+                    'Date': crawl_time.strftime('%Y-%m-%d'),
+                    'Country': location,
+                    'Results': 'Start',
+                    'Position': None,
+                })
+                llm_recharge_position = rnd.randint(1, results_per_crawl * 2)
+                for position in range(1, results_per_crawl + 1):
+                    is_recharge = position == llm_recharge_position
+                    llm_rows.append({
+                        'Keyword': None,
+                        'Time': None,
+                        'Date': None,
+                        'Country': None,
+                        'Results': _result_url(rnd, position, location if is_recharge else None),
+                        'Position': position,
+                    })
+
+            tabs[gid] = pd.DataFrame(tab_rows)
+            titles[gid] = f"{keyword}_{language}_{location}"
+            gid += 1
+
+    return {
+        'main': pd.DataFrame(main_rows),
+        'tabs': tabs,
+        'titles': titles,
+        'llm': pd.DataFrame(llm_rows),
+    }
+
+def dataset_to_csv(dataset):
+    """Render every sheet of a dataset as CSV text, as the Sheets export would"""
+    return {
+        'main': dataset['main'].to_csv(index=False),
+        'tabs': {gid: tab.to_csv(index=False) for gid, tab in dataset['tabs'].items()},
+        'llm': dataset['llm'].to_csv(index=False),
+    }
+
+def write_dataset(dataset, directory, serp_sheet_id, llm_sheet_id, export_format='csv'):
+    """Write a dataset as a local mirror (``<directory>/<sheet_id>/<gid>.<format>``) for data_sources"""
+    target = data_sources.create_data_source(f"{export_format}_dir", directory=directory)
+
+    target.write_tab(serp_sheet_id, 0, dataset['main'])
+    for gid, tab in dataset['tabs'].items():
+        target.write_tab(serp_sheet_id, gid, tab)
+    target.write_tab(llm_sheet_id, 0, dataset['llm'])
+
+    return directory
@@ -0,0 +1,362 @@
+"""Load-test the dashboard with concurrent simulated sessions.
+
+Each session is a ``streamlit.testing.v1.AppTest`` of ``streamlit_app.py`` in
+its own thread, all in one process, sharing its caches as the sessions of one
+dashboard instance do. A session opens the app, then keeps switching pages
+through ``main_nav`` and, on the LLM page, changing the country, date range
+and keyword search filters, with a random think time between actions.
+The dashboard reads a generated ``csv_dir`` mirror, so no network is involved.
+
+Examples::
+
+    python -m benchmarks.load_test --sessions 20 --steps 30 --output load.json
+    python -m benchmarks.load_test --sessions 50 --think-ms 0 --max-p95-ms 2000
+
+The report holds p50/p95/p99 rerun latency, overall and per action, and the
+process's resident memory: its growth per session and the peak. A rerun's
+latency includes AppTest's own work of turning the rerun's messages into an
+element tree, so it is an upper bound of the server-side time.
+
+AppTest is not meant to run concurrently, so ``shared_runtime`` patches
+private Streamlit internals. The harness is validated against the Streamlit
+release in ``VALIDATED_STREAMLIT`` and refuses to run on another one unless
+``--allow-untested-streamlit`` is given; it stops with an error if the
+internals it patches are missing or no longer used.
+"""
+
+import argparse
+import contextlib
+import datetime
+import gc
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+import pandas as pd
+
+from benchmarks.generator import generate_dataset, write_dataset
+
+# Streamlit release (major.minor) whose internals shared_runtime was checked against
+VALIDATED_STREAMLIT = '1.66'
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'streamlit_app.py')
+
+# Sheet IDs of the generated mirror, passed to the app through its settings
+SERP_SHEET_ID = 'loadtest-serp'
+LLM_SHEET_ID = 'loadtest-llm'
+
+PAGES = ["🏠 Executive Dashboard", "🎯 Keyword Analysis", "⚖️ SERP Comparison", "🤖 LLM Position Tracking"]
+LLM_PAGE = PAGES[-1]
+SEARCH_TERMS = ['', 'top up', 'mobile top up 1', '2']
+
+def rss_bytes():
+    """Resident set size of this process (peak RSS where /proc is not available)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+class MemorySampler:
+    """Samples RSS on a daemon thread to record its peak"""
+
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.peak = rss_bytes()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='rss-sampler', daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, rss_bytes())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, rss_bytes())
+
+@contextlib.contextmanager
+def shared_runtime():
+    """Let AppTest sessions run concurrently, sharing one runtime as the sessions of a server do.
+
+    Each ``AppTest.run`` installs a mock runtime as the process-wide instance
+    and removes it when it ends, patches the config, and compiles the script
+    into a new ``ScriptCache``. Concurrent runs would remove each other's
+    runtime and compile the script at the same time (which can fail on
+    Python 3.11), so for the duration of the block there is one runtime, one
+    config patch and one compiled script. Yields ``{'runtime': n, 'script_cache': n}``,
+    how often the runs used the shared ones (see ``check_shared_runtime``).
+    """
+    from unittest import mock
+
+    try:
+        from streamlit.components.v2.component_manager import BidiComponentManager
+        from streamlit.runtime import Runtime
+        from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+        from streamlit.runtime.dataframe_source_manager import DataframeSourceManager
+        from streamlit.runtime.media_file_manager import MediaFileManager
+        from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+        from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+        from streamlit.testing.v1 import app_test, local_script_runner
+        from streamlit.testing.v1.util import patch_config_options
+    except ImportError as e:
+        raise SystemExit(f"The load test does not support this Streamlit release: {e}")
+
+    patched = [(Runtime, 'instance'), (Runtime, 'exists'), (app_test, 'ScriptCache'),
+               (local_script_runner, 'ScriptCache')]
+    missing = [f"{getattr(owner, '__name__', owner)}.{name}" for owner, name in patched if not hasattr(owner, name)]
+    if missing:
+        raise SystemExit(f"The load test does not support this Streamlit release: no {', '.join(missing)}")
+
+    uses = {'runtime': 0, 'script_cache': 0}
+
+    def shared(kind, value):
+        def get(*args):
+            uses[kind] += 1
+            return value
+        return get
+
+    runtime = mock.MagicMock(spec=Runtime)
+    runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage('/mock/media'))
+    runtime.dataframe_source_mgr = DataframeSourceManager()
+    runtime.cache_storage_manager = MemoryCacheStorageManager()
+    runtime.bidi_component_registry = BidiComponentManager()
+    runtime.bidi_component_registry.discover_and_register_components(start_file_watching=False)
+    script_cache = ScriptCache()
+
+    with contextlib.ExitStack() as stack:
+        stack.enter_context(mock.patch.object(Runtime, 'instance', classmethod(shared('runtime', runtime))))
+        stack.enter_context(mock.patch.object(Runtime, 'exists', classmethod(lambda cls: True)))
+        stack.enter_context(mock.patch.object(app_test, 'ScriptCache', shared('script_cache', script_cache)))
+        stack.enter_context(mock.patch.object(local_script_runner, 'ScriptCache',
+                                              shared('script_cache', script_cache)))
+        # The runs' own (nested) config patches then all restore an equivalent patch
+        stack.enter_context(patch_config_options({'global.appTest': True}))
+        yield uses
+
+def check_shared_runtime(uses):
+    """Stop if runs bypassed the shared runtime or script cache (the patched internals changed)"""
+    unused = [kind for kind, count in uses.items() if not count]
+    if unused:
+        raise SystemExit(f"The load test does not support this Streamlit release: AppTest runs did not "
+                         f"use the shared {' and '.join(unused)}, so concurrent sessions would interfere")
+
+def new_app_test(timeout):
+    from streamlit.testing.v1 import AppTest
+    return AppTest.from_file(APP_PATH, default_timeout=timeout)
+
+def timed_run(at, action, samples):
+    """Rerun ``at`` and record ``(action, seconds)``; raises on a script exception"""
+    started = time.perf_counter()
+    at.run()
+    samples.append((action, time.perf_counter() - started))
+    if at.exception:
+        raise RuntimeError(f"{action}: {at.exception[0].value}")
+
+def change_llm_filter(at, rng):
+    """Change one LLM page filter at random; returns the action name"""
+    action = rng.choice(['llm_country', 'llm_dates', 'llm_search'])
+    if action == 'llm_country':
+        country = at.selectbox(key='llm_country_filter')
+        country.set_value(rng.choice(country.options))
+    elif action == 'llm_dates':
+        dates = at.date_input(key='llm_date_filter')
+        low, high = dates.min, dates.max
+        days = (high - low).days
+        start = low + datetime.timedelta(days=rng.randint(0, days))
+        dates.set_value((start, start + datetime.timedelta(days=rng.randint(0, (high - start).days))))
+    else:
+        at.text_input(key='llm_keyword_search').input(rng.choice(SEARCH_TERMS))
+    return action
+
+def run_session(index, args, start_gate, sessions, samples, errors):
+    """One simulated viewer: open the app, then ``args.steps`` page switches and filter changes"""
+    rng = random.Random(args.seed * 1000 + index)
+    think = args.think_ms / 1000
+    try:
+        at = new_app_test(args.timeout)
+        sessions[index] = at
+        start_gate.wait()
+        timed_run(at, 'open', samples)
+
+        page = PAGES[0]
+        for _ in range(args.steps):
+            time.sleep(rng.uniform(0, think))
+            if page == LLM_PAGE and rng.random() < args.filter_share:
+                action = change_llm_filter(at, rng)
+            else:
+                page = rng.choice([other for other in PAGES if other != page])
+                at.sidebar.radio(key='main_nav').set_value(page)
+                action = 'page'
+            timed_run(at, action, samples)
+    except Exception as e:
+        errors.append(f"session {index}: {type(e).__name__}: {e}")
+
+def percentile(ordered, q):
+    """Nearest-rank percentile of sorted values"""
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+
+def latency_summary(seconds):
+    ordered = sorted(seconds)
+    return {
+        'count': len(ordered),
+        'p50_ms': percentile(ordered, 0.50) * 1000,
+        'p95_ms': percentile(ordered, 0.95) * 1000,
+        'p99_ms': percentile(ordered, 0.99) * 1000,
+        'max_ms': ordered[-1] * 1000,
+        'mean_ms': statistics.mean(ordered) * 1000,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.load_test', description=__doc__.splitlines()[0])
+    parser.add_argument('--sessions', type=int, default=10, help='concurrent simulated sessions')
+    parser.add_argument('--steps', type=int, default=20, help='actions per session after opening the app')
+    parser.add_argument('--think-ms', type=float, default=500, help='maximum (uniform) pause between actions')
+    parser.add_argument('--filter-share', type=float, default=0.5,
+                        help='on the LLM page, probability that an action changes a filter instead of the page')
+    parser.add_argument('--timeout', type=float, default=120, help='seconds one rerun may take before it fails')
+    parser.add_argument('--keywords', type=int, default=50)
+    parser.add_argument('--markets', type=int, default=4)
+    parser.add_argument('--crawls', type=int, default=30)
+    parser.add_argument('--results', type=int, default=10, help='results per crawl')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write the JSON report here instead of stdout')
+    parser.add_argument('--max-p95-ms', type=float, default=0,
+                        help='exit with status 1 if the overall p95 latency is above this (0 = no limit)')
+    parser.add_argument('--allow-untested-streamlit', action='store_true',
+                        help=f"run on a Streamlit release other than {VALIDATED_STREAMLIT}.x")
+    args = parser.parse_args(argv)
+
+    import streamlit
+
+    release = '.'.join(streamlit.__version__.split('.')[:2])
+    if release != VALIDATED_STREAMLIT and not args.allow_untested_streamlit:
+        parser.error(f"validated with Streamlit {VALIDATED_STREAMLIT}.x, found {streamlit.__version__} "
+                     f"(pip install 'streamlit=={VALIDATED_STREAMLIT}.*', or pass --allow-untested-streamlit)")
+
+    sizes = {
+        'keywords': args.keywords,
+        'markets': args.markets,
+        'crawls': args.crawls,
+        'results_per_crawl': args.results,
+        'seed': args.seed,
+    }
+    dataset = generate_dataset(args.keywords, args.markets, args.crawls, args.results, args.seed)
+    mirror_dir = write_dataset(dataset, tempfile.mkdtemp(prefix='dashboard-load-'), SERP_SHEET_ID, LLM_SHEET_ID)
+    os.environ.update({
+        'DASHBOARD_DATA_SOURCE': 'csv_dir',
+        'DASHBOARD_DATA_DIR': mirror_dir,
+        'DASHBOARD_SERP_SHEET_ID': SERP_SHEET_ID,
+        'DASHBOARD_LLM_SHEET_ID': LLM_SHEET_ID,
+        'DASHBOARD_PERF_LOG': 'false',
+    })
+
+    with shared_runtime() as uses:
+        # One session visits every page first, so the data caches are warm and the
+        # memory baseline holds them; what the sessions add on top is per-session state
+        warmup = new_app_test(args.timeout)
+        warmup_samples = []
+        timed_run(warmup, 'open', warmup_samples)
+        for page in PAGES[1:]:
+            warmup.sidebar.radio(key='main_nav').set_value(page)
+            timed_run(warmup, 'page', warmup_samples)
+        check_shared_runtime(uses)
+        del warmup
+        gc.collect()
+        baseline_rss = rss_bytes()
+
+        sessions = [None] * args.sessions
+        samples = []
+        errors = []
+        start_gate = threading.Barrier(args.sessions)
+        threads = [threading.Thread(target=run_session, args=(index, args, start_gate, sessions, samples, errors),
+                                    name=f"session-{index}")
+                   for index in range(args.sessions)]
+
+        with MemorySampler() as memory:
+            started = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            wall = time.perf_counter() - started
+
+        # The sessions are still referenced here, so their state counts
+        gc.collect()
+        final_rss = rss_bytes()
+        live_sessions = sum(at is not None for at in sessions)
+
+    by_action = {}
+    for action, seconds in samples:
+        by_action.setdefault(action, []).append(seconds)
+
+    report = {
+        'generated_at': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'streamlit': streamlit.__version__,
+        'sizes': sizes,
+        'rows': {'serp': sum(len(tab) for tab in dataset['tabs'].values()), 'llm': len(dataset['llm'])},
+        'load': {
+            'sessions': args.sessions,
+            'steps': args.steps,
+            'think_ms': args.think_ms,
+            'filter_share': args.filter_share,
+        },
+        'wall_s': wall,
+        'reruns': len(samples),
+        'reruns_per_s': len(samples) / wall if wall else None,
+        'errors': errors,
+        'latency': {
+            'all': latency_summary([seconds for _, seconds in samples]) if samples else None,
+            **{action: latency_summary(seconds) for action, seconds in sorted(by_action.items())},
+        },
+        'memory': {
+            'baseline_rss_mb': baseline_rss / 1024 / 1024,
+            'final_rss_mb': final_rss / 1024 / 1024,
+            'peak_rss_mb': memory.peak / 1024 / 1024,
+            'per_session_mb': (final_rss - baseline_rss) / max(live_sessions, 1) / 1024 / 1024,
+        },
+    }
+    shutil.rmtree(mirror_dir, ignore_errors=True)
+
+    print(f"{args.sessions} sessions, {len(samples)} reruns in {wall:.1f} s, {len(errors)} failed sessions",
+          file=sys.stderr)
+    for action, stats in report['latency'].items():
+        if stats:
+            print(f"{action:<12} n={stats['count']:<5} p50 {stats['p50_ms']:8.1f} ms  p95 {stats['p95_ms']:8.1f} ms  "
+                  f"p99 {stats['p99_ms']:8.1f} ms", file=sys.stderr)
+    print(f"memory: {report['memory']['per_session_mb']:.1f} MB per session, "
+          f"peak {report['memory']['peak_rss_mb']:.0f} MB RSS", file=sys.stderr)
+    for error in errors[:5]:
+        print(f"ERROR {error}", file=sys.stderr)
+
+    text = json.dumps(report, indent=2, default=str)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+    p95 = report['latency']['all']['p95_ms'] if samples else math.inf
+    if args.max_p95_ms and p95 > args.max_p95_ms:
+        print(f"p95 latency {p95:.1f} ms is above {args.max_p95_ms:.1f} ms", file=sys.stderr)
+        return 1
+    return 1 if errors else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
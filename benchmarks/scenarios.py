@@ -0,0 +1,245 @@
+"""Timed benchmark scenarios.
+
+Each scenario receives a prepared context (the generated CSV text plus the
+ingested and preprocessed frames) and runs one hot path of the dashboard.
+Preparation is not timed; only the scenario body is. ``fetch.*`` scenarios
+go through the real loaders, against the local Sheets stub server or a local
+CSV/Parquet mirror of the generated data.
+"""
+
+import contextlib
+import copy
+import io
+import os
+import tempfile
+import warnings
+
+import pandas as pd
+
+from benchmarks.generator import dataset_to_csv, write_dataset
+
+SCENARIOS = {}
+
+def scenario(name, setup=None):
+    """Register a benchmark scenario under ``name``; ``setup(app, ctx)`` runs once before it, untimed"""
+    def register(fn):
+        fn.setup = setup
+        SCENARIOS[name] = fn
+        return fn
+    return register
+
+def load_app():
+    """Import streamlit_app without a Streamlit runtime, silencing bare-mode warnings"""
+    os.environ.setdefault('STREAMLIT_LOGGER_LEVEL', 'error')
+    warnings.filterwarnings('ignore', category=UserWarning)
+
+    import streamlit_app
+    from streamlit import logger as st_logger
+    st_logger.set_log_level('error')
+    return streamlit_app
+
+@contextlib.contextmanager
+def using_settings(**settings):
+    """Temporarily override dashboard settings through their DASHBOARD_* variables"""
+    previous = {key: os.environ.get(f"DASHBOARD_{key.upper()}") for key in settings}
+    os.environ.update({f"DASHBOARD_{key.upper()}": str(value) for key, value in settings.items()})
+    try:
+        yield
+    finally:
+        for key, value in previous.items():
+            if value is None:
+                os.environ.pop(f"DASHBOARD_{key.upper()}", None)
+            else:
+                os.environ[f"DASHBOARD_{key.upper()}"] = value
+
+def ingest_serp(app, csv):
+    """Parse the Main tab and every keyword tab into the combined history frame"""
+    keywords_info = app.parse_main_sheet(app.data_sources.read_csv_text(io.StringIO(csv['main'])))
+
+    frames = [app.data_sources.read_csv_text(io.StringIO(csv['tabs'][keyword_info['gid']]))
+              for keyword_info in keywords_info]
+    return app.combine_keyword_tabs(frames, keywords_info)
+
+def ingest_llm(app, csv):
+    """Parse the LLM results sheet"""
+    return app.parse_llm_sheet(app.data_sources.read_csv_text(io.StringIO(csv['llm'])))
+
+def build_context(app, dataset):
+    """Prepare the inputs every scenario starts from"""
+    csv = dataset_to_csv(dataset)
+    serp_raw = ingest_serp(app, csv)
+    llm_raw = ingest_llm(app, csv)
+
+    mirror_dir = tempfile.mkdtemp(prefix='dashboard-bench-')
+    for export_format in ('csv', 'parquet'):
+        write_dataset(dataset, os.path.join(mirror_dir, export_format), app.SERP_SHEET_ID, app.LLM_SHEET_ID, export_format)
+
+    # LLM sheet log holding everything but the last ~5% of rows, for tail refreshes
+    llm_rows = app.data_sources.read_csv_text(io.StringIO(csv['llm']))
+    llm_tail_start = len(llm_rows) - max(1, len(llm_rows) // 20)
+    llm_log = app.IncrementalSheetLog(app.parse_llm_rows)
+    llm_log.refresh(lambda: llm_rows.iloc[:llm_tail_start], None)
+
+    serp, serp_latest = app.preprocess_serp_data.__wrapped__(serp_raw)
+    llm, llm_latest = app.preprocess_llm_data.__wrapped__(llm_raw)
+
+    # Shared snapshot of the processed datasets, for snapshot.open
+    snapshot_store = app.snapshots.SnapshotStore(os.path.join(mirror_dir, 'snapshots'))
+    snapshot_store.publish(dict(zip(app.SNAPSHOT_DATASETS, (serp, serp_latest, llm, llm_latest))))
+
+    # Shared result cache holding the LLM keyword summary, for page.llm.keyword_summary_cached
+    results = app.result_cache.ResultCache(os.path.join(mirror_dir, 'results.sqlite'))
+    llm_keywords = llm['Keyword'].dropna().unique()
+    results.get_or_compute(snapshot_store.current(), 'llm_keyword_summary', (),
+                           lambda: app.build_llm_keyword_summary(llm, llm_keywords))
+
+    return {
+        'dataset': dataset,
+        'csv': csv,
+        'mirror_dir': mirror_dir,
+        'serp_raw': serp_raw,
+        'llm_raw': llm_raw,
+        'llm_rows': llm_rows,
+        'llm_log': llm_log,
+        'serp': serp,
+        'serp_latest': serp_latest,
+        'llm': llm,
+        'llm_latest': llm_latest,
+        'llm_keywords': llm_keywords,
+        'snapshot_store': snapshot_store,
+        'result_cache': results,
+    }
+
+@scenario('ingest.serp_tabs')
+def bench_ingest_serp(app, ctx):
+    return len(ingest_serp(app, ctx['csv']))
+
+@scenario('ingest.llm_sheet')
+def bench_ingest_llm(app, ctx):
+    return len(ingest_llm(app, ctx['csv']))
+
+def cold_fetch(app, loader, **settings):
+    """Run a loader with an empty fetch scheduler and no fetch budget limit, so every tab is read"""
+    app.create_fetch_scheduler.clear()
+    app.get_llm_sheet_log.clear()
+    with using_settings(fetch_rate_per_minute=0, **settings):
+        return len(loader.__wrapped__())
+
+@scenario('ingest.llm_tail')
+def bench_ingest_llm_tail(app, ctx):
+    log = copy.copy(ctx['llm_log'])
+    rows = ctx['llm_rows']
+    return len(log.refresh(lambda: rows, lambda start, columns: rows.iloc[start:].reset_index(drop=True)))
+
+@scenario('fetch.serp_sheets')
+def bench_fetch_serp(app, ctx):
+    return cold_fetch(app, app.load_data_from_google_sheets, data_source='sheets_csv', fetch_mode='tabs')
+
+@scenario('fetch.serp_sheets_xlsx')
+def bench_fetch_serp_xlsx(app, ctx):
+    return cold_fetch(app, app.load_data_from_google_sheets, data_source='sheets_csv', fetch_mode='workbook')
+
+@scenario('fetch.llm_sheet')
+def bench_fetch_llm(app, ctx):
+    return cold_fetch(app, app.load_llm_data, data_source='sheets_csv')
+
+@scenario('fetch.llm_sheet_tail')
+def bench_fetch_llm_tail(app, ctx):
+    # Steady-state refresh: only the (empty) tail is fetched after the first run
+    with using_settings(data_source='sheets_csv', fetch_rate_per_minute=0):
+        return len(app.load_llm_data.__wrapped__())
+
+@scenario('fetch.serp_csv_dir')
+def bench_fetch_serp_csv_dir(app, ctx):
+    return cold_fetch(app, app.load_data_from_google_sheets, data_source='csv_dir',
+                      data_dir=os.path.join(ctx['mirror_dir'], 'csv'))
+
+@scenario('fetch.serp_parquet_dir')
+def bench_fetch_serp_parquet_dir(app, ctx):
+    return cold_fetch(app, app.load_data_from_google_sheets, data_source='parquet_dir',
+                      data_dir=os.path.join(ctx['mirror_dir'], 'parquet'))
+
+def register_parse_pool_scenarios(worker_counts=(1, 2, 4)):
+    """fetch.serp_csv_dir with the tabs parsed by 1, 2 and 4 worker processes (the pool is
+    started before timing), to show how parsing scales across cores"""
+    for workers in worker_counts:
+        def start_pool(app, ctx, workers=workers):
+            app.get_parse_pool(workers).start()
+
+        def bench(app, ctx, workers=workers):
+            return cold_fetch(app, app.load_data_from_google_sheets, data_source='csv_dir',
+                              data_dir=os.path.join(ctx['mirror_dir'], 'csv'), parse_workers=workers)
+        scenario(f'fetch.serp_csv_dir_pool{workers}', setup=start_pool)(bench)
+
+register_parse_pool_scenarios()
+
+@scenario('snapshot.publish')
+def bench_snapshot_publish(app, ctx):
+    store = app.snapshots.SnapshotStore(tempfile.mkdtemp(prefix='dashboard-bench-snapshot-'))
+    store.publish({name: ctx[name] for name in app.SNAPSHOT_DATASETS})
+    return sum(len(ctx[name]) for name in app.SNAPSHOT_DATASETS)
+
+@scenario('snapshot.open')
+def bench_snapshot_open(app, ctx):
+    # What a new dashboard process does instead of fetching and preprocessing
+    store = ctx['snapshot_store']
+    return sum(len(df) for df in store.open(store.current()).values())
+
+@scenario('preprocess.parse_excel_datetime')
+def bench_parse_excel_datetime(app, ctx):
+    return len(ctx['serp_raw']['Date/Time'].apply(app.parse_excel_datetime))
+
+@scenario('preprocess.clean_html_from_url')
+def bench_clean_html_from_url(app, ctx):
+    return len(ctx['llm']['Result_URL'].apply(app.clean_html_from_url))
+
+@scenario('preprocess.serp')
+def bench_preprocess_serp(app, ctx):
+    serp, _ = app.preprocess_serp_data.__wrapped__(ctx['serp_raw'])
+    return len(serp)
+
+@scenario('preprocess.llm')
+def bench_preprocess_llm(app, ctx):
+    llm, _ = app.preprocess_llm_data.__wrapped__(ctx['llm_raw'])
+    return len(llm)
+
+@scenario('page.executive.summary')
+def bench_executive_summary(app, ctx):
+    return app.build_executive_summary(ctx['serp_latest'])['total_keywords']
+
+@scenario('page.keyword_analysis.history')
+def bench_keyword_history(app, ctx):
+    serp = ctx['serp']
+    keyword = sorted(serp['Keyword'].dropna().unique())[0]
+    keyword_data = serp[serp['Keyword'] == keyword].sort_values('DateTime')
+    return len(app.build_position_history(keyword_data))
+
+@scenario('page.serp_comparison.movements')
+def bench_serp_movements(app, ctx):
+    serp = ctx['serp']
+    keyword = sorted(serp['Keyword'].dropna().unique())[0]
+    keyword_data = serp[serp['Keyword'] == keyword].sort_values('DateTime')
+    run_rows = keyword_data.groupby('Run_ID').tail(1).set_index('Run_ID')
+    serp1 = app.extract_serp_results(run_rows.iloc[0])
+    serp2 = app.extract_serp_results(run_rows.iloc[-1])
+    return len(app.compute_serp_movements(serp1, serp2))
+
+@scenario('page.llm.filters')
+def bench_llm_filters(app, ctx):
+    llm = ctx['llm']
+    return len(app.apply_llm_filters(llm, 'All', llm['DateTime'].min(), llm['DateTime'].max(), 'top up'))
+
+@scenario('page.llm.keyword_summary')
+def bench_llm_keyword_summary(app, ctx):
+    return len(app.build_llm_keyword_summary(ctx['llm'], ctx['llm_keywords']))
+
+@scenario('page.llm.keyword_summary_cached')
+def bench_llm_keyword_summary_cached(app, ctx):
+    # What another session or process gets once one has computed the view
+    summary = ctx['result_cache'].get_or_compute(ctx['snapshot_store'].current(), 'llm_keyword_summary', (),
+                                                 lambda: app.build_llm_keyword_summary(ctx['llm'], ctx['llm_keywords']))
+    return len(summary)
+
+@scenario('page.llm.position_matrix')
+def bench_llm_position_matrix(app, ctx):
+    return len(app.build_position_matrix(ctx['llm_latest'], ctx['llm_keywords']))
@@ -0,0 +1,276 @@
+"""Local stand-in for the Google Sheets CSV export endpoint.
+
+Serves ``/spreadsheets/d/<sheet_id>/export?format=csv&gid=<gid>`` from
+generated tab CSVs (``&range=A2:F`` selects rows, ``?format=xlsx`` without a
+gid returns the whole workbook),
+with configurable latency, bandwidth, error rate and 429 throttling (bodies
+are gzipped when the client sends ``Accept-Encoding: gzip``), so the loaders can be exercised and timed without a network.
+Point the dashboard at it with the ``sheets_base_url`` setting::
+
+    python -m benchmarks.sheets_stub --port 8765 --latency-ms 150 --rate-limit 10
+    DASHBOARD_SHEETS_BASE_URL=http://127.0.0.1:8765 streamlit run streamlit_app.py
+
+``GET /_stats`` returns request counters as JSON.
+"""
+
+import argparse
+import csv
+import gzip
+import io
+import json
+import random
+import re
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from benchmarks.generator import dataset_to_csv, generate_dataset
+
+class StubConfig:
+    """Network behaviour of the stub server"""
+
+    def __init__(self, latency_ms=0, jitter_ms=0, bandwidth_kbps=0, error_rate=0.0,
+                 rate_limit=0, throttle_rate=0.0, seed=0):
+        self.latency_ms = latency_ms          # fixed delay before the response
+        self.jitter_ms = jitter_ms            # extra uniform random delay
+        self.bandwidth_kbps = bandwidth_kbps  # body throughput cap, 0 = unlimited
+        self.error_rate = error_rate          # probability of a 500 response
+        self.rate_limit = rate_limit          # requests per second before 429s, 0 = unlimited
+        self.throttle_rate = throttle_rate    # probability of a 429 regardless of rate
+        self.seed = seed
+
+def _sheet_value(text):
+    """Store numeric CSV cells as numbers, as Sheets does"""
+    for cast in (int, float):
+        try:
+            return cast(text)
+        except ValueError:
+            pass
+    return text
+
+def _column_number(letters):
+    number = 0
+    for letter in letters:
+        number = number * 26 + ord(letter) - ord('A') + 1
+    return number
+
+def slice_range(text, a1_range):
+    """Cut an A1 range such as ``A120:F`` (open-ended rows allowed) out of CSV text"""
+    match = re.fullmatch(r'([A-Z]+)(\d+):([A-Z]+)(\d*)', a1_range)
+    if not match:
+        raise ValueError(a1_range)
+    first_col, first_row = _column_number(match.group(1)), int(match.group(2))
+    last_col = _column_number(match.group(3))
+    last_row = int(match.group(4)) if match.group(4) else None
+
+    rows = list(csv.reader(io.StringIO(text)))[first_row - 1:last_row]
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator='\n').writerows(row[first_col - 1:last_col] for row in rows)
+    return buffer.getvalue()
+
+def build_xlsx(tabs, titles):
+    """Render ``{gid: csv_text}`` as one XLSX workbook with the given tab titles"""
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    for gid, text in tabs.items():
+        worksheet = workbook.create_sheet(titles.get(gid, f"GID {gid}"))
+        for row in csv.reader(io.StringIO(text)):
+            worksheet.append([_sheet_value(value) if value else None for value in row])
+
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+class SheetsStub:
+    """In-memory workbooks ({sheet_id: {gid: csv_text}}) plus the stub's behaviour and counters"""
+
+    def __init__(self, workbooks, config=None, titles=None):
+        self.workbooks = workbooks
+        self.config = config or StubConfig()
+        # Whole-workbook XLSX exports, built up front so they are not timed
+        titles = titles or {}
+        self.xlsx = {sheet_id: build_xlsx(tabs, titles.get(sheet_id, {})) for sheet_id, tabs in workbooks.items()}
+        self._lock = threading.Lock()
+        self._random = random.Random(self.config.seed)
+        self._window_start = time.monotonic()
+        self._window_count = 0
+        self.stats = {'connections': 0, 'requests': 0, 'served': 0, 'throttled': 0, 'errors': 0,
+                      'not_found': 0, 'bytes': 0}
+
+    def count(self, key, amount=1):
+        with self._lock:
+            self.stats[key] += amount
+
+    def decide(self):
+        """Return the status code for the next request and its delay in seconds"""
+        config = self.config
+        with self._lock:
+            self.stats['requests'] += 1
+            now = time.monotonic()
+            if now - self._window_start >= 1.0:
+                self._window_start = now
+                self._window_count = 0
+            self._window_count += 1
+
+            delay = (config.latency_ms + self._random.uniform(0, config.jitter_ms)) / 1000
+            if config.rate_limit and self._window_count > config.rate_limit:
+                return 429, delay
+            if config.throttle_rate and self._random.random() < config.throttle_rate:
+                return 429, delay
+            if config.error_rate and self._random.random() < config.error_rate:
+                return 500, delay
+            return 200, delay
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    stub = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        # Headers and body are separate writes; without this, keep-alive
+        # connections stall on Nagle's algorithm plus delayed ACKs
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.stub.count('connections')
+
+    def _send(self, status, body, content_type='text/plain; charset=utf-8', headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self._write_body(body)
+
+    def _write_body(self, body):
+        bandwidth = self.stub.config.bandwidth_kbps * 1024
+        if not bandwidth:
+            self.wfile.write(body)
+            return
+
+        chunk_size = max(1024, int(bandwidth / 20))
+        for start in range(0, len(body), chunk_size):
+            chunk = body[start:start + chunk_size]
+            self.wfile.write(chunk)
+            time.sleep(len(chunk) / bandwidth)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == '/_stats':
+            self._send(200, json.dumps(self.stub.stats).encode(), 'application/json')
+            return
+
+        parts = url.path.strip('/').split('/')
+        query = parse_qs(url.query)
+        if len(parts) != 4 or parts[0] != 'spreadsheets' or parts[1] != 'd' or parts[3] != 'export':
+            self.stub.count('not_found')
+            self._send(404, b'not found')
+            return
+
+        status, delay = self.stub.decide()
+        time.sleep(delay)
+
+        if status == 429:
+            self.stub.count('throttled')
+            self._send(429, b'Too Many Requests', headers={'Retry-After': '1'})
+            return
+        if status == 500:
+            self.stub.count('errors')
+            self._send(500, b'Internal Server Error')
+            return
+
+        try:
+            if query.get('format', ['csv'])[0] == 'xlsx' and 'gid' not in query:
+                body = self.stub.xlsx[parts[2]]
+                content_type = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+            else:
+                gid = int(query.get('gid', ['0'])[0])
+                text = self.stub.workbooks[parts[2]][gid]
+                if 'range' in query:
+                    text = slice_range(text, query['range'][0])
+                body = text.encode('utf-8')
+                content_type = 'text/csv; charset=utf-8'
+        except (KeyError, ValueError):
+            self.stub.count('not_found')
+            self._send(404, b'not found')
+            return
+
+        headers = {}
+        if 'gzip' in self.headers.get('Accept-Encoding', ''):
+            body = gzip.compress(body, compresslevel=6)
+            headers['Content-Encoding'] = 'gzip'
+
+        self.stub.count('served')
+        self.stub.count('bytes', len(body))
+        self._send(200, body, content_type, headers)
+
+def build_workbooks(dataset, serp_sheet_id, llm_sheet_id):
+    """Lay a generated dataset out as the two spreadsheets the dashboard reads"""
+    csv = dataset_to_csv(dataset)
+    serp_workbook = {0: csv['main']}
+    serp_workbook.update(csv['tabs'])
+    return {
+        serp_sheet_id: serp_workbook,
+        llm_sheet_id: {0: csv['llm']},
+    }
+
+def build_tab_titles(dataset, serp_sheet_id, llm_sheet_id):
+    """Tab titles of the two spreadsheets, for the XLSX export"""
+    return {
+        serp_sheet_id: dataset['titles'],
+        llm_sheet_id: {0: 'LLM'},
+    }
+
+def start_stub(workbooks, config=None, host='127.0.0.1', port=0, titles=None):
+    """Start the stub on a background thread; returns (server, base_url)"""
+    handler = type('StubHandler', (_StubHandler,), {'stub': SheetsStub(workbooks, config, titles)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.stub = handler.stub
+
+    thread = threading.Thread(target=server.serve_forever, name='sheets-stub', daemon=True)
+    thread.start()
+
+    return server, f"http://{host}:{server.server_address[1]}"
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.sheets_stub', description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--keywords', type=int, default=50)
+    parser.add_argument('--markets', type=int, default=4)
+    parser.add_argument('--crawls', type=int, default=30)
+    parser.add_argument('--results', type=int, default=10, help='results per crawl')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--latency-ms', type=float, default=0)
+    parser.add_argument('--jitter-ms', type=float, default=0)
+    parser.add_argument('--bandwidth-kbps', type=float, default=0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--rate-limit', type=int, default=0, help='requests per second before 429s')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='probability of a random 429')
+    args = parser.parse_args(argv)
+
+    from benchmarks.scenarios import load_app
+    app = load_app()
+
+    dataset = generate_dataset(args.keywords, args.markets, args.crawls, args.results, args.seed)
+    config = StubConfig(args.latency_ms, args.jitter_ms, args.bandwidth_kbps, args.error_rate,
+                        args.rate_limit, args.throttle_rate, args.seed)
+    server, base_url = start_stub(build_workbooks(dataset, app.SERP_SHEET_ID, app.LLM_SHEET_ID),
+                                  config, args.host, args.port,
+                                  build_tab_titles(dataset, app.SERP_SHEET_ID, app.LLM_SHEET_ID))
+
+    print(f"Serving {len(dataset['tabs'])} keyword tabs at {base_url}")
+    print(f"Run the dashboard with DASHBOARD_SHEETS_BASE_URL={base_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,580 @@
+"""Data sources the dashboard can read its sheets from.
+
+Every source reads one tab of a spreadsheet (``sheet_id`` + ``gid``) into a
+DataFrame of Arrow-backed text columns (blank cells are NaN), parsed by the
+multithreaded pyarrow CSV reader; a ``SheetSchema`` then declares which
+columns hold numbers and status sentinels:
+
+- ``sheets_csv``: the public CSV export endpoint (default); ``read_workbook``
+  downloads every tab at once through the XLSX export
+- ``gspread``: the Sheets API with the service account from secrets.toml
+- ``csv_dir``: a local mirror laid out as ``<dir>/<sheet_id>/<gid>.csv``
+- ``parquet_dir``: a local mirror laid out as ``<dir>/<sheet_id>/<gid>.parquet``
+
+HTTP downloads go through a shared ``HttpTransport`` (pooled keep-alive
+connections, gzip, timeouts, per-request timing stats).
+
+A source with a ``parse_pool`` (see parse_pool.py) parses the tabs of a
+``read_tabs`` batch in worker processes.
+
+A local mirror is filled from Sheets with::
+
+    python data_sources.py mirror --format parquet --dest data
+"""
+
+import argparse
+import collections
+import contextlib
+import csv
+import datetime
+import functools
+import io
+import os
+import threading
+import time
+
+import pandas as pd
+
+SHEETS_BASE_URL = "https://docs.google.com"
+
+DATA_SOURCE_KINDS = ['sheets_csv', 'gspread', 'csv_dir', 'parquet_dir']
+
+# Arrow-backed strings with NaN for missing values (the pandas 3 ``str`` dtype)
+try:
+    TEXT_DTYPE = pd.StringDtype('pyarrow', na_value=float('nan'))
+except TypeError:  # pandas < 2.3
+    TEXT_DTYPE = pd.StringDtype('pyarrow_numpy')
+
+# Widest tab read_csv_text types as text (the Sheets column limit is 18,278)
+MAX_COLUMNS = 1024
+
+def unique_columns(columns):
+    """Header names made unique the way the default CSV parser does ("Unnamed: 3", "Position.1")"""
+    names = []
+    seen = set()
+    for index, column in enumerate(columns):
+        name = column if column else f"Unnamed: {index}"
+        base, suffix = name, 0
+        while name in seen:
+            suffix += 1
+            name = f"{base}.{suffix}"
+        seen.add(name)
+        names.append(name)
+    return names
+
+@functools.lru_cache(maxsize=None)
+def text_convert_options():
+    """pyarrow CSV options typing every (autogenerated) column as a nullable string"""
+    import pyarrow as pa
+    from pyarrow import csv as pa_csv
+
+    return pa_csv.ConvertOptions(
+        column_types={f"f{index}": pa.string() for index in range(MAX_COLUMNS)},
+        strings_can_be_null=True
+    )
+
+def read_csv_table(source, names=None):
+    """Parse CSV into a pyarrow Table of nullable string columns (multithreaded).
+
+    The header row is read as data, so every column is declared a string up front
+    instead of being inferred and cast back; with ``names`` there is no header row.
+    """
+    import pyarrow as pa
+    from pyarrow import csv as pa_csv
+
+    if isinstance(source, io.TextIOBase):
+        source = io.BytesIO(source.read().encode('utf-8'))
+    # Quoted cells can span lines (AI Overview text, snippets); without
+    # newlines_in_values a block boundary inside one breaks the parse
+    table = pa_csv.read_csv(source, read_options=pa_csv.ReadOptions(autogenerate_column_names=True),
+                            parse_options=pa_csv.ParseOptions(newlines_in_values=True),
+                            convert_options=text_convert_options())
+
+    if names is None:
+        header = [column[0].as_py() if len(column) else None for column in table.columns]
+        return table.slice(1).rename_columns(unique_columns(header))
+
+    names = list(names)
+    table = table.select(range(min(len(names), table.num_columns))).rename_columns(names[:table.num_columns])
+    for name in names[table.num_columns:]:
+        table = table.append_column(name, pa.nulls(table.num_rows, pa.string()))
+    return table
+
+def read_parquet_table(path):
+    """Read a Parquet tab as a pyarrow Table with every column as a nullable string"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    table = pq.read_table(path)
+    return table.cast(pa.schema([(name, pa.string()) for name in table.column_names]))
+
+def read_payload_table(payload):
+    """Parse a ``DataSource.tab_payload`` (``(format, bytes or path)``) into an Arrow text table"""
+    kind, content = payload
+    if kind == 'csv':
+        return read_csv_table(content if isinstance(content, str) else io.BytesIO(content))
+    if kind == 'parquet':
+        return read_parquet_table(content if isinstance(content, str) else io.BytesIO(content))
+    raise ValueError(f"Unknown tab payload format '{kind}'")
+
+def table_to_frame(table):
+    """Convert an Arrow text table to a DataFrame of TEXT_DTYPE columns"""
+    import pyarrow as pa
+
+    return table.to_pandas(types_mapper={pa.string(): TEXT_DTYPE}.get)
+
+def read_csv_text(source, names=None):
+    """Parse CSV into Arrow-backed text columns with the multithreaded pyarrow reader"""
+    return table_to_frame(read_csv_table(source, names))
+
+class SheetSchema:
+    """Declared column types of a sheet, applied to the text frames the sources return.
+
+    ``numbers`` columns become float64 (blank or non-numeric cells are NaN).
+    ``statuses`` maps a column to ``(status column, {sentinel: status})``: the
+    column becomes float64 with its sentinels ("Not Ranking", "Lost") as NaN,
+    and the status column a categorical of ``Ranking``, the sentinel statuses
+    and ``Unknown`` (blank or unrecognised cells).
+    """
+
+    RANKED = 'Ranking'
+    UNKNOWN = 'Unknown'
+
+    def __init__(self, numbers=(), statuses=None):
+        self.numbers = tuple(numbers)
+        self.statuses = statuses or {}
+
+    def apply(self, df):
+        """Return ``df`` with the declared columns converted; absent columns are skipped"""
+        columns = {}
+        for column in self.numbers:
+            if column in df.columns:
+                columns[column] = pd.to_numeric(df[column], errors='coerce').astype('float64')
+
+        for column, (status_column, sentinels) in self.statuses.items():
+            if column not in df.columns:
+                continue
+            text = df[column].astype(TEXT_DTYPE).str.strip()
+            numbers = pd.to_numeric(text, errors='coerce').astype('float64')
+            statuses = text.str.casefold().map({sentinel.casefold(): status for sentinel, status in sentinels.items()})
+            statuses = statuses.where(numbers.isna(), self.RANKED).fillna(self.UNKNOWN)
+            categories = list(dict.fromkeys([self.RANKED, *sentinels.values(), self.UNKNOWN]))
+            columns[column] = numbers
+            columns[status_column] = pd.Categorical(statuses, categories=categories)
+
+        return df.assign(**columns) if columns else df
+
+def frame_from_values(values):
+    """Turn a list of rows (header first) into a DataFrame typed like the CSV export"""
+    # The Sheets API drops trailing empty cells, so pad rows to a common width
+    width = max((len(row) for row in values), default=0)
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(list(row) + [''] * (width - len(row)) for row in values)
+    return read_csv_text(io.BytesIO(buffer.getvalue().encode('utf-8')))
+
+def cell_text(value):
+    """Render an XLSX cell value the way the CSV export writes it"""
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'TRUE' if value else 'FALSE'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    if isinstance(value, datetime.datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    return str(value)
+
+def read_xlsx_workbook(content):
+    """Parse XLSX bytes into ``{tab title: DataFrame}`` in tab order.
+
+    Sheets are streamed row by row (openpyxl read-only mode) and typed like
+    the CSV export, so the result matches what ``read_tab`` returns per tab.
+    """
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(io.BytesIO(content), read_only=True, data_only=True)
+    try:
+        frames = {}
+        for worksheet in workbook.worksheets:
+            rows = [[cell_text(value) for value in row] for row in worksheet.iter_rows(values_only=True)]
+
+            # Read-only mode reports the sheet's dimensions, which can include
+            # formatted but empty rows and columns the CSV export leaves out
+            while rows and not any(rows[-1]):
+                rows.pop()
+            width = max((i + 1 for row in rows for i, value in enumerate(row) if value), default=0)
+            rows = [row[:width] for row in rows]
+
+            frames[worksheet.title] = frame_from_values(rows) if rows else pd.DataFrame()
+        return frames
+    finally:
+        workbook.close()
+
+def column_letter(number):
+    """A1 column letter for a 1-based column number (1 -> A, 27 -> AA)"""
+    letters = ''
+    while number:
+        number, remainder = divmod(number - 1, 26)
+        letters = chr(ord('A') + remainder) + letters
+    return letters
+
+def tail_range(start, columns):
+    """A1 range of the data rows from 0-based ``start`` on (row 1 is the header)"""
+    return f"A{start + 2}:{column_letter(len(columns))}"
+
+class HttpTransport:
+    """Pooled HTTP session shared by every sheet download.
+
+    Connections are kept alive across tabs, responses are requested gzipped and
+    parsed straight from the (decompressed) response stream, and each request's
+    timing is recorded for ``stats()``.
+    """
+
+    def __init__(self, connect_timeout=10, read_timeout=60, pool_size=10, history=200):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers['Accept-Encoding'] = 'gzip'
+        self.timeout = (connect_timeout, read_timeout)
+
+        self._lock = threading.Lock()
+        self.totals = {'requests': 0, 'errors': 0, 'bytes': 0, 'seconds': 0.0}
+        self.recent = collections.deque(maxlen=history)
+
+    @contextlib.contextmanager
+    def open(self, url):
+        """GET ``url`` and yield the decoded body as a file-like stream"""
+        started = time.perf_counter()
+        record = {'url': url, 'status': None, 'ttfb_s': None, 'bytes': 0, 'error': None}
+        try:
+            response = self.session.get(url, stream=True, timeout=self.timeout)
+            record['status'] = response.status_code
+            record['ttfb_s'] = response.elapsed.total_seconds()
+            try:
+                response.raise_for_status()
+                response.raw.decode_content = True
+                yield response.raw
+            finally:
+                # Bytes on the wire, i.e. before gzip decoding
+                record['bytes'] = response.raw.tell()
+                response.close()
+        except Exception as e:
+            record['error'] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            record['seconds'] = time.perf_counter() - started
+            self._record(record)
+
+    def _record(self, record):
+        with self._lock:
+            self.totals['requests'] += 1
+            self.totals['errors'] += record['error'] is not None
+            self.totals['bytes'] += record['bytes']
+            self.totals['seconds'] += record['seconds']
+            self.recent.append(record)
+
+    def stats(self):
+        """Request totals plus the most recent requests (newest last)"""
+        with self._lock:
+            return {**self.totals, 'recent': list(self.recent)}
+
+class DataSource:
+    """Reads spreadsheet tabs; subclasses implement ``read_tab``"""
+
+    name = None
+    # Quota identity for rate limiting (None = not rate limited) and tabs read per request
+    credential_key = None
+    tabs_per_request = 1
+    # ParsePool (parse_pool.py) that read_tabs hands tab payloads to, if any
+    parse_pool = None
+
+    def read_tab(self, sheet_id, gid):
+        raise NotImplementedError
+
+    def read_workbook(self, sheet_id):
+        """Read every tab in one request as ``{tab title: DataFrame}``, where supported"""
+        raise NotImplementedError(f"The {self.name} data source cannot read a whole workbook")
+
+    def read_tab_rows(self, sheet_id, gid, start, columns):
+        """Read the data rows of a tab from 0-based row ``start`` on, as a frame with ``columns``.
+
+        Sources that can fetch a row range only transfer the tail; this
+        fallback reads the whole tab and slices it.
+        """
+        return self.read_tab(sheet_id, gid).iloc[start:].reset_index(drop=True)
+
+    def tab_payload(self, sheet_id, gid):
+        """Unparsed tab as ``(format, bytes or path)`` for a parse pool, or None to parse in ``read_tab``"""
+        return None
+
+    def read_tabs(self, sheet_id, gids):
+        """Read several tabs; failed tabs map to the exception that was raised.
+
+        With a ``parse_pool`` attached, tabs are parsed in its worker processes.
+        """
+        tabs = {}
+        payloads = {}
+        pooled = self.parse_pool is not None and len(gids) > 1
+        for gid in gids:
+            try:
+                payload = self.tab_payload(sheet_id, gid) if pooled else None
+                if payload is None:
+                    tabs[gid] = self.read_tab(sheet_id, gid)
+                else:
+                    payloads[gid] = payload
+            except Exception as e:
+                tabs[gid] = e
+
+        if payloads:
+            for gid, table in self.parse_pool.read_tables(payloads).items():
+                tabs[gid] = table if isinstance(table, Exception) else table_to_frame(table)
+        return {gid: tabs[gid] for gid in gids}
+
+class SheetsCsvSource(DataSource):
+    """Google Sheets CSV export, one HTTP request per tab"""
+
+    name = 'sheets_csv'
+    credential_key = 'anonymous'
+
+    def __init__(self, base_url=SHEETS_BASE_URL, transport=None):
+        self.base_url = base_url.rstrip('/')
+        self.transport = transport or HttpTransport()
+
+    def export_url(self, sheet_id, gid=None, export_format='csv'):
+        url = f"{self.base_url}/spreadsheets/d/{sheet_id}/export?format={export_format}"
+        return url if gid is None else f"{url}&gid={gid}"
+
+    def read_tab(self, sheet_id, gid):
+        with self.transport.open(self.export_url(sheet_id, gid)) as body:
+            return read_csv_text(body)
+
+    def tab_payload(self, sheet_id, gid):
+        with self.transport.open(self.export_url(sheet_id, gid)) as body:
+            return 'csv', body.read()
+
+    def read_tab_rows(self, sheet_id, gid, start, columns):
+        # The export's range parameter returns just those rows, without the header
+        url = f"{self.export_url(sheet_id, gid)}&range={tail_range(start, columns)}"
+        with self.transport.open(url) as body:
+            content = body.read()
+        if not content.strip():
+            return pd.DataFrame(columns=columns)
+        return read_csv_text(io.BytesIO(content), names=columns)
+
+    def read_workbook(self, sheet_id):
+        # Without a gid the XLSX export contains every tab of the spreadsheet
+        with self.transport.open(self.export_url(sheet_id, export_format='xlsx')) as body:
+            content = body.read()
+        return read_xlsx_workbook(content)
+
+class GspreadSource(DataSource):
+    """Google Sheets API through gspread, authenticated with a service account.
+
+    ``read_tabs`` reads many tabs per ``values_batch_get`` call (``batch_size``
+    ranges each) over the client's single authorized session, so a full
+    refresh takes a handful of round trips instead of one per tab.
+    """
+
+    name = 'gspread'
+
+    def __init__(self, credentials_info, batch_size=50, timeout=None):
+        import gspread
+
+        # gspread keeps its own pooled, authorized requests session
+        self.client = gspread.service_account_from_dict(credentials_info)
+        if timeout:
+            self.client.set_timeout(timeout)
+        self.batch_size = batch_size
+        self.tabs_per_request = batch_size
+        self.credential_key = credentials_info.get('client_email', 'service_account')
+        self._spreadsheets = {}
+
+    def spreadsheet(self, sheet_id):
+        if sheet_id not in self._spreadsheets:
+            self._spreadsheets[sheet_id] = self.client.open_by_key(sheet_id)
+        return self._spreadsheets[sheet_id]
+
+    def tab_titles(self, sheet_id):
+        """Map each gid of the spreadsheet to its tab title (one metadata request)"""
+        return {worksheet.id: worksheet.title for worksheet in self.spreadsheet(sheet_id).worksheets()}
+
+    def read_tab(self, sheet_id, gid):
+        worksheet = self.spreadsheet(sheet_id).get_worksheet_by_id(gid)
+        return frame_from_values(worksheet.get_all_values())
+
+    def read_tab_rows(self, sheet_id, gid, start, columns):
+        worksheet = self.spreadsheet(sheet_id).get_worksheet_by_id(gid)
+        rows = worksheet.get_values(tail_range(start, columns))
+        return frame_from_values([list(columns)] + rows) if rows else pd.DataFrame(columns=columns)
+
+    def read_tabs(self, sheet_id, gids):
+        from gspread.utils import absolute_range_name
+
+        tabs = {}
+        try:
+            titles = self.tab_titles(sheet_id)
+        except Exception as e:
+            return {gid: e for gid in gids}
+
+        ranges = []
+        for gid in gids:
+            if int(gid) in titles:
+                ranges.append((gid, absolute_range_name(titles[int(gid)])))
+            else:
+                tabs[gid] = KeyError(f"No tab with gid {gid} in spreadsheet {sheet_id}")
+
+        spreadsheet = self.spreadsheet(sheet_id)
+        for start in range(0, len(ranges), self.batch_size):
+            chunk = ranges[start:start + self.batch_size]
+            try:
+                response = spreadsheet.values_batch_get([range_name for _, range_name in chunk])
+            except Exception as e:
+                tabs.update({gid: e for gid, _ in chunk})
+                continue
+
+            # valueRanges come back in request order
+            for (gid, _), value_range in zip(chunk, response.get('valueRanges', [])):
+                try:
+                    tabs[gid] = frame_from_values(value_range.get('values', []))
+                except Exception as e:
+                    tabs[gid] = e
+        return tabs
+
+class LocalDirectorySource(DataSource):
+    """Local mirror with one file per tab under ``<directory>/<sheet_id>/``"""
+
+    extension = None
+    tabs_per_request = None
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def tab_path(self, sheet_id, gid):
+        return os.path.join(self.directory, str(sheet_id), f"{gid}.{self.extension}")
+
+    def read_tab(self, sheet_id, gid):
+        return self.read_file(self.tab_path(sheet_id, gid))
+
+    def tab_payload(self, sheet_id, gid):
+        # Workers read the file themselves
+        return self.extension, self.tab_path(sheet_id, gid)
+
+    def write_tab(self, sheet_id, gid, df):
+        """Write a tab atomically so readers never see a partial file"""
+        path = self.tab_path(sheet_id, gid)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        self.write_file(tmp_path, df)
+        os.replace(tmp_path, path)
+        return path
+
+    def read_file(self, path):
+        raise NotImplementedError
+
+    def write_file(self, path, df):
+        raise NotImplementedError
+
+class CsvDirectorySource(LocalDirectorySource):
+    name = 'csv_dir'
+    extension = 'csv'
+
+    def read_file(self, path):
+        return read_csv_text(path)
+
+    def write_file(self, path, df):
+        df.to_csv(path, index=False)
+
+class ParquetDirectorySource(LocalDirectorySource):
+    name = 'parquet_dir'
+    extension = 'parquet'
+
+    def read_file(self, path):
+        return table_to_frame(read_parquet_table(path))
+
+    def write_file(self, path, df):
+        # Stored as text like the other sources, so mixed columns (positions
+        # plus "Not Ranking") keep one Parquet type
+        df = df.copy()
+        for column in df.columns:
+            df[column] = df[column].map(lambda value: value if pd.isna(value) else str(value)).astype(TEXT_DTYPE)
+        df.to_parquet(path, index=False)
+
+def create_data_source(kind, base_url=SHEETS_BASE_URL, directory='data', credentials_info=None,
+                       batch_size=50, transport=None, parse_pool=None):
+    """Build the data source named by ``kind`` (one of DATA_SOURCE_KINDS)"""
+    if kind == 'sheets_csv':
+        source = SheetsCsvSource(base_url, transport)
+    elif kind == 'gspread':
+        if not credentials_info:
+            raise ValueError("The gspread data source needs [gcp_service_account] credentials in secrets.toml")
+        source = GspreadSource(credentials_info, batch_size, transport.timeout if transport else None)
+    elif kind == 'csv_dir':
+        source = CsvDirectorySource(directory)
+    elif kind == 'parquet_dir':
+        source = ParquetDirectorySource(directory)
+    else:
+        raise ValueError(f"Unknown data source '{kind}', expected one of: {', '.join(DATA_SOURCE_KINDS)}")
+    source.parse_pool = parse_pool
+    return source
+
+def mirror_tabs(source, target, tabs):
+    """Copy ``{sheet_id: [gids]}`` from ``source`` into a local directory source.
+
+    Returns the number of tabs written and a list of (sheet_id, gid, error)
+    for tabs that could not be read.
+    """
+    written = 0
+    failures = []
+    for sheet_id, gids in tabs.items():
+        for gid, df in source.read_tabs(sheet_id, gids).items():
+            if isinstance(df, Exception):
+                failures.append((sheet_id, gid, df))
+                continue
+            target.write_tab(sheet_id, gid, df)
+            written += 1
+    return written, failures
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mirror the dashboard's Google Sheets into a local directory")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    mirror = subparsers.add_parser('mirror', help='copy the Main, keyword and LLM tabs')
+    mirror.add_argument('--source', default='sheets_csv', choices=['sheets_csv', 'gspread'])
+    mirror.add_argument('--format', default='parquet', choices=['csv', 'parquet'])
+    mirror.add_argument('--dest', default='data')
+    mirror.add_argument('--base-url', default=SHEETS_BASE_URL)
+    mirror.add_argument('--credentials', help='service account JSON file (gspread source)')
+    args = parser.parse_args(argv)
+
+    import json
+
+    # The sheet IDs and Main tab layout are owned by the app
+    os.environ.setdefault('STREAMLIT_LOGGER_LEVEL', 'error')
+    import streamlit_app as app
+
+    credentials_info = None
+    if args.credentials:
+        with open(args.credentials, encoding='utf-8') as f:
+            credentials_info = json.load(f)
+
+    source = create_data_source(args.source, base_url=args.base_url, credentials_info=credentials_info)
+    target = create_data_source(f"{args.format}_dir", directory=args.dest)
+
+    serp_sheet_id = app.get_setting('serp_sheet_id', app.SERP_SHEET_ID)
+    llm_sheet_id = app.get_setting('llm_sheet_id', app.LLM_SHEET_ID)
+    keyword_gids = [info['gid'] for info in app.parse_main_sheet(source.read_tab(serp_sheet_id, 0))]
+
+    written, failures = mirror_tabs(source, target, {
+        serp_sheet_id: [0] + keyword_gids,
+        llm_sheet_id: [0],
+    })
+    print(f"Mirrored {written} tabs into {args.dest}")
+    for sheet_id, gid, error in failures:
+        print(f"  failed {sheet_id} gid={gid}: {error}")
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,402 @@
+"""Quota-aware scheduling of sheet tab fetches.
+
+Google throttles the export endpoint and the Sheets API per spreadsheet and
+credential. ``FetchScheduler`` keeps a token bucket for each (sheet, credential)
+pair, refreshes keyword tabs spread across a refresh interval instead of all
+at once and fetches high-priority and recently changed tabs first.
+
+Tabs are served stale-while-revalidate: the last good version of every tab is
+kept and served (with its age) while due tabs are refetched on a background
+thread, and a tab whose fetch fails or whose content fails validation keeps
+its last good version instead of disappearing. ``stale_tabs`` lists the tabs
+that are behind and why, for the dashboard to show.
+"""
+
+import threading
+import time
+
+import pandas as pd
+
+# Tabs whose content changed within this many refresh intervals count as "recently changed"
+RECENT_CHANGE_INTERVALS = 2
+
+class TokenBucket:
+    """Token bucket: ``rate`` tokens per second up to ``capacity``; rate 0 means unlimited"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, wait=0.0):
+        """Take one token, waiting up to ``wait`` seconds for one; returns False if none came"""
+        if not self.rate:
+            return True
+
+        deadline = time.monotonic() + wait
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self.blocked_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                ready_at = max(self.blocked_until, now + (1 - self.tokens) / self.rate)
+
+            if ready_at > deadline:
+                return False
+            # ready_at can already have passed since the lock was released
+            time.sleep(max(0.0, ready_at - time.monotonic()))
+
+    def throttle(self, retry_after):
+        """Back off after a 429: no tokens until ``retry_after`` seconds from now"""
+        with self._lock:
+            self.tokens = 0.0
+            self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+
+class TabState:
+    """Last good version of one tab, when it is next due and why its last refresh failed"""
+
+    def __init__(self, frame, fetched_at, content_hash):
+        self.frame = frame
+        self.fetched_at = fetched_at
+        self.content_hash = content_hash
+        self.changed_at = None  # last time a refetch came back with different content
+        self.next_due = fetched_at
+        self.problem = None     # why the last refresh did not replace the frame
+
+    def recently_changed(self, now, interval):
+        return self.changed_at is not None and now - self.changed_at < RECENT_CHANGE_INTERVALS * interval
+
+class FetchReport:
+    """What happened to each tab during one refresh (gids, in fetch order)"""
+
+    def __init__(self):
+        self.fetched = []
+        self.cached = []        # not due yet, last version served
+        self.revalidating = []  # due, last version served while a background refresh runs
+        self.deferred = []      # due, but no budget left
+        self.throttled = []     # got a 429; retried on a later refresh
+        self.failed = {}        # gid -> error message
+        self.served = set()     # gids with a version to show
+        self.seconds = {}       # gid -> time to fetch and parse it (a batch's time is split evenly)
+
+    def summary(self):
+        return {
+            'fetched': len(self.fetched),
+            'cached': len(self.cached),
+            'revalidating': len(self.revalidating),
+            'deferred': len(self.deferred),
+            'throttled': len(self.throttled),
+            'failed': len(self.failed),
+        }
+
+def content_hash(df):
+    """Cheap fingerprint of a tab's content, to notice which tabs changed"""
+    # categorize=False hashes values directly; factorizing first costs more than
+    # it saves on small tabs of mostly distinct strings
+    return int(pd.util.hash_pandas_object(df, index=False, categorize=False).sum()) if not df.empty else 0
+
+def retry_after_seconds(error, default=5.0):
+    """Seconds to wait if ``error`` is a 429 response, else None"""
+    response = getattr(error, 'response', None)
+    if getattr(response, 'status_code', None) != 429:
+        return None
+    try:
+        return float(response.headers.get('Retry-After', default))
+    except (TypeError, ValueError):
+        return default
+
+class FetchScheduler:
+    """Token-bucket budgets per (sheet, credential) and per-tab refresh planning.
+
+    ``rate_per_minute``/``burst`` size each bucket, ``refresh_interval`` is how
+    old a tab may get before it is due again and ``max_wait`` bounds how long a
+    refresh waits for budget to load tabs that have never been fetched.
+    """
+
+    def __init__(self, rate_per_minute=240, burst=120, refresh_interval=300, max_wait=30):
+        self.rate = rate_per_minute / 60
+        self.burst = burst
+        self.refresh_interval = refresh_interval
+        self.max_wait = max_wait
+        self._buckets = {}
+        self._tabs = {}
+        self._missing = {}      # sheet_id -> {gid: why it has no version yet}
+        self._refreshing = set()
+        self._results = {}      # (sheet_id, name) -> [last good result, fetched_at, problem]
+        self._lock = threading.Lock()
+        self.versions = {}      # sheet_id -> counter bumped whenever a served tab changes
+        self.plans = {}         # sheet_id -> arguments of the last refresh_tabs call
+        self.reports = {}
+        # Called as on_report(sheet_id, report) after every fetch pass, including background ones
+        self.on_report = None
+
+    def bucket(self, source, sheet_id):
+        """Token bucket for a sheet and the source's credential; None if the source is not rate limited"""
+        if source.credential_key is None:
+            return None
+        key = (sheet_id, source.credential_key)
+        with self._lock:
+            if key not in self._buckets:
+                self._buckets[key] = TokenBucket(self.rate, self.burst)
+            return self._buckets[key]
+
+    def call(self, source, sheet_id, fetch):
+        """Run one request within the sheet's budget, waiting out a 429 once"""
+        bucket = self.bucket(source, sheet_id)
+        for attempt in range(2):
+            if bucket is not None and not bucket.acquire(self.max_wait):
+                raise TimeoutError(f"No fetch budget left for sheet {sheet_id} within {self.max_wait}s")
+            try:
+                return fetch()
+            except Exception as e:
+                retry_after = retry_after_seconds(e)
+                if retry_after is None or bucket is None or attempt:
+                    raise
+                bucket.throttle(retry_after)
+
+    def call_or_last(self, source, sheet_id, name, fetch):
+        """Like ``call``, but if it fails serve the last good result stored under ``name``"""
+        try:
+            result = self.call(source, sheet_id, fetch)
+        except Exception as e:
+            last = self.record_failure(sheet_id, name, e)
+            if last is None:
+                raise
+            return last
+
+        self.record_success(sheet_id, name, result)
+        return result
+
+    def record_success(self, sheet_id, name, result=None):
+        """Remember a good result of a single fetch (for loaders that keep their own state)"""
+        with self._lock:
+            self._results[(sheet_id, name)] = [result, time.monotonic(), None]
+
+    def record_failure(self, sheet_id, name, error):
+        """Mark a single fetch stale after ``error``; returns its last good result, if any"""
+        with self._lock:
+            entry = self._results.get((sheet_id, name))
+            if entry is None:
+                return None
+            entry[2] = f"failed: {type(error).__name__}: {error}"
+            return entry[0]
+
+    def stale_results(self):
+        """Single fetches served from their last good result: (sheet_id, name, age in seconds, reason)"""
+        now = time.monotonic()
+        with self._lock:
+            return [(sheet_id, name, now - fetched_at, problem)
+                    for (sheet_id, name), (_, fetched_at, problem) in self._results.items() if problem]
+
+    def store(self, sheet_id, gid, frame, now=None, spread=0.0, priority=False):
+        """Record a freshly fetched tab and schedule its next refresh"""
+        now = time.monotonic() if now is None else now
+        fingerprint = content_hash(frame)
+        with self._lock:
+            states = self._tabs.setdefault(sheet_id, {})
+            self._missing.get(sheet_id, {}).pop(gid, None)
+            state = states.get(gid)
+            if state is None:
+                state = states[gid] = TabState(frame, now, fingerprint)
+                self.versions[sheet_id] = self.versions.get(sheet_id, 0) + 1
+            else:
+                if fingerprint != state.content_hash:
+                    state.changed_at = now
+                    self.versions[sheet_id] = self.versions.get(sheet_id, 0) + 1
+                state.frame, state.fetched_at, state.content_hash = frame, now, fingerprint
+            state.problem = None
+
+            # High-priority and recently changed tabs are refreshed twice as often
+            interval = self.refresh_interval
+            if priority or state.recently_changed(now, interval):
+                interval /= 2
+            state.next_due = now + interval * (spread or 1.0)
+
+    def mark_problem(self, sheet_id, gid, problem, retry_in=None):
+        """Record why a tab was not refreshed; a tab with a version keeps serving it"""
+        with self._lock:
+            state = self._tabs.get(sheet_id, {}).get(gid)
+            if state is None:
+                self._missing.setdefault(sheet_id, {})[gid] = problem
+                return
+            state.problem = problem
+            if retry_in is not None:
+                state.next_due = time.monotonic() + retry_in
+
+    def cached_tabs(self, sheet_id):
+        with self._lock:
+            return dict(self._tabs.get(sheet_id, {}))
+
+    def _accept(self, sheet_id, gid, frame, validate, report, spread=0.0, priority=False):
+        """Store a fetched tab unless ``validate`` finds a problem with it; records the outcome in ``report``"""
+        problem = validate(gid, frame) if validate else None
+        if problem:
+            report.failed[gid] = problem
+            self.mark_problem(sheet_id, gid, f"invalid: {problem}", self.refresh_interval / 10)
+            return
+        self.store(sheet_id, gid, frame, spread=spread, priority=priority)
+        report.fetched.append(gid)
+
+    def _fetch(self, source, sheet_id, due, priority_gids, validate, report, cold_start):
+        """Fetch ``due`` tabs in order within the bucket; results go into the tab states"""
+        bucket = self.bucket(source, sheet_id)
+        per_request = source.tabs_per_request or len(due) or 1
+        deadline = time.monotonic() + self.max_wait
+        # Failed tabs are retried sooner than a regular refresh
+        retry_in = self.refresh_interval / 10
+
+        # 1-based place of each tab in this pass (report.fetched also holds prefetched tabs)
+        position = {gid: index for index, gid in enumerate(due, 1)}
+
+        for start in range(0, len(due), per_request):
+            chunk = due[start:start + per_request]
+            if bucket is not None:
+                # Only wait for budget when a tab has nothing to serve yet
+                states = self.cached_tabs(sheet_id)
+                wait = max(0.0, deadline - time.monotonic()) if any(gid not in states for gid in chunk) else 0.0
+                if not bucket.acquire(wait):
+                    report.deferred.extend(chunk)
+                    for gid in chunk:
+                        self.mark_problem(sheet_id, gid, 'deferred (fetch budget)')
+                    continue
+
+            started = time.perf_counter()
+            results = source.read_tabs(sheet_id, chunk)
+            elapsed = (time.perf_counter() - started) / len(chunk)
+            for gid, result in results.items():
+                report.seconds[gid] = elapsed
+                if isinstance(result, Exception):
+                    retry_after = retry_after_seconds(result)
+                    if retry_after is not None:
+                        if bucket is not None:
+                            bucket.throttle(retry_after)
+                        report.throttled.append(gid)
+                        self.mark_problem(sheet_id, gid, 'throttled (429)', retry_after)
+                    else:
+                        report.failed[gid] = f"{type(result).__name__}: {result}"
+                        self.mark_problem(sheet_id, gid, f"failed: {report.failed[gid]}", retry_in)
+                    continue
+
+                # On a cold start, spread the next refreshes evenly over one interval
+                spread = position[gid] / len(due) if cold_start else 0.0
+                self._accept(sheet_id, gid, result, validate, report, spread, gid in priority_gids)
+
+        if self.on_report is not None:
+            self.on_report(sheet_id, report)
+
+    def _revalidate_in_background(self, source, sheet_id, due, priority_gids, validate):
+        """Refetch tabs that already have a version on a daemon thread (one per sheet at a time)"""
+        with self._lock:
+            if sheet_id in self._refreshing:
+                return
+            self._refreshing.add(sheet_id)
+
+        def run():
+            try:
+                self._fetch(source, sheet_id, due, priority_gids, validate, FetchReport(), False)
+            finally:
+                with self._lock:
+                    self._refreshing.discard(sheet_id)
+
+        threading.Thread(target=run, name=f"revalidate-{sheet_id[:8]}", daemon=True).start()
+
+    def _by_urgency(self, due, states, priority_gids, now):
+        """Never fetched first, then high priority, recently changed, most overdue"""
+        def urgency(gid):
+            state = states.get(gid)
+            if state is None:
+                return (0, gid not in priority_gids, 0, 0)
+            return (1, gid not in priority_gids, not state.recently_changed(now, self.refresh_interval), state.next_due)
+        return sorted(due, key=urgency)
+
+    def refresh_tabs(self, source, sheet_id, gids, priority_gids=(), labels=None, validate=None, background=True,
+                     prefetched=None):
+        """Serve every tab of a sheet that has a version, refreshing the due ones.
+
+        Tabs never fetched before are fetched now; due tabs that already have a
+        version are refetched on a background thread when ``background`` is set
+        (and in line otherwise). ``validate(gid, frame)`` returns a problem
+        description for a fetched frame that should not replace the last good
+        one. ``prefetched`` maps gids to frames fetched by other means (a
+        workbook download); they are validated, stored and reported like
+        fetched tabs instead of being fetched. Returns ({gid: frame}, FetchReport).
+        """
+        self.plans[sheet_id] = {
+            'gids': list(gids),
+            'priority_gids': list(priority_gids),
+            'labels': dict(labels or {}),
+            'validate': validate,
+        }
+        report = FetchReport()
+        priority_gids = set(priority_gids)
+        now = time.monotonic()
+        states = self.cached_tabs(sheet_id)
+        cold_start = not states
+
+        prefetched = prefetched or {}
+        for gid, frame in prefetched.items():
+            self._accept(sheet_id, gid, frame, validate, report, priority=gid in priority_gids)
+
+        due = []
+        for gid in gids:
+            if gid in prefetched:
+                continue
+            if gid in states and states[gid].next_due > now:
+                report.cached.append(gid)
+            else:
+                due.append(gid)
+
+        due = self._by_urgency(due, states, priority_gids, now)
+        if background:
+            report.revalidating = [gid for gid in due if gid in states]
+            due = [gid for gid in due if gid not in states]
+        self._fetch(source, sheet_id, due, priority_gids, validate, report, cold_start)
+        if report.revalidating:
+            self._revalidate_in_background(source, sheet_id, report.revalidating, priority_gids, validate)
+
+        states = self.cached_tabs(sheet_id)
+        tabs = {gid: states[gid].frame for gid in gids if gid in states}
+        report.served = set(tabs)
+
+        self.reports[sheet_id] = report
+        return tabs, report
+
+    def revalidate(self, source, sheet_id):
+        """Refetch the due tabs of the last refresh_tabs plan on a background thread"""
+        plan = self.plans.get(sheet_id)
+        if plan is None:
+            return
+        now = time.monotonic()
+        states = self.cached_tabs(sheet_id)
+        priority_gids = set(plan['priority_gids'])
+        due = [gid for gid in plan['gids'] if gid not in states or states[gid].next_due <= now]
+        if due:
+            self._revalidate_in_background(source, sheet_id, self._by_urgency(due, states, priority_gids, now),
+                                           priority_gids, plan['validate'])
+
+    def stale_tabs(self, sheet_id, gids):
+        """Tabs that are behind: (gid, age in seconds or None if never loaded, reason)"""
+        now = time.monotonic()
+        with self._lock:
+            states = self._tabs.get(sheet_id, {})
+            missing = self._missing.get(sheet_id, {})
+            stale = []
+            for gid in gids:
+                state = states.get(gid)
+                if state is None:
+                    if gid in missing:
+                        stale.append((gid, None, missing[gid]))
+                elif state.problem:
+                    stale.append((gid, now - state.fetched_at, state.problem))
+                elif now - state.next_due > self.refresh_interval:
+                    stale.append((gid, now - state.fetched_at, 'overdue'))
+            return stale
@@ -0,0 +1,222 @@
+"""Where a dashboard rerun spends its time.
+
+Each rerun of the script runs inside a ``trace``; the code it calls records
+nested, timed spans::
+
+    with instrumentation.span('load.serp', cached=True) as span:
+        df = load_data_from_google_sheets()
+        span.rows = len(df)
+
+- a span records its wall time, the rows it processed (when given) and, for
+  ``cached=True`` spans, whether the cache was hit: it counts as a hit unless
+  the cached function body runs and calls ``record_miss`` (``on_miss`` does
+  that for a function, placed below its cache decorator)
+- ``section`` starts a lap that ends at the next section of the same span,
+  so a long page function is split into timed sections without re-indenting it
+- ``timed`` wraps a function in a span that ends the caller's running
+  section, or in a trace of its own when it runs outside one (a fragment
+  rerun)
+- when a trace ends, its spans are written as one JSON line to the
+  ``dashboard.perf`` logger and it is passed to each of ``listeners``
+
+The current trace is thread-local: Streamlit runs a rerun in its session's
+script thread. Spans outside a trace (background threads, benchmarks) are
+timed but not recorded.
+"""
+
+import contextlib
+import functools
+import json
+import logging
+import sys
+import threading
+import time
+
+logger = logging.getLogger('dashboard.perf')
+
+# Called with every finished Trace (e.g. to update metrics)
+listeners = []
+
+_local = threading.local()
+
+class Span:
+    """One timed block of a rerun"""
+
+    __slots__ = ('name', 'depth', 'rows', 'cache', 'lap', 'seconds', '_start')
+
+    def __init__(self, name, depth, rows=None, cached=False, lap=False):
+        self.name = name
+        self.depth = depth
+        self.rows = rows
+        self.cache = 'hit' if cached else None
+        self.lap = lap
+        self.seconds = None
+        self._start = time.perf_counter()
+
+    def end(self):
+        self.seconds = time.perf_counter() - self._start
+
+    def as_dict(self):
+        entry = {'name': self.name, 'depth': self.depth, 'ms': round(self.seconds * 1000, 1)}
+        if self.rows is not None:
+            entry['rows'] = int(self.rows)
+        if self.cache is not None:
+            entry['cache'] = self.cache
+        return entry
+
+class Trace:
+    """Spans of one rerun, in the order they started"""
+
+    def __init__(self, name):
+        self.name = name
+        self.fields = {}
+        self.spans = []
+        self.seconds = None
+        self._open = []
+        self._start = time.perf_counter()
+
+    def open(self, name, rows=None, cached=False, lap=False, sibling=False):
+        """Start a span nested in the innermost open one.
+
+        A lap, or a ``sibling`` span, first ends the lap running at that level.
+        """
+        if (lap or sibling) and self._open and self._open[-1].lap:
+            self._open.pop().end()
+        span = Span(name, len(self._open), rows, cached, lap)
+        self.spans.append(span)
+        self._open.append(span)
+        return span
+
+    def close(self, span):
+        """End ``span`` and the laps still open inside it"""
+        while self._open:
+            top = self._open.pop()
+            top.end()
+            if top is span:
+                break
+
+    def record_miss(self):
+        """Mark the innermost open cached span as a cache miss"""
+        for span in reversed(self._open):
+            if span.cache is not None:
+                span.cache = 'miss'
+                return
+
+    def end(self):
+        while self._open:
+            self._open.pop().end()
+        self.seconds = time.perf_counter() - self._start
+
+    def summary(self):
+        """The trace as one JSON-serialisable record"""
+        return {
+            'trace': self.name,
+            **self.fields,
+            'ms': round(self.seconds * 1000, 1),
+            'spans': [span.as_dict() for span in self.spans],
+        }
+
+def current():
+    """The trace of the rerun running in this thread, or None"""
+    return getattr(_local, 'trace', None)
+
+@contextlib.contextmanager
+def trace(name, **fields):
+    """Record the spans of one rerun and log them when it ends; yields the ``Trace``.
+
+    Inside another trace this is a span of that trace instead.
+    """
+    outer = current()
+    if outer is not None:
+        with span(name):
+            yield outer
+        return
+
+    new_trace = Trace(name)
+    new_trace.fields.update(fields)
+    _local.trace = new_trace
+    try:
+        yield new_trace
+    finally:
+        _local.trace = None
+        new_trace.end()
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps(new_trace.summary(), default=str, ensure_ascii=False))
+        for listener in listeners:
+            try:
+                listener(new_trace)
+            except Exception:
+                logger.exception("Trace listener %r failed", listener)
+
+@contextlib.contextmanager
+def span(name, rows=None, cached=False, section=False):
+    """Time a block as a span of the current trace; yields the ``Span`` so rows can be set.
+
+    With ``section=True`` the span first ends the running section, as the next
+    section of its level instead of a part of the previous one.
+    """
+    active = current()
+    if active is None:
+        yield Span(name, 0, rows, cached)
+        return
+
+    new_span = active.open(name, rows, cached, sibling=section)
+    try:
+        yield new_span
+    finally:
+        active.close(new_span)
+
+def section(name, rows=None):
+    """Start a timed section that lasts until the next section or the end of the enclosing span"""
+    active = current()
+    if active is not None:
+        active.open(name, rows, lap=True)
+
+def annotate(**fields):
+    """Add fields to the current trace's log record"""
+    active = current()
+    if active is not None:
+        active.fields.update(fields)
+
+def record_miss():
+    """Called from a cached function body: the enclosing cached span missed"""
+    active = current()
+    if active is not None:
+        active.record_miss()
+
+def on_miss(fn):
+    """Decorate a cached function body (below the cache decorator) to record its cache misses"""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        record_miss()
+        return fn(*args, **kwargs)
+    return wrapper
+
+def timed(name):
+    """Run the decorated function in a span, or in its own trace outside one.
+
+    The span's rows are the length of the first argument when it has one
+    (the DataFrame a page renders).
+    """
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if current() is None:
+                with trace(name):
+                    return fn(*args, **kwargs)
+
+            rows = len(args[0]) if args and hasattr(args[0], '__len__') else None
+            with span(name, rows=rows, section=True):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def enable_logging(stream=None):
+    """Write the per-rerun JSON lines to ``stream`` (stderr by default); safe to call on every rerun"""
+    if not any(getattr(handler, '_dashboard_perf', False) for handler in logger.handlers):
+        handler = logging.StreamHandler(stream or sys.stderr)
+        handler.setFormatter(logging.Formatter('%(asctime)s %(name)s %(message)s'))
+        handler._dashboard_perf = True
+        logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
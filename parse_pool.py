@@ -0,0 +1,94 @@
+"""Process pool that parses sheet tabs outside the app process.
+
+Parsing hundreds of keyword tabs is CPU-bound and, in one process, serialized
+by the GIL. ``ParsePool`` hands tab payloads (CSV bytes, or the path of a CSV
+or Parquet file in a local mirror) to worker processes, which parse them into
+Arrow tables of text columns (``data_sources.read_payload_table``) and send
+them back as Arrow IPC streams. The parent opens each stream in place, without
+copying the column buffers again.
+
+Workers are started with ``spawn`` (forking a process that runs Streamlit's
+threads is unsafe) and only import ``data_sources``, so they start quickly and
+never run the app script.
+"""
+
+import concurrent.futures
+import multiprocessing
+import threading
+
+import data_sources
+
+# Batches per worker for one read_tables call: enough to balance uneven tabs,
+# few enough that per-task overhead stays small
+BATCHES_PER_WORKER = 4
+
+def parse_batch(payloads):
+    """Worker side: parse payloads into Arrow IPC buffers (or the exception each raised)"""
+    import pyarrow as pa
+
+    results = []
+    for payload in payloads:
+        try:
+            table = data_sources.read_payload_table(payload)
+            sink = pa.BufferOutputStream()
+            with pa.ipc.new_stream(sink, table.schema) as writer:
+                writer.write_table(table)
+            results.append(sink.getvalue())
+        except Exception as e:
+            results.append(e)
+    return results
+
+class ParsePool:
+    """Worker processes parsing tab payloads; started on first use"""
+
+    def __init__(self, workers):
+        self.workers = workers
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = concurrent.futures.ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context('spawn')
+                )
+            return self._executor
+
+    def start(self):
+        """Start the worker processes now instead of on the first parse"""
+        executor = self.executor()
+        list(executor.map(parse_batch, [[]] * self.workers))
+
+    def read_tables(self, payloads):
+        """Parse ``{key: payload}`` in the workers; returns ``{key: pyarrow.Table or Exception}``"""
+        import pyarrow as pa
+
+        keys = list(payloads)
+        batch_count = min(len(keys), self.workers * BATCHES_PER_WORKER) or 1
+        batches = [keys[index::batch_count] for index in range(batch_count)]
+
+        try:
+            executor = self.executor()
+            futures = [(executor.submit(parse_batch, [payloads[key] for key in batch]), batch)
+                       for batch in batches if batch]
+        except Exception as e:
+            return {key: e for key in keys}
+
+        tables = {}
+        for future, batch in futures:
+            try:
+                results = future.result()
+            except Exception as e:
+                # A worker died (BrokenProcessPool); the pool is rebuilt on the next call
+                self.reset()
+                results = [e] * len(batch)
+            for key, result in zip(batch, results):
+                tables[key] = result if isinstance(result, Exception) else pa.ipc.open_stream(result).read_all()
+        return tables
+
+    def reset(self):
+        """Shut the workers down; the next call starts new ones"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
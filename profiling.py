@@ -0,0 +1,117 @@
+"""Opt-in profiles of dashboard reruns.
+
+``profiled`` runs a block under a profiler:
+
+- ``cprofile`` (deterministic, standard library): a ``.pstats`` file for
+  ``python -m pstats``, snakeviz or ``pstats.Stats``
+- ``pyinstrument`` (sampling, lower overhead, needs ``pip install
+  pyinstrument``): a speedscope ``.speedscope.json`` file for speedscope.app
+
+A ``ProfileStore`` directory keeps the newest ``keep`` profiles, named after
+the time and the page of the rerun::
+
+    <directory>/20250101-120000-123-executive-dashboard.pstats
+
+Both profilers only see the thread they are started in, i.e. the session's
+script thread; background fetches are not included.
+"""
+
+import contextlib
+import marshal
+import os
+import re
+import time
+
+PROFILERS = ('cprofile', 'pyinstrument')
+
+class Profile:
+    """Result of a profiled block; ``data`` stays None when the profiler could not start"""
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.extension = '.pstats' if kind == 'cprofile' else '.speedscope.json'
+        self.data = None
+        self.seconds = None
+
+@contextlib.contextmanager
+def profiled(kind='cprofile'):
+    """Profile the block with ``kind`` (one of PROFILERS); yields a ``Profile`` filled in at the end"""
+    if kind not in PROFILERS:
+        raise ValueError(f"Unknown profiler {kind!r}, expected one of {', '.join(PROFILERS)}")
+
+    profile = Profile(kind)
+    start = time.perf_counter()
+    if kind == 'cprofile':
+        import cProfile
+
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:  # another profiler is active in this process
+            yield profile
+            return
+        try:
+            yield profile
+        finally:
+            profiler.disable()
+            profile.seconds = time.perf_counter() - start
+            profiler.create_stats()
+            # The format pstats.Stats and Profile.dump_stats use
+            profile.data = marshal.dumps(profiler.stats)
+    else:
+        from pyinstrument import Profiler
+        from pyinstrument.renderers import SpeedscopeRenderer
+
+        profiler = Profiler(async_mode='disabled')
+        try:
+            profiler.start()
+        except RuntimeError:  # already profiling this thread
+            yield profile
+            return
+        try:
+            yield profile
+        finally:
+            profiler.stop()
+            profile.seconds = time.perf_counter() - start
+            profile.data = profiler.output(SpeedscopeRenderer()).encode('utf-8')
+
+def slug(label):
+    """File-name-safe form of a page label"""
+    return re.sub(r'[^a-z0-9]+', '-', label.lower()).strip('-') or 'rerun'
+
+class ProfileStore:
+    """Directory of the newest ``keep`` rerun profiles"""
+
+    def __init__(self, directory, keep=20):
+        self.directory = directory
+        self.keep = keep
+        os.makedirs(directory, exist_ok=True)
+
+    def files(self):
+        """Profile file names, oldest first"""
+        return sorted(entry for entry in os.listdir(self.directory)
+                      if entry.endswith(('.pstats', '.speedscope.json')))
+
+    def save(self, profile, label):
+        """Write ``profile`` under a name made of the time and ``label``; returns its path"""
+        now = time.time()
+        name = f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(now))}-{int(now * 1000) % 1000:03d}-{slug(label)}"
+        path = os.path.join(self.directory, name + profile.extension)
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        with open(tmp_path, 'wb') as f:
+            f.write(profile.data)
+        os.replace(tmp_path, path)
+
+        self.prune()
+        return path
+
+    def prune(self):
+        """Remove all but the newest ``keep`` profiles"""
+        for entry in self.files()[:-self.keep]:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(os.path.join(self.directory, entry))
+
+    def latest(self):
+        """Path of the newest profile, or None"""
+        files = self.files()
+        return os.path.join(self.directory, files[-1]) if files else None
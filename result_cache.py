@@ -0,0 +1,118 @@
+"""Derived-view results shared by every dashboard process on a host.
+
+Summaries such as the LLM keyword table or the position matrix only depend on
+the dataset version and the page filters, yet every session of every process
+would compute them again. ``ResultCache`` keeps them in a SQLite file keyed by
+(dataset version, view, filter hash):
+
+- entries are pickled; the least recently used ones are evicted once the file
+  holds more than ``max_bytes`` of results
+- a dataset version only changes with its content (snapshots.py), so entries
+  of older versions are simply no longer looked up and age out of the LRU;
+  processes briefly on different versions keep each other's entries
+- hit, miss and eviction counters are kept in the same file, so ``stats()``
+  reports the cache's effectiveness across all processes
+
+SQLite runs in WAL mode, so readers don't block the writer.
+"""
+
+import contextlib
+import hashlib
+import os
+import pickle
+import sqlite3
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    version TEXT NOT NULL,
+    view TEXT NOT NULL,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used);
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+COUNTERS = ('hits', 'misses', 'evictions')
+
+def filter_hash(params):
+    """Stable short hash of a view's filter values"""
+    return hashlib.sha1(repr(params).encode('utf-8')).hexdigest()[:16]
+
+class ResultCache:
+    """Size-bounded LRU cache of derived results in a SQLite file"""
+
+    def __init__(self, path, max_bytes=256 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as db:
+            db.execute('PRAGMA journal_mode=WAL')
+            db.executescript(SCHEMA)
+            db.executemany('INSERT OR IGNORE INTO counters (name, value) VALUES (?, 0)',
+                           [(name,) for name in COUNTERS])
+
+    @contextlib.contextmanager
+    def _connect(self):
+        """One short-lived connection (and transaction) per operation; safe across threads"""
+        db = sqlite3.connect(self.path, timeout=10)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def get_or_compute(self, version, view, params, compute):
+        """Cached result of ``view`` for ``params`` on dataset ``version``, computing it on a miss"""
+        key = f"{version}:{view}:{filter_hash(params)}"
+
+        with self._connect() as db:
+            row = db.execute('SELECT value FROM results WHERE key = ?', (key,)).fetchone()
+            if row is not None:
+                db.execute('UPDATE results SET last_used = ? WHERE key = ?', (time.time(), key))
+            db.execute('UPDATE counters SET value = value + 1 WHERE name = ?',
+                       ('hits' if row is not None else 'misses',))
+        if row is not None:
+            return pickle.loads(row[0])
+
+        result = compute()
+        value = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(value) <= self.max_bytes:
+            with self._connect() as db:
+                db.execute('INSERT OR REPLACE INTO results (key, version, view, value, size, last_used) '
+                           'VALUES (?, ?, ?, ?, ?, ?)', (key, version, view, value, len(value), time.time()))
+                self._evict(db)
+        return result
+
+    def _evict(self, db):
+        """Delete least recently used entries until the results fit in ``max_bytes``"""
+        total = db.execute('SELECT COALESCE(SUM(size), 0) FROM results').fetchone()[0]
+        excess = total - self.max_bytes
+        if excess <= 0:
+            return
+
+        evicted = []
+        for key, size in db.execute('SELECT key, size FROM results ORDER BY last_used'):
+            evicted.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        db.executemany('DELETE FROM results WHERE key = ?', evicted)
+        db.execute("UPDATE counters SET value = value + ? WHERE name = 'evictions'", (len(evicted),))
+
+    def stats(self):
+        """Counters across all processes plus the current entry count and size"""
+        with self._connect() as db:
+            stats = dict(db.execute('SELECT name, value FROM counters'))
+            stats['entries'], stats['bytes'] = db.execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results'
+            ).fetchone()
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else None
+        return stats
@@ -0,0 +1,161 @@
+"""Dataset snapshots shared by every dashboard process on a host.
+
+When several Streamlit processes serve the dashboard, each would otherwise
+fetch and keep its own copy of the datasets. A ``SnapshotStore`` directory
+holds versions of the processed datasets as uncompressed Arrow IPC (Feather
+v2) files::
+
+    <directory>/CURRENT               name of the current version
+    <directory>/<version>/<name>.arrow
+    <directory>/refresh.lock          held by the process refreshing the snapshot
+
+A refresh writes a new version directory and then swaps ``CURRENT`` with an
+atomic rename, so readers see either the old or the new version, never a mix.
+A version is named after its publish time and a hash of its content; a
+refresh that fetched the same content only renews the current version's age,
+so processes keep their mapped snapshot and everything derived from it.
+Readers memory-map the files read-only: the page cache holds one copy of the
+column data however many processes map it, and a new process starts by
+mapping the current version instead of fetching the sheets.
+"""
+
+import contextlib
+import hashlib
+import os
+import shutil
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process refresh lock
+    fcntl = None
+
+import data_sources
+
+POINTER_FILE = 'CURRENT'
+LOCK_FILE = 'refresh.lock'
+
+def content_hash(frames):
+    """Short hash of the columns, dtypes and values of ``{name: DataFrame}``"""
+    import pandas as pd
+
+    digest = hashlib.sha1()
+    for name, df in sorted(frames.items()):
+        digest.update(repr((name, list(df.columns), [str(dtype) for dtype in df.dtypes])).encode('utf-8'))
+        digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()[:16]
+
+def version_hash(version):
+    """Content hash part of a version name"""
+    return version.rsplit('-', 1)[-1] if version else None
+
+class SnapshotStore:
+    """Versioned, memory-mapped snapshots of named DataFrames under ``directory``"""
+
+    def __init__(self, directory, keep=3):
+        self.directory = directory
+        self.keep = keep  # versions kept on disk; older ones are removed after a publish
+        os.makedirs(directory, exist_ok=True)
+
+    def current(self):
+        """Name of the current version, or None before the first publish"""
+        try:
+            with open(os.path.join(self.directory, POINTER_FILE), encoding='utf-8') as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def age(self, version):
+        """Seconds since ``version`` was published"""
+        try:
+            return time.time() - os.path.getmtime(os.path.join(self.directory, version))
+        except (FileNotFoundError, TypeError):
+            return float('inf')
+
+    def publish(self, frames):
+        """Write ``{name: DataFrame}`` as a new version and make it current; returns the version.
+
+        When the content equals the current version's, only that version's age
+        is renewed and it is returned as is.
+        """
+        import pyarrow as pa
+        from pyarrow import feather
+
+        digest = content_hash(frames)
+        current = self.current()
+        if current is not None and version_hash(current) == digest:
+            with contextlib.suppress(FileNotFoundError):
+                os.utime(os.path.join(self.directory, current))
+                return current
+
+        version = f"v{time.time_ns()}-{digest}"
+        path = os.path.join(self.directory, version)
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        os.makedirs(tmp_path)
+        for name, df in frames.items():
+            table = pa.Table.from_pandas(df)
+            # Uncompressed and in one record batch, so readers can use the mapped
+            # buffers as they are instead of decoding or concatenating them
+            feather.write_feather(table, os.path.join(tmp_path, f"{name}.arrow"),
+                                  compression='uncompressed', chunksize=max(table.num_rows, 1))
+        os.replace(tmp_path, path)
+
+        pointer = os.path.join(self.directory, f"{POINTER_FILE}.tmp-{os.getpid()}")
+        with open(pointer, 'w', encoding='utf-8') as f:
+            f.write(version)
+        os.replace(pointer, os.path.join(self.directory, POINTER_FILE))
+
+        self.prune()
+        return version
+
+    def prune(self):
+        """Remove all but the newest ``keep`` versions (mapped files stay readable until unmapped)"""
+        current = self.current()
+        versions = sorted(
+            (entry for entry in os.listdir(self.directory)
+             if entry.startswith('v') and '.tmp' not in entry
+             and os.path.isdir(os.path.join(self.directory, entry))),
+            key=lambda entry: int(entry[1:].split('-')[0])
+        )
+        for version in versions[:-self.keep]:
+            if version != current:
+                shutil.rmtree(os.path.join(self.directory, version), ignore_errors=True)
+
+    def open(self, version):
+        """Memory-map every dataset of ``version`` as ``{name: DataFrame}``.
+
+        Arrow-backed text columns and null-free numeric columns point straight
+        into the mapped files; the frames are read-only and shared. Each frame
+        carries its version in ``attrs['snapshot_version']``.
+        """
+        import pyarrow as pa
+
+        path = os.path.join(self.directory, version)
+        text_types = {pa.string(): data_sources.TEXT_DTYPE, pa.large_string(): data_sources.TEXT_DTYPE}
+        frames = {}
+        for entry in sorted(os.listdir(path)):
+            if entry.endswith('.arrow'):
+                # The map stays open for as long as the frame's buffers reference it
+                table = pa.ipc.open_file(pa.memory_map(os.path.join(path, entry))).read_all()
+                frame = table.to_pandas(split_blocks=True, types_mapper=text_types.get)
+                frame.attrs['snapshot_version'] = version
+                frames[entry[:-len('.arrow')]] = frame
+        return frames
+
+    @contextlib.contextmanager
+    def refresh_lock(self, blocking=False):
+        """Hold the store's refresh lock; yields whether it was acquired"""
+        if fcntl is None:
+            yield True
+            return
+
+        with open(os.path.join(self.directory, LOCK_FILE), 'a') as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
@@ -3,11 +3,28 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
+import contextlib
 import datetime
+import functools
+import hmac
+import html
+import logging
+import os
 import numpy as np
 import re
+import threading
+import time
 from urllib.parse import urlparse
 
+import data_sources
+import fetch_scheduler
+import instrumentation
+import metrics
+import parse_pool
+import profiling
+import result_cache
+import snapshots
+
 # Page configuration
 st.set_page_config(
     page_title="Recharge.com SEO Dashboard",
@@ -164,6 +181,12 @@ st.markdown("""
         margin-bottom: 1rem;
     }
     
+    .serp-comparison {
+        display: grid;
+        grid-template-columns: repeat(auto-fit, minmax(320px, 1fr));
+        gap: 1rem;
+    }
+    
     .serp-header {
         text-align: center;
         font-size: 1.1rem;
@@ -374,82 +397,401 @@ def get_position_status(position):
     except:
         return str(position), '#64748b'
 
+def recharge_position_label(row):
+    """Recharge position of a keyword tab row, or its status ("Not Ranking", "Lost") when it doesn't rank"""
+    position = row.get('Recharge Position')
+    if pd.notna(position):
+        return int(position)
+    return row.get('Recharge Status', 'Unknown')
+
 def has_ai_overview(ai_content):
     """Check if AI Overview content exists"""
     if pd.isna(ai_content) or not ai_content or str(ai_content) == '#ERROR!' or str(ai_content).strip() == '':
         return False
     return True
 
-@st.cache_data(ttl=60)
-def load_data_from_google_sheets():
-    """Load data directly from the specified Google Sheets using GIDs from Main sheet"""
-    
-    sheet_id = "1hOMEaZ_zfliPxJ7N-9EJ64KvyRl9J-feoR30GB-bI_o"
-    main_csv_url = f"https://docs.google.com/spreadsheets/d/{sheet_id}/export?format=csv&gid=0"
-    
+def get_setting(key, default=None):
+    """Read a dashboard setting from the environment or the [dashboard] secrets table"""
+    env_value = os.environ.get(f"DASHBOARD_{key.upper()}")
+    if env_value is not None:
+        return env_value
+
+    try:
+        return st.secrets["dashboard"][key]
+    except Exception:
+        return default
+
+def setting_enabled(key, default):
+    """Boolean setting: true, 1 or yes"""
+    return str(get_setting(key, default)).lower() in ('true', '1', 'yes')
+
+# Timestamps of one crawl differ by seconds or minutes between keyword tabs;
+# anything closer together than this is treated as the same crawl run.
+CRAWL_RUN_GAP_MINUTES = 30
+
+def assign_crawl_runs(df, datetime_col='DateTime', gap_minutes=None):
+    """Cluster crawl timestamps into integer run IDs.
+
+    Timestamps are sorted and a new run starts whenever the gap to the previous
+    timestamp exceeds ``gap_minutes``. Adds ``Run_ID`` (0 = oldest run) and
+    ``Run_Start`` columns; rows without a timestamp get no run.
+    """
+    if gap_minutes is None:
+        gap_minutes = float(get_setting('crawl_run_gap_minutes', CRAWL_RUN_GAP_MINUTES))
+
+    df = df.copy()
+    stamps = pd.Series(df[datetime_col].dropna().unique()).sort_values(ignore_index=True)
+
+    if stamps.empty:
+        df['Run_ID'] = pd.Series(pd.NA, index=df.index, dtype='Int64')
+        df['Run_Start'] = pd.NaT
+        return df
+
+    run_ids = (stamps.diff() > pd.Timedelta(minutes=gap_minutes)).cumsum()
+    run_starts = stamps.groupby(run_ids).transform('min')
+
+    df['Run_ID'] = df[datetime_col].map(pd.Series(run_ids.values, index=pd.Index(stamps))).astype('Int64')
+    df['Run_Start'] = df[datetime_col].map(pd.Series(run_starts.values, index=pd.Index(stamps)))
+
+    return df
+
+def format_run_label(run_start):
+    """Display label for a crawl run"""
+    return run_start.strftime('%b %d, %Y at %I:%M %p') if pd.notna(run_start) else "Unknown run"
+
+# Current-state tables are keyed per keyword and market (and engine for LLM data)
+SERP_STATE_KEYS = ['Keyword', 'Market']
+LLM_STATE_KEYS = ['Keyword', 'Country', 'Engine']
+
+def select_latest_rows(df, keys, whole_run=False):
+    """Keep each key's latest crawl run (all of its rows, or only the newest row)"""
+    keys = [key for key in keys if key in df.columns]
+    df = df.dropna(subset=['Run_ID'])
+    if df.empty:
+        return df.reset_index(drop=True)
+
+    latest_run = df.groupby(keys, dropna=False)['Run_ID'].transform('max')
+    latest = df[df['Run_ID'] == latest_run]
+    if not whole_run:
+        latest = latest.sort_values('DateTime').groupby(keys, dropna=False).tail(1)
+
+    return latest.reset_index(drop=True)
+
+# Google Sheets holding the keyword tabs (Main config tab is GID 0) and the LLM results;
+# overridable with the serp_sheet_id / llm_sheet_id settings
+SERP_SHEET_ID = "1hOMEaZ_zfliPxJ7N-9EJ64KvyRl9J-feoR30GB-bI_o"
+LLM_SHEET_ID = "1RMUPPVR02dWXt2a-lK_gAXhU1h7CS7l8GzZCBx-DvPA"
+
+# Declared column types of the sheets (sources return every cell as text; the
+# Main tab is all text). "Recharge Position" becomes float64 with NaN for
+# "Not Ranking"/"Lost", which move to the "Recharge Status" categorical.
+KEYWORD_TAB_SCHEMA = data_sources.SheetSchema(
+    statuses={'Recharge Position': ('Recharge Status', {'Not Ranking': 'Not Ranking', 'Lost': 'Lost'})}
+)
+LLM_SHEET_SCHEMA = data_sources.SheetSchema(numbers=['Position'])
+
+def get_service_account_info():
+    """Service account credentials from secrets.toml, if configured"""
     try:
-        # Read the main configuration sheet  
-        main_df = pd.read_csv(main_csv_url)
+        return dict(st.secrets["gcp_service_account"])
+    except Exception:
+        return None
+
+@st.cache_resource
+def get_http_transport(connect_timeout, read_timeout, pool_size):
+    """Process-wide pooled HTTP session used for every sheet download"""
+    return data_sources.HttpTransport(connect_timeout, read_timeout, pool_size)
+
+@st.cache_resource
+def get_parse_pool(workers):
+    """Process-wide pool of tab parsing worker processes, or None to parse in the app process"""
+    return parse_pool.ParsePool(workers) if workers > 0 else None
+
+@st.cache_resource
+def create_data_source(kind, base_url, directory, batch_size, http_settings, parse_workers=0):
+    """Build (once per configuration) the data source the loaders read from"""
+    credentials_info = get_service_account_info() if kind == 'gspread' else None
+    transport = get_http_transport(*http_settings)
+    return data_sources.create_data_source(kind, base_url, directory, credentials_info, batch_size, transport,
+                                           get_parse_pool(parse_workers))
+
+def get_data_source():
+    """Data source selected by the data_source setting (sheets_csv, gspread, csv_dir or parquet_dir)"""
+    http_settings = (
+        float(get_setting('http_connect_timeout', 10)),
+        float(get_setting('http_read_timeout', 60)),
+        int(get_setting('http_pool_size', 10))
+    )
+    return create_data_source(
+        get_setting('data_source', 'sheets_csv'),
+        get_setting('sheets_base_url', data_sources.SHEETS_BASE_URL),
+        get_setting('data_dir', 'data'),
+        int(get_setting('gspread_batch_size', 50)),
+        http_settings,
+        int(get_setting('parse_workers', 0))
+    )
+
+@st.cache_resource
+def create_fetch_scheduler(rate_per_minute, burst, refresh_interval, max_wait):
+    """Process-wide fetch scheduler, shared by all sessions; its fetches feed the metrics"""
+    scheduler = fetch_scheduler.FetchScheduler(rate_per_minute, burst, refresh_interval, max_wait)
+    scheduler.on_report = functools.partial(record_fetch_metrics, get_process_metrics())
+    return scheduler
+
+def get_fetch_scheduler():
+    """Fetch scheduler configured by the fetch_* settings"""
+    return create_fetch_scheduler(
+        float(get_setting('fetch_rate_per_minute', 240)),
+        int(get_setting('fetch_burst', 120)),
+        float(get_setting('tab_refresh_interval', 300)),
+        float(get_setting('fetch_max_wait', 30))
+    )
+
+# Sheet fetches and dataset loads take seconds rather than milliseconds
+FETCH_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+@st.cache_resource
+def create_metrics(port, host):
+    """Prometheus metrics of this process, served at http://host:port/metrics unless port is 0"""
+    registry = metrics.Registry()
+    registry.histogram('dashboard_tab_fetch_seconds', 'Time to fetch and parse one keyword tab', ['gid'],
+                       buckets=FETCH_BUCKETS)
+    registry.counter('dashboard_tabs_fetched_total', 'Keyword tabs fetched')
+    registry.counter('dashboard_tabs_failed_total', 'Keyword tab fetches that failed or returned an invalid tab')
+    registry.counter('dashboard_tabs_skipped_total', 'Due keyword tabs not fetched (deferred: no budget, throttled: 429)',
+                     ['reason'])
+    registry.histogram('dashboard_load_seconds', 'Time to load a dataset on a loader cache miss', ['dataset'],
+                       buckets=FETCH_BUCKETS)
+    registry.histogram('dashboard_parse_seconds', 'Time to preprocess a dataset on a cache miss', ['dataset'])
+    registry.counter('dashboard_rows_ingested_total', 'Rows loaded on loader cache misses', ['dataset'])
+    registry.counter('dashboard_cache_requests_total', 'Lookups of cached loaders and views', ['cache', 'result'])
+    registry.histogram('dashboard_page_render_seconds', 'Time to render a page', ['page'])
+    registry.histogram('dashboard_rerun_seconds', 'Time of a whole rerun')
+    # After a cache clear this runs again: replace the old registry's listener rather than adding one
+    listener = functools.partial(record_trace_metrics, registry)
+    listener._dashboard_metrics = True
+    instrumentation.listeners[:] = [other for other in instrumentation.listeners
+                                    if not getattr(other, '_dashboard_metrics', False)] + [listener]
+    
+    if port:
+        try:
+            metrics.serve(registry, port, host)
+        except OSError as e:
+            # e.g. another dashboard process on this host already uses the port
+            logging.getLogger('dashboard.metrics').warning("Metrics not served on %s:%s: %s", host, port, e)
+    return registry
+
+def get_process_metrics():
+    """Metrics registry configured by the metrics_port and metrics_host settings"""
+    return create_metrics(int(get_setting('metrics_port', 0)), get_setting('metrics_host', '127.0.0.1'))
+
+def record_fetch_metrics(registry, sheet_id, report):
+    """Fetch scheduler report hook: tab latencies, failures and skipped tabs"""
+    for gid, seconds in report.seconds.items():
+        registry['dashboard_tab_fetch_seconds'].observe(seconds, gid=gid)
+    registry['dashboard_tabs_fetched_total'].inc(len(report.fetched))
+    registry['dashboard_tabs_failed_total'].inc(len(report.failed))
+    registry['dashboard_tabs_skipped_total'].inc(len(report.deferred), reason='deferred')
+    registry['dashboard_tabs_skipped_total'].inc(len(report.throttled), reason='throttled')
+
+def record_trace_metrics(registry, trace):
+    """Trace listener: rerun and page times, loader cache lookups, load and parse work"""
+    registry['dashboard_rerun_seconds'].observe(trace.seconds)
+    for span in trace.spans:
+        kind, _, name = span.name.partition('.')
+        if kind == 'page':
+            registry['dashboard_page_render_seconds'].observe(span.seconds, page=name)
+        if span.cache is None:
+            continue
         
-        # Extract GIDs from column E
-        gids_to_try = []
-        keywords_info = []
+        registry['dashboard_cache_requests_total'].inc(cache=span.name, result=span.cache)
+        if span.cache == 'miss' and kind == 'load':
+            registry['dashboard_load_seconds'].observe(span.seconds, dataset=name)
+            registry['dashboard_rows_ingested_total'].inc(span.rows or 0, dataset=name)
+        elif span.cache == 'miss' and kind == 'preprocess':
+            registry['dashboard_parse_seconds'].observe(span.seconds, dataset=name)
+
+def get_priority_keywords():
+    """Keywords listed in the priority_keywords setting (comma separated), lower-cased"""
+    value = get_setting('priority_keywords', '')
+    if isinstance(value, str):
+        value = value.split(',')
+    return {str(keyword).strip().lower() for keyword in value if str(keyword).strip()}
+
+def parse_main_sheet(main_df):
+    """Extract the keyword tab config (GID, keyword, URL, language, location) from the Main sheet"""
+    keywords_info = []
+    
+    # GIDs live in column E
+    for index, row in main_df.iterrows():
+        try:
+            if len(row) > 4 and pd.notna(row.iloc[4]):
+                gid_text = str(row.iloc[4]).strip()
+                
+                if gid_text.startswith('GID:') or 'GID' in gid_text.upper():
+                    gid_match = re.search(r'(\d+)', gid_text)
+                    if gid_match:
+                        gid = int(gid_match.group(1))
+                        keyword = row.iloc[1] if pd.notna(row.iloc[1]) else f"Keyword_{index}"
+                        keywords_info.append({
+                            'gid': gid,
+                            'keyword': keyword,
+                            'url': row.iloc[0] if pd.notna(row.iloc[0]) else '',
+                            'language': row.iloc[2] if len(row) > 2 and pd.notna(row.iloc[2]) else '',
+                            'location': row.iloc[3] if len(row) > 3 and pd.notna(row.iloc[3]) else ''
+                        })
+        except Exception as e:
+            continue
+    
+    return keywords_info
+
+def keyword_tab_problem(keyword_df):
+    """Why a keyword tab is unusable, or None if it looks right"""
+    if keyword_df.empty:
+        return "tab is empty"
+    missing = [column for column in ['Date/Time', 'Recharge Position'] if column not in keyword_df.columns]
+    if missing:
+        return f"missing {', '.join(missing)} column"
+    return None
+
+def combine_keyword_tabs(keyword_frames, keywords_info):
+    """Stack keyword tabs, tag each row with its tab's Main sheet config and apply the keyword tab schema.
+    
+    The tags are constant per tab, so each tag column is built once for the
+    stacked frame instead of being set on every tab.
+    """
+    combined = pd.concat(keyword_frames, ignore_index=True)
+    lengths = [len(keyword_df) for keyword_df in keyword_frames]
+    
+    def tag(values, dtype=data_sources.TEXT_DTYPE):
+        return pd.array(np.repeat(np.array(values, dtype=object), lengths), dtype=dtype)
+    
+    combined = combined.assign(
+        Sheet_Name=tag([f"{info['keyword']}_{info['language']}_{info['location']}" for info in keywords_info]),
+        Sheet_GID=tag([info['gid'] for info in keywords_info], 'int64'),
+        Expected_Keyword=tag([info['keyword'] for info in keywords_info]),
+        Recharge_URL=tag([info['url'] for info in keywords_info]),
+        Market=tag([get_country_flag(info['location']) for info in keywords_info])
+    )
+    return KEYWORD_TAB_SCHEMA.apply(combined)
+
+def normalize_tab_title(title):
+    """Lower-case a tab title and collapse punctuation/whitespace for matching"""
+    return re.sub(r'[^0-9a-z]+', ' ', str(title).casefold()).strip()
+
+def match_workbook_tabs(workbook, keywords_info):
+    """Map Main sheet GIDs to the sheets of an XLSX workbook export by tab title.
+    
+    The export has tab titles but no GIDs, so each keyword row is matched on the
+    titles its tab could have (keyword_language_location, keyword location, the
+    GID, or the bare keyword when it is unique). XLSX truncates titles to 31
+    characters. GIDs without exactly one matching sheet are left out.
+    """
+    sheets_by_title = {}
+    for title, sheet_df in workbook.items():
+        sheets_by_title.setdefault(normalize_tab_title(title), []).append(sheet_df)
+    
+    keyword_counts = pd.Series([info['keyword'] for info in keywords_info]).value_counts()
+    
+    tabs = {}
+    for info in keywords_info:
+        names = [
+            f"{info['keyword']}_{info['language']}_{info['location']}",
+            f"{info['keyword']} {info['location']}",
+            f"GID {info['gid']}",
+            str(info['gid']),
+        ]
+        if keyword_counts[info['keyword']] == 1:
+            names.append(str(info['keyword']))
         
-        for index, row in main_df.iterrows():
+        candidates = {normalize_tab_title(title) for name in names for title in (name, name[:31])}
+        matches = [sheet_df for title in candidates for sheet_df in sheets_by_title.get(title, [])]
+        if len(matches) == 1:
+            tabs[info['gid']] = matches[0]
+    
+    return tabs
+
+def read_serp_workbook(source, sheet_id):
+    """Read the SERP spreadsheet in one XLSX download; returns (main_df, workbook) or (None, None).
+    
+    Download errors propagate, so the fetch scheduler can back off from a 429.
+    """
+    try:
+        workbook = source.read_workbook(sheet_id)
+    except NotImplementedError:
+        # Not supported by this source: use per-tab reads
+        return None, None
+    
+    if not workbook:
+        return None, None
+    
+    # The Main config tab is normally titled "Main" and always comes first
+    main_df = next((sheet_df for title, sheet_df in workbook.items() if normalize_tab_title(title) == 'main'),
+                   next(iter(workbook.values())))
+    return main_df, workbook
+
+@st.cache_data(ttl=300, max_entries=2)
+@instrumentation.on_miss
+def load_data_from_google_sheets(tabs_version=0):
+    """Load data directly from the specified Google Sheets using GIDs from Main sheet
+    
+    Keyword tabs are served stale-while-revalidate by the fetch scheduler;
+    ``tabs_version`` (bumped when a background refresh lands new content) keys
+    the cache so new tab content shows up without waiting for the TTL. Only the
+    current and previous versions are ever read, so only those are kept.
+    """
+    
+    source = get_data_source()
+    scheduler = get_fetch_scheduler()
+    sheet_id = get_setting('serp_sheet_id', SERP_SHEET_ID)
+    
+    try:
+        # "workbook" downloads every tab at once as XLSX; "tabs" reads tab by tab
+        main_df, workbook = None, None
+        if get_setting('fetch_mode', 'tabs') == 'workbook':
             try:
-                if len(row) > 4 and pd.notna(row.iloc[4]):
-                    gid_text = str(row.iloc[4]).strip()
-                    
-                    if gid_text.startswith('GID:') or 'GID' in gid_text.upper():
-                        gid_match = re.search(r'(\d+)', gid_text)
-                        if gid_match:
-                            gid = int(gid_match.group(1))
-                            keyword = row.iloc[1] if pd.notna(row.iloc[1]) else f"Keyword_{index}"
-                            gids_to_try.append(gid)
-                            keywords_info.append({
-                                'gid': gid,
-                                'keyword': keyword,
-                                'url': row.iloc[0] if pd.notna(row.iloc[0]) else '',
-                                'language': row.iloc[2] if len(row) > 2 and pd.notna(row.iloc[2]) else '',
-                                'location': row.iloc[3] if len(row) > 3 and pd.notna(row.iloc[3]) else ''
-                            })
-            except Exception as e:
-                continue
+                main_df, workbook = scheduler.call(source, sheet_id, lambda: read_serp_workbook(source, sheet_id))
+            except Exception:
+                # The export failed (after waiting out a 429 once): use per-tab reads
+                main_df, workbook = None, None
+        
+        # Read the main configuration sheet (its last good version if the fetch fails)
+        if main_df is None:
+            main_df = scheduler.call_or_last(source, sheet_id, 'Main tab', lambda: source.read_tab(sheet_id, 0))
+        keywords_info = parse_main_sheet(main_df)
         
-        if not gids_to_try:
+        if not keywords_info:
             return pd.DataFrame()
         
-        # Load keyword sheets
+        # Tabs matched in the workbook are validated and stored as fetched; the rest go through the scheduler
         all_keyword_data = []
-        successful_sheets = 0
+        matched_tabs = match_workbook_tabs(workbook, keywords_info) if workbook else {}
+        
+        priority_keywords = get_priority_keywords()
+        tabs, report = scheduler.refresh_tabs(
+            source, sheet_id,
+            [keyword_info['gid'] for keyword_info in keywords_info],
+            priority_gids=[keyword_info['gid'] for keyword_info in keywords_info
+                           if str(keyword_info['keyword']).strip().lower() in priority_keywords],
+            labels={keyword_info['gid']: f"{keyword_info['keyword']} ({keyword_info['location']})"
+                    for keyword_info in keywords_info},
+            validate=lambda gid, keyword_df: keyword_tab_problem(keyword_df),
+            prefetched=matched_tabs
+        )
         
+        tab_keywords_info = []
         for keyword_info in keywords_info:
-            gid = keyword_info['gid']
-            expected_keyword = keyword_info['keyword']
+            keyword_df = tabs.get(keyword_info['gid'])
             
-            try:
-                keyword_csv_url = f"https://docs.google.com/spreadsheets/d/{sheet_id}/export?format=csv&gid={gid}"
-                keyword_df = pd.read_csv(keyword_csv_url)
-                
-                if (not keyword_df.empty and 
-                    'Date/Time' in keyword_df.columns and 
-                    'Recharge Position' in keyword_df.columns):
-                    
-                    keyword_df['Sheet_Name'] = f"{expected_keyword}_{keyword_info['language']}_{keyword_info['location']}"
-                    keyword_df['Sheet_GID'] = gid
-                    keyword_df['Expected_Keyword'] = expected_keyword
-                    keyword_df['Recharge_URL'] = keyword_info['url']
-                    keyword_df['Market'] = get_country_flag(keyword_info['location'])
-                    
-                    all_keyword_data.append(keyword_df)
-                    successful_sheets += 1
-                    
-            except Exception as e:
+            # Tabs without a good version yet are listed as stale in the sidebar
+            if keyword_df is None or keyword_tab_problem(keyword_df):
                 continue
+            
+            all_keyword_data.append(keyword_df)
+            tab_keywords_info.append(keyword_info)
         
         if all_keyword_data:
-            combined_df = pd.concat(all_keyword_data, ignore_index=True)
-            return combined_df
+            return combine_keyword_tabs(all_keyword_data, tab_keywords_info)
         else:
             return pd.DataFrame()
         
@@ -457,88 +799,199 @@ def load_data_from_google_sheets():
         st.error(f"Error loading data: {str(e)}")
         return pd.DataFrame()
 
+def parse_llm_rows(df, carry=None):
+    """Flatten "Start" blocks into one row per result URL, continuing from ``carry``.
+    
+    ``carry`` is the keyword/time/date/country state left by the rows before
+    ``df``; returns the parsed rows and the state to continue from.
+    """
+    
+    df = LLM_SHEET_SCHEMA.apply(df)
+    
+    # Process the data
+    processed_data = []
+    carry = carry or {}
+    current_keyword = carry.get('Keyword')
+    current_time = carry.get('Time')
+    current_date = carry.get('Date')
+    current_country = carry.get('Country')
+    
+    for idx, row in df.iterrows():
+        # Skip empty rows or Start markers without keyword
+        if pd.isna(row.get('Results')) or row.get('Results') == 'Start':
+            if pd.notna(row.get('Keyword')):
+                current_keyword = row['Keyword']
+                current_time = row.get('Time')
+                current_date = row.get('Date')
+                current_country = row.get('Country')
+            continue
+        
+        # If we have a URL in Results column
+        if pd.notna(row.get('Results')) and row.get('Results') != 'Start':
+            # Clean the URL - remove ALL HTML artifacts
+            url = str(row['Results']).strip()
+            
+            # Remove common HTML tags and attributes
+            import re
+            # Remove all HTML tags
+            url = re.sub(r'<[^>]+>', '', url)
+            # Remove any remaining HTML entities
+            url = re.sub(r'&[a-zA-Z]+;', '', url)
+            # Clean up any style attributes that might remain
+            url = re.sub(r'style="[^"]*"', '', url)
+            url = re.sub(r"style='[^']*'", '', url)
+            url = re.sub(r'class="[^"]*"', '', url)
+            url = re.sub(r"class='[^']*'", '', url)
+            # Remove any remaining quotes and extra spaces
+            url = url.replace('"', '').replace("'", '').strip()
+            
+            # Skip if not a valid URL after cleaning
+            if not url.startswith('http'):
+                continue
+            
+            # Extract keyword, time, date, country for this row or use current values
+            keyword = row['Keyword'] if pd.notna(row.get('Keyword')) else current_keyword
+            time = row['Time'] if pd.notna(row.get('Time')) else current_time
+            date = row['Date'] if pd.notna(row.get('Date')) else current_date
+            country = row['Country'] if pd.notna(row.get('Country')) else current_country
+            
+            # Update current values if present in this row
+            if pd.notna(row.get('Keyword')):
+                current_keyword = row['Keyword']
+            if pd.notna(row.get('Time')):
+                current_time = row['Time']
+            if pd.notna(row.get('Date')):
+                current_date = row['Date']
+            if pd.notna(row.get('Country')):
+                current_country = row['Country']
+            
+            processed_data.append({
+                'Keyword': keyword,
+                'Time': time,
+                'Result_URL': url,
+                'Position': row.get('Position'),
+                'Date': date,
+                'Country': country
+            })
+    
+    result_df = pd.DataFrame(processed_data)
+    
+    # Ensure Position is numeric
+    if 'Position' in result_df.columns:
+        result_df['Position'] = pd.to_numeric(result_df['Position'], errors='coerce')
+    
+    carry = {'Keyword': current_keyword, 'Time': current_time, 'Date': current_date, 'Country': current_country}
+    return result_df, carry
+
+def parse_llm_sheet(df):
+    """Flatten the LLM sheet's "Start" blocks into one row per result URL"""
+    return parse_llm_rows(df)[0]
+
+def row_fingerprint(row):
+    """Values of a raw sheet row as text, comparable between full and tail reads"""
+    values = []
+    for value in row:
+        if pd.isna(value):
+            values.append('')
+        elif isinstance(value, float) and value.is_integer():
+            values.append(str(int(value)))
+        else:
+            values.append(str(value))
+    return tuple(values)
+
+class IncrementalSheetLog:
+    """Parsed contents of an append-only sheet, extended by parsing only new rows.
+    
+    Keeps the number of raw rows consumed, the parser's carry-forward state and
+    the last raw row. A refresh reads from the last consumed row on (one row of
+    overlap); if that row no longer matches, the sheet was rewritten and is
+    parsed again in full. Edits further up can't be seen in the tail, so the
+    whole sheet is also re-parsed every ``full_refresh_seconds``.
+    """
+    
+    def __init__(self, parse_rows, full_refresh_seconds=3600):
+        self.parse_rows = parse_rows
+        self.full_refresh_seconds = full_refresh_seconds
+        self._lock = threading.Lock()
+        self.reset()
+    
+    def reset(self):
+        self.columns = None
+        self.full_parsed_at = None
+        self.rows_consumed = 0
+        self.last_row = None
+        self.carry = None
+        self.parsed = pd.DataFrame()
+    
+    def _append(self, rows):
+        parsed, self.carry = self.parse_rows(rows, self.carry)
+        if not parsed.empty:
+            self.parsed = pd.concat([self.parsed, parsed], ignore_index=True) if not self.parsed.empty else parsed
+        self.rows_consumed += len(rows)
+        if len(rows):
+            self.last_row = row_fingerprint(rows.iloc[-1])
+    
+    def refresh(self, read_all, read_tail):
+        """Bring the log up to date; ``read_tail(start, columns)`` returns raw rows from ``start`` on"""
+        with self._lock:
+            due_full = (self.full_parsed_at is None
+                        or time.monotonic() - self.full_parsed_at > self.full_refresh_seconds)
+            if not due_full and self.rows_consumed:
+                try:
+                    tail = read_tail(self.rows_consumed - 1, self.columns)
+                except Exception:
+                    tail = None
+                
+                if (tail is not None and len(tail) and list(tail.columns) == self.columns
+                        and row_fingerprint(tail.iloc[0]) == self.last_row):
+                    self._append(tail.iloc[1:])
+                    return self.parsed.copy()
+            
+            # First load, periodic re-sync, or the sheet changed: parse everything
+            rows = read_all()
+            self.reset()
+            self.columns = list(rows.columns)
+            self.full_parsed_at = time.monotonic()
+            self._append(rows)
+            return self.parsed.copy()
+
+@st.cache_resource
+def get_llm_sheet_log(full_refresh_seconds):
+    """Process-wide incrementally parsed LLM sheet"""
+    return IncrementalSheetLog(parse_llm_rows, full_refresh_seconds)
+
 @st.cache_data(ttl=60)
+@instrumentation.on_miss
 def load_llm_data():
     """Load LLM position tracking data from Google Sheets"""
     
     try:
-        # Load from Google Sheets (publicly available)
-        sheet_id = "1RMUPPVR02dWXt2a-lK_gAXhU1h7CS7l8GzZCBx-DvPA"
-        sheet_url = f"https://docs.google.com/spreadsheets/d/{sheet_id}/export?format=csv&gid=0"
-        df = pd.read_csv(sheet_url)
-        
-        # Process the data
-        processed_data = []
-        current_keyword = None
-        current_time = None
-        current_date = None
-        current_country = None
-        
-        for idx, row in df.iterrows():
-            # Skip empty rows or Start markers without keyword
-            if pd.isna(row.get('Results')) or row.get('Results') == 'Start':
-                if pd.notna(row.get('Keyword')):
-                    current_keyword = row['Keyword']
-                    current_time = row.get('Time')
-                    current_date = row.get('Date')
-                    current_country = row.get('Country')
-                continue
-            
-            # If we have a URL in Results column
-            if pd.notna(row.get('Results')) and row.get('Results') != 'Start':
-                # Clean the URL - remove ALL HTML artifacts
-                url = str(row['Results']).strip()
-                
-                # Remove common HTML tags and attributes
-                import re
-                # Remove all HTML tags
-                url = re.sub(r'<[^>]+>', '', url)
-                # Remove any remaining HTML entities
-                url = re.sub(r'&[a-zA-Z]+;', '', url)
-                # Clean up any style attributes that might remain
-                url = re.sub(r'style="[^"]*"', '', url)
-                url = re.sub(r"style='[^']*'", '', url)
-                url = re.sub(r'class="[^"]*"', '', url)
-                url = re.sub(r"class='[^']*'", '', url)
-                # Remove any remaining quotes and extra spaces
-                url = url.replace('"', '').replace("'", '').strip()
-                
-                # Skip if not a valid URL after cleaning
-                if not url.startswith('http'):
-                    continue
-                
-                # Extract keyword, time, date, country for this row or use current values
-                keyword = row['Keyword'] if pd.notna(row.get('Keyword')) else current_keyword
-                time = row['Time'] if pd.notna(row.get('Time')) else current_time
-                date = row['Date'] if pd.notna(row.get('Date')) else current_date
-                country = row['Country'] if pd.notna(row.get('Country')) else current_country
-                
-                # Update current values if present in this row
-                if pd.notna(row.get('Keyword')):
-                    current_keyword = row['Keyword']
-                if pd.notna(row.get('Time')):
-                    current_time = row['Time']
-                if pd.notna(row.get('Date')):
-                    current_date = row['Date']
-                if pd.notna(row.get('Country')):
-                    current_country = row['Country']
-                
-                processed_data.append({
-                    'Keyword': keyword,
-                    'Time': time,
-                    'Result_URL': url,
-                    'Position': row.get('Position'),
-                    'Date': date,
-                    'Country': country
-                })
+        # Load from the configured data source (Google Sheets by default)
+        source = get_data_source()
+        scheduler = get_fetch_scheduler()
+        sheet_id = get_setting('llm_sheet_id', LLM_SHEET_ID)
         
-        result_df = pd.DataFrame(processed_data)
+        if not setting_enabled('llm_incremental', 'true'):
+            df = scheduler.call_or_last(source, sheet_id, 'LLM sheet', lambda: source.read_tab(sheet_id, 0))
+            return parse_llm_sheet(df)
         
-        # Ensure Position is numeric
-        if 'Position' in result_df.columns:
-            result_df['Position'] = pd.to_numeric(result_df['Position'], errors='coerce')
+        # The sheet is append-only: fetch and parse only the rows added since the last refresh
+        log = get_llm_sheet_log(float(get_setting('llm_full_refresh_seconds', 3600)))
+        try:
+            llm_df = log.refresh(
+                lambda: scheduler.call(source, sheet_id, lambda: source.read_tab(sheet_id, 0)),
+                lambda start, columns: scheduler.call(source, sheet_id,
+                                                      lambda: source.read_tab_rows(sheet_id, 0, start, columns))
+            )
+        except Exception as e:
+            # Keep serving what was parsed so far
+            scheduler.record_failure(sheet_id, 'LLM sheet', e)
+            if log.parsed.empty:
+                raise
+            return log.parsed.copy()
         
-        return result_df
+        scheduler.record_success(sheet_id, 'LLM sheet')
+        return llm_df
         
     except Exception as e:
         st.error(f"Error loading LLM data: {str(e)}")
@@ -584,6 +1037,153 @@ def parse_excel_datetime(date_val):
     
     return pd.NaT
 
+def stamp_data_version(*frames):
+    """Mark ``frames`` with one token that identifies this preprocessing result to the view cache"""
+    version = f'{time.time_ns():x}'
+    for frame in frames:
+        frame.attrs['data_version'] = version
+    return frames
+
+@st.cache_data(ttl=60)
+@instrumentation.on_miss
+def preprocess_serp_data(df):
+    """Parse keyword tab timestamps once, assign crawl runs and select the current state.
+
+    Returns the processed history and its latest row per keyword and market.
+    """
+    if df.empty:
+        return df, df
+
+    df = df.copy()
+    with instrumentation.span('preprocess.serp.parse_datetime', rows=len(df)):
+        df['DateTime'] = df['Date/Time'].apply(parse_excel_datetime)
+    df = df.dropna(subset=['DateTime'])
+    with instrumentation.span('preprocess.serp.crawl_runs', rows=len(df)):
+        df = assign_crawl_runs(df)
+
+    latest = select_latest_rows(df, SERP_STATE_KEYS)
+    return stamp_data_version(df, latest)
+
+@st.cache_data(ttl=60)
+@instrumentation.on_miss
+def preprocess_llm_data(llm_df):
+    """Parse LLM block timestamps once, assign crawl runs and select the current state.
+
+    Returns the processed results and all result rows of the latest run per
+    keyword, country and engine.
+    """
+    if llm_df.empty:
+        return llm_df, llm_df
+
+    llm_df = llm_df.copy()
+    with instrumentation.span('preprocess.llm.parse_datetime', rows=len(llm_df)):
+        llm_df['DateTime'] = pd.to_datetime(llm_df['Date'], errors='coerce')
+        llm_df['DateTime'] = llm_df['DateTime'].fillna(pd.to_datetime(llm_df['Time'], errors='coerce'))
+    with instrumentation.span('preprocess.llm.crawl_runs', rows=len(llm_df)):
+        llm_df = assign_crawl_runs(llm_df)
+
+    latest = select_latest_rows(llm_df, LLM_STATE_KEYS, whole_run=True)
+    return stamp_data_version(llm_df, latest)
+
+# Datasets in a shared snapshot, in the order load_datasets returns them
+SNAPSHOT_DATASETS = ('serp', 'serp_latest', 'llm', 'llm_latest')
+
+@st.cache_resource
+def get_snapshot_store(directory):
+    """Handle on the snapshot directory shared by the dashboard processes on this host"""
+    return snapshots.SnapshotStore(directory)
+
+@st.cache_resource(max_entries=2)
+@instrumentation.on_miss
+def open_snapshot(directory, version):
+    """Memory-mapped datasets of one snapshot version, shared by every session of this process"""
+    return get_snapshot_store(directory).open(version)
+
+def load_datasets(scheduler, serp_sheet_id):
+    """Processed SERP and LLM data as (df, latest_serp, llm_df, latest_llm).
+    
+    With the snapshot_dir setting, every dashboard process on the host maps the
+    same snapshot. Once it is older than snapshot_max_age seconds, the process
+    that gets the refresh lock fetches while the others keep serving the
+    current one; it publishes a new version only if the data changed.
+    """
+    def fetch():
+        with instrumentation.span('load.serp', cached=True) as span:
+            serp_raw = load_data_from_google_sheets(scheduler.versions.get(serp_sheet_id, 0))
+            span.rows = len(serp_raw)
+        with instrumentation.span('preprocess.serp', rows=len(serp_raw), cached=True):
+            df, latest_serp = preprocess_serp_data(serp_raw)
+        with instrumentation.span('load.llm', cached=True) as span:
+            llm_raw = load_llm_data()
+            span.rows = len(llm_raw)
+        with instrumentation.span('preprocess.llm', rows=len(llm_raw), cached=True):
+            llm_df, latest_llm = preprocess_llm_data(llm_raw)
+        return df, latest_serp, llm_df, latest_llm
+    
+    directory = get_setting('snapshot_dir', '')
+    if not directory:
+        return fetch()
+    
+    store = get_snapshot_store(directory)
+    max_age = float(get_setting('snapshot_max_age', 60))
+    version = store.current()
+    if store.age(version) > max_age:
+        # With no snapshot yet, wait for the process that is fetching one
+        with store.refresh_lock(blocking=version is None) as acquired:
+            current = store.current()
+            if acquired and store.age(current) > max_age:
+                datasets = fetch()
+                if datasets[0].empty and datasets[2].empty:
+                    # Nothing loaded; keep serving the last snapshot, if any
+                    if current is None:
+                        return datasets
+                else:
+                    current = store.publish(dict(zip(SNAPSHOT_DATASETS, datasets)))
+            version = current
+    
+    with instrumentation.span('snapshot.open', cached=True) as span:
+        frames = open_snapshot(directory, version)
+        span.rows = len(frames['serp']) + len(frames['llm'])
+    return tuple(frames[name] for name in SNAPSHOT_DATASETS)
+
+@st.cache_resource
+def get_result_cache(path, max_mb):
+    """Derived-view cache shared by the dashboard processes on this host"""
+    return result_cache.ResultCache(path, int(max_mb * 1024 * 1024))
+
+def shared_result_cache():
+    """The result cache next to the shared snapshot, or None when it is disabled"""
+    directory = get_setting('snapshot_dir', '')
+    max_mb = float(get_setting('result_cache_mb', 256))
+    if not directory or max_mb <= 0:
+        return None
+    return get_result_cache(os.path.join(directory, 'results.sqlite'), max_mb)
+
+@st.cache_data(max_entries=64, show_spinner=False)
+@instrumentation.on_miss
+def compute_view(view, version, params, _compute):
+    """Process-local result of a view, keyed by the data version and the filter values"""
+    return _compute()
+
+def cached_view(view, dataset, params, compute):
+    """``compute()`` cached under the version of ``dataset``, the frame the view is computed from.
+    
+    ``params`` must hold every filter value the view depends on. Snapshot
+    versions are shared across processes, so their results go through the
+    shared result cache; otherwise the preprocessing token keeps the result in
+    this process. Neither path hashes the frame itself.
+    """
+    snapshot_version = dataset.attrs.get('snapshot_version')
+    data_version = dataset.attrs.get('data_version')
+    cache = shared_result_cache()
+    with instrumentation.span(f'view.{view}', rows=len(dataset), cached=True):
+        if snapshot_version is not None and cache is not None:
+            return cache.get_or_compute(snapshot_version, view, params, instrumentation.on_miss(compute))
+        version = snapshot_version or data_version
+        if version is None:
+            return compute()
+        return compute_view(view, version, params, compute)
+
 def create_metric_card(title, value, change=None, format_as_percent=False):
     """Create a metric card component"""
     change_class = ""
@@ -608,23 +1208,144 @@ def create_metric_card(title, value, change=None, format_as_percent=False):
     </div>
     """
 
-def show_executive_dashboard(df_processed):
-    """Executive-level dashboard view"""
+# Cells such as "#3", "+2" or "12.5", which sort by their number
+NUMBER_CELL = r'^\s*[#+]?(-?\d+(?:\.\d+)?)\s*$'
+
+def table_sort_key(column):
+    """Sort key of a table column: numeric when most cells are numbers (labels last), else case-insensitive text"""
+    if pd.api.types.is_numeric_dtype(column):
+        return column
+    text = column.astype('string')
+    numbers = pd.to_numeric(text.str.extract(NUMBER_CELL, expand=False), errors='coerce')
+    if numbers.notna().sum() * 2 >= text.notna().sum() > 0:
+        return numbers
+    return text.str.lower()
+
+# Page sections with widgets of their own run as fragments: changing one of
+# their widgets reruns only that section, with the inputs of the last full run.
+# Streamlit < 1.33 has no fragments, so there they run as plain functions
+fragment = getattr(st, 'fragment', None) or getattr(st, 'experimental_fragment', None) or (lambda fn: fn)
+
+def paginated_table(df, key, page_size=50, column_config=None):
+    """Show ``df`` one page at a time.
     
-    if df_processed.empty:
-        st.error("No data available. Please check Google Sheets connectivity.")
-        return
+    Filtering, sorting and slicing happen here, so only the rows of the visible
+    page (and the columns of ``df``) are sent to the browser, however large the
+    table is. Call it from a fragment, so its controls rerun only that section.
+    """
+    controls = st.columns([3, 2, 1, 1, 1])
+    with controls[0]:
+        search = st.text_input("Filter rows", placeholder="Type to filter...", key=f"{key}_search")
+    with controls[1]:
+        sort_column = st.selectbox("Sort by", ['(default)'] + list(df.columns), key=f"{key}_sort")
+    with controls[2]:
+        descending = st.checkbox("Descending", key=f"{key}_descending")
+    with controls[3]:
+        rows_per_page = st.selectbox("Rows", [page_size, page_size * 2, page_size * 4], key=f"{key}_page_size")
+    
+    rows = df
+    if search:
+        text_columns = [column for column in df.columns
+                        if not pd.api.types.is_numeric_dtype(df[column]) and not pd.api.types.is_datetime64_any_dtype(df[column])]
+        matches = np.zeros(len(df), dtype=bool)
+        for column in text_columns:
+            matches |= df[column].astype('string').str.contains(search, case=False, regex=False, na=False).to_numpy(dtype=bool)
+        rows = df[matches]
+    
+    if sort_column != '(default)':
+        rows = rows.sort_values(sort_column, ascending=not descending, na_position='last', key=table_sort_key)
+    elif descending:
+        rows = rows.iloc[::-1]
+    
+    page_count = max(1, -(-len(rows) // rows_per_page))
+    page_key = f"{key}_page"
+    if st.session_state.get(page_key, 1) > page_count:
+        # Filtering left fewer pages than the one shown
+        st.session_state[page_key] = page_count
+    with controls[4]:
+        page = st.number_input("Page", min_value=1, max_value=page_count, step=1, key=page_key)
+    
+    start = (page - 1) * rows_per_page
+    page_rows = rows.iloc[start:start + rows_per_page]
+    st.dataframe(
+        page_rows,
+        use_container_width=True,
+        hide_index=True,
+        height=min(600, 35 * (len(page_rows) + 1) + 3),
+        column_config=column_config
+    )
+    if len(rows):
+        st.caption(f"Rows {start + 1:,}–{start + len(page_rows):,} of {len(rows):,}"
+                   + (f" (filtered from {len(df):,})" if len(rows) != len(df) else ""))
+    else:
+        st.caption(f"No rows match '{search}'")
+    return rows
+
+def build_executive_summary(latest_data):
+    """Compute the executive page metrics, chart data and keyword table from the current state"""
+    positions = latest_data['Recharge Position']
+    top_3 = int(positions.between(1, 3).sum())
     
-    # Process data
-    df_processed['DateTime'] = df_processed['Date/Time'].apply(parse_excel_datetime)
-    df_processed = df_processed.dropna(subset=['DateTime'])
+    first_page = int(positions.between(1, 10).sum())
     
-    if df_processed.empty:
-        st.error("No valid data found after processing.")
+    ai_coverage = len(latest_data[latest_data['AI Overview'].apply(has_ai_overview)]) if 'AI Overview' in latest_data.columns else 0
+    
+    position_data = {
+        'Top 3': top_3,
+        'Positions 4-10': int(positions.between(4, 10).sum()),
+        'Not Ranking': int(positions.isna().sum())
+    }
+    
+    market_performance = None
+    if 'Market' in latest_data.columns:
+        market_performance = latest_data.groupby('Market')['Recharge Position'].mean().reset_index()
+        market_performance.columns = ['Market', 'Avg_Position']
+        market_performance = market_performance.dropna()
+    
+    # Create display dataframe from just the columns the table is built from
+    source_columns = ['Keyword', 'Market', 'Recharge Position', 'AI Overview', 'Position Change']
+    display_df = latest_data[[col for col in source_columns if col in latest_data.columns]].copy()
+    
+    # Format columns for display
+    display_df['Position'] = display_df['Recharge Position'].apply(
+        lambda x: get_position_status(x)[0]
+    )
+    
+    display_df['AI Overview Status'] = display_df['AI Overview'].apply(
+        lambda x: '✅ Present' if has_ai_overview(x) else '❌ Missing'
+    ) if 'AI Overview' in display_df.columns else '❓ Unknown'
+    
+    display_df['Change'] = display_df.get('Position Change', 'Unknown')
+    
+    # Select columns for display
+    columns_to_show = ['Keyword', 'Market', 'Position', 'Change', 'AI Overview Status']
+    available_columns = [col for col in columns_to_show if col in display_df.columns or col in ['Position', 'AI Overview Status', 'Change']]
+    
+    table_df = None
+    if available_columns:
+        table_df = display_df[['Keyword', 'Market'] + [col for col in available_columns if col not in ['Keyword', 'Market']]]
+    
+    return {
+        'total_keywords': len(latest_data),
+        'top_3': top_3,
+        'first_page': first_page,
+        'ai_coverage': ai_coverage,
+        'position_data': position_data,
+        'market_performance': market_performance,
+        'table_df': table_df
+    }
+
+@instrumentation.timed('page.executive')
+def show_executive_dashboard(latest_data):
+    """Executive-level dashboard view, rendered from the current-state table"""
+    
+    if latest_data.empty:
+        st.error("No data available. Please check Google Sheets connectivity.")
         return
     
-    # Get latest data for each keyword
-    latest_data = df_processed.sort_values('DateTime').groupby('Keyword').tail(1).reset_index(drop=True)
+    # Latest crawl run per keyword and market
+    latest_run = latest_data['Run_ID'].max()
+    behind_latest_run = int((latest_data['Run_ID'] != latest_run).sum())
     
     # Header
     st.markdown("""
@@ -634,20 +1355,23 @@ def show_executive_dashboard(df_processed):
     </div>
     """, unsafe_allow_html=True)
     
+    latest_run_start = latest_data.loc[latest_data['Run_ID'] == latest_run, 'Run_Start'].iloc[0]
+    run_caption = f"Latest crawl run: {format_run_label(latest_run_start)}"
+    if behind_latest_run:
+        run_caption += f" · {behind_latest_run} keyword(s) missing from this run show their previous run"
+    st.caption(run_caption)
+    
+    instrumentation.section('executive.metrics')
+    
     # Key Metrics Row
     col1, col2, col3, col4 = st.columns(4)
     
     # Calculate metrics
-    total_keywords = len(latest_data)
-    top_3 = len(latest_data[latest_data['Recharge Position'].apply(
-        lambda x: isinstance(x, (int, float)) and 1 <= x <= 3
-    )])
-    
-    first_page = len(latest_data[latest_data['Recharge Position'].apply(
-        lambda x: isinstance(x, (int, float)) and 1 <= x <= 10
-    )])
-    
-    ai_coverage = len(latest_data[latest_data['AI Overview'].apply(has_ai_overview)]) if 'AI Overview' in latest_data.columns else 0
+    summary = cached_view('executive_summary', latest_data, (), lambda: build_executive_summary(latest_data))
+    total_keywords = summary['total_keywords']
+    top_3 = summary['top_3']
+    first_page = summary['first_page']
+    ai_coverage = summary['ai_coverage']
     
     with col1:
         st.markdown(create_metric_card("Total Keywords", total_keywords), unsafe_allow_html=True)
@@ -664,6 +1388,8 @@ def show_executive_dashboard(df_processed):
         ai_pct = round((ai_coverage/total_keywords*100)) if total_keywords > 0 else 0
         st.markdown(create_metric_card("AI Overview", f"{ai_coverage} ({ai_pct}%)"), unsafe_allow_html=True)
     
+    instrumentation.section('executive.charts')
+    
     # Charts Section
     st.markdown('<div class="section-title">📈 Performance Analytics</div>', unsafe_allow_html=True)
     
@@ -673,38 +1399,9 @@ def show_executive_dashboard(df_processed):
         # Position Distribution Chart
         st.markdown('<div class="chart-container">', unsafe_allow_html=True)
         
-        position_data = {
-            'Top 3': len(latest_data[latest_data['Recharge Position'].apply(
-                lambda x: isinstance(x, (int, float)) and 1 <= x <= 3
-            )]),
-            'Positions 4-10': len(latest_data[latest_data['Recharge Position'].apply(
-                lambda x: isinstance(x, (int, float)) and 4 <= x <= 10
-            )]),
-            'Not Ranking': len(latest_data[latest_data['Recharge Position'].apply(
-                lambda x: str(x).lower() in ['not ranking', 'lost', ''] or pd.isna(x)
-            )])
-        }
-        
-        fig_pie = px.pie(
-            values=list(position_data.values()),
-            names=list(position_data.keys()),
-            title="Search Position Distribution",
-            color_discrete_map={
-                'Top 3': '#22c55e',
-                'Positions 4-10': '#f59e0b', 
-                'Not Ranking': '#ef4444'
-            }
-        )
-        
-        fig_pie.update_layout(
-            height=350,
-            paper_bgcolor='rgba(0,0,0,0)',
-            plot_bgcolor='rgba(0,0,0,0)',
-            font_color='#f8fafc',
-            title_font_size=16,
-            title_font_color='#f8fafc'
-        )
+        position_data = summary['position_data']
         
+        fig_pie = position_distribution_figure(position_data)
         st.plotly_chart(fig_pie, use_container_width=True)
         st.markdown('</div>', unsafe_allow_html=True)
     
@@ -712,120 +1409,405 @@ def show_executive_dashboard(df_processed):
         # Market Performance Chart
         st.markdown('<div class="chart-container">', unsafe_allow_html=True)
         
-        if 'Market' in latest_data.columns:
-            market_performance = latest_data.groupby('Market').agg({
-                'Recharge Position': lambda x: x[x.apply(lambda y: isinstance(y, (int, float)))].mean()
-            }).reset_index()
-            market_performance.columns = ['Market', 'Avg_Position']
-            market_performance = market_performance.dropna()
-            
+        market_performance = summary['market_performance']
+        
+        if market_performance is not None:
             if not market_performance.empty:
-                fig_bar = px.bar(
-                    market_performance,
-                    x='Market',
-                    y='Avg_Position',
-                    title="Average Position by Market",
-                    color='Avg_Position',
-                    color_continuous_scale=['#22c55e', '#f59e0b', '#ef4444']
-                )
-                
-                fig_bar.update_layout(
-                    height=350,
-                    yaxis_title="Average Position (Lower is Better)",
-                    yaxis=dict(autorange="reversed"),
-                    paper_bgcolor='rgba(0,0,0,0)',
-                    plot_bgcolor='rgba(0,0,0,0)',
-                    font_color='#f8fafc',
-                    title_font_size=16,
-                    title_font_color='#f8fafc'
-                )
-                
+                fig_bar = market_position_figure(market_performance)
                 st.plotly_chart(fig_bar, use_container_width=True)
         
         st.markdown('</div>', unsafe_allow_html=True)
     
+    show_executive_keyword_table(summary['table_df'])
+
+@fragment
+@instrumentation.timed('executive.table')
+def show_executive_keyword_table(table_df):
+    """Paged keyword table of the executive page"""
     # Keywords Performance Table
     st.markdown('<div class="section-title">🎯 Keyword Performance Summary</div>', unsafe_allow_html=True)
     
-    if not latest_data.empty:
-        st.markdown('<div class="chart-container">', unsafe_allow_html=True)
-        
-        # Create display dataframe
-        display_df = latest_data.copy()
-        
-        # Format columns for display
-        display_df['Position'] = display_df['Recharge Position'].apply(
-            lambda x: get_position_status(x)[0]
-        )
-        
-        display_df['AI Overview Status'] = display_df['AI Overview'].apply(
-            lambda x: '✅ Present' if has_ai_overview(x) else '❌ Missing'
-        ) if 'AI Overview' in display_df.columns else '❓ Unknown'
-        
-        display_df['Change'] = display_df.get('Position Change', 'Unknown')
-        
-        # Select columns for display
-        columns_to_show = ['Keyword', 'Market', 'Position', 'Change', 'AI Overview Status']
-        available_columns = [col for col in columns_to_show if col in display_df.columns or col in ['Position', 'AI Overview Status', 'Change']]
-        
-        if available_columns:
-            table_df = display_df[['Keyword', 'Market'] + [col for col in available_columns if col not in ['Keyword', 'Market']]]
-            st.dataframe(
-                table_df, 
-                use_container_width=True, 
-                hide_index=True,
-                height=400
-            )
-        
-        st.markdown('</div>', unsafe_allow_html=True)
+    st.markdown('<div class="chart-container">', unsafe_allow_html=True)
+    
+    if table_df is not None:
+        paginated_table(table_df, key="executive_keyword_table")
+    
+    st.markdown('</div>', unsafe_allow_html=True)
 
-def show_keyword_analysis(df_processed):
-    """Detailed keyword analysis view"""
+# Lines with more points than this are drawn with WebGL (Scattergl) instead of SVG
+WEBGL_MIN_POINTS = 500
+
+def chart_point_budget(width_fraction=1.0):
+    """Points a trend chart spanning ``width_fraction`` of the page draws per line set.
     
-    if df_processed.empty:
-        st.error("No data available.")
-        return
+    The chart_max_points setting (1000) is about one point per horizontal pixel
+    of a full-width chart; more points than pixels don't change what is drawn.
+    """
+    return max(3, int(float(get_setting('chart_max_points', 1000)) * width_fraction))
+
+def lttb_indices(x, y, threshold):
+    """Positions of the ``threshold`` points Largest-Triangle-Three-Buckets keeps of the line x/y"""
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    
+    # First and last points are kept; the inner points are split into threshold - 2 buckets
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    kept = np.empty(threshold, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_start, next_end = (edges[bucket + 1], edges[bucket + 2]) if bucket + 2 < len(edges) else (n - 1, n)
+        next_x, next_y = x[next_start:next_end].mean(), y[next_start:next_end].mean()
+        # Keep the point forming the largest triangle with the previous kept point and the next bucket's mean
+        area = np.abs((x[previous] - next_x) * (y[start:end] - y[previous])
+                      - (x[previous] - x[start:end]) * (next_y - y[previous]))
+        previous = start + int(area.argmax())
+        kept[bucket + 1] = previous
+    return kept
+
+def downsample_trend(df, x, y, max_points, by=None):
+    """Rows of ``df`` that draw its x/y line(s) with at most about ``max_points`` points (LTTB).
     
-    # Process datetime
-    df_processed['DateTime'] = df_processed['Date/Time'].apply(parse_excel_datetime)
-    df_processed = df_processed.dropna(subset=['DateTime'])
+    With ``by``, every line gets an equal share of the points (at least 3).
+    Rows without an x or y value are dropped, the rest are sorted by ``x``.
+    """
+    df = df.dropna(subset=[x, y]).sort_values(x, kind='stable')
+    if len(df) <= max_points:
+        return df
+    
+    groups = [df] if by is None else [group for _, group in df.groupby(by, sort=False)]
+    share = max(3, max_points // len(groups))
+    kept = []
+    for group in groups:
+        xs = group[x]
+        xs = (xs.astype('int64') if pd.api.types.is_datetime64_any_dtype(xs) else xs).to_numpy(dtype=float)
+        kept.append(group.iloc[lttb_indices(xs, group[y].to_numpy(dtype=float), share)])
+    return pd.concat(kept) if len(kept) > 1 else kept[0]
+
+def trend_line_style(point_count, line_shape='spline'):
+    """px.line arguments for a trend of ``point_count`` points.
     
-    # Header
-    st.markdown('<div class="section-title">🔍 Keyword Performance Analysis</div>', unsafe_allow_html=True)
+    Short histories keep markers and the given line shape. Long ones are drawn
+    with WebGL, which has no splines and where markers only add clutter.
+    """
+    if point_count > WEBGL_MIN_POINTS:
+        return dict(render_mode='webgl', markers=False, line_shape='linear')
+    return dict(markers=True, line_shape=line_shape)
+
+# Transparent backgrounds and light text, shared by every chart
+CHART_LAYOUT = dict(
+    paper_bgcolor='rgba(0,0,0,0)',
+    plot_bgcolor='rgba(0,0,0,0)',
+    font_color='#f8fafc',
+    title_font_color='#f8fafc'
+)
+
+# The figure builders below are memoized on their plot-ready inputs, which are
+# small and cheap to hash: an unchanged chart is a cache hit, and Streamlit only
+# serializes the shared figure (which must not be modified) instead of building
+# and validating it again.
+
+@st.cache_resource(max_entries=64, show_spinner=False)
+def position_distribution_figure(position_data):
+    """Pie of keywords in the top 3, on page one and not ranking"""
+    fig_pie = px.pie(
+        values=list(position_data.values()),
+        names=list(position_data.keys()),
+        title="Search Position Distribution",
+        color_discrete_map={
+            'Top 3': '#22c55e',
+            'Positions 4-10': '#f59e0b', 
+            'Not Ranking': '#ef4444'
+        }
+    )
     
-    # Keyword selector
-    if 'Keyword' in df_processed.columns:
-        available_keywords = sorted(df_processed['Keyword'].dropna().unique())
-        selected_keyword = st.selectbox(
-            "Select keyword to analyze:",
-            available_keywords,
-            key="keyword_selector"
-        )
-    else:
-        st.error("No keywords found in data")
-        return
+    fig_pie.update_layout(
+        height=350,
+        **CHART_LAYOUT,
+        title_font_size=16
+    )
     
-    if selected_keyword:
-        # Filter data for selected keyword
-        keyword_data = df_processed[df_processed['Keyword'] == selected_keyword].copy()
-        keyword_data = keyword_data.sort_values('DateTime')
-        
-        if keyword_data.empty:
-            st.error(f"No data found for keyword: {selected_keyword}")
-            return
-        
-        # Latest metrics
-        latest_row = keyword_data.iloc[-1]
-        
-        col1, col2, col3, col4 = st.columns(4)
-        
-        with col1:
-            current_pos = latest_row.get('Recharge Position', 'Unknown')
-            st.markdown(create_metric_card("Current Position", current_pos), unsafe_allow_html=True)
-        
-        with col2:
-            market = latest_row.get('Market', 'Unknown')
-            st.markdown(create_metric_card("Market", market), unsafe_allow_html=True)
+    return fig_pie
+
+@st.cache_resource(max_entries=64, show_spinner=False)
+def market_position_figure(market_performance):
+    """Bar chart of the average Recharge position per market"""
+    fig_bar = px.bar(
+        market_performance,
+        x='Market',
+        y='Avg_Position',
+        title="Average Position by Market",
+        color='Avg_Position',
+        color_continuous_scale=['#22c55e', '#f59e0b', '#ef4444']
+    )
+    
+    fig_bar.update_layout(
+        height=350,
+        yaxis_title="Average Position (Lower is Better)",
+        yaxis=dict(autorange="reversed"),
+        **CHART_LAYOUT,
+        title_font_size=16
+    )
+    
+    return fig_bar
+
+@st.cache_resource(max_entries=64, show_spinner=False)
+def position_history_figure(plot_data, selected_keyword):
+    """Recharge position history of one keyword"""
+    fig = px.line(
+        plot_data,
+        x='DateTime',
+        y='Position_Numeric',
+        title=f'Position History: {selected_keyword}',
+        **trend_line_style(len(plot_data))
+    )
+    
+    fig.update_layout(
+        height=400,
+        yaxis=dict(autorange="reversed", title="Search Position"),
+        xaxis_title="Date",
+        **CHART_LAYOUT
+    )
+    
+    # Add reference lines
+    fig.add_hline(y=3.5, line_dash="dash", line_color="rgba(34, 197, 94, 0.7)", 
+                 annotation_text="Top 3 Threshold")
+    fig.add_hline(y=10.5, line_dash="dash", line_color="rgba(245, 158, 11, 0.7)", 
+                 annotation_text="Page 1 Threshold")
+    
+    fig.update_traces(
+        line=dict(width=3, color='#22c55e'),
+        marker=dict(size=8, color='#22c55e')
+    )
+    
+    return fig
+
+@st.cache_resource(max_entries=64, show_spinner=False)
+def llm_position_distribution_figure(position_df):
+    """Bar chart of how often Recharge holds each LLM result position"""
+    fig_bar = px.bar(
+        position_df,
+        x='Position',
+        y='Frequency',
+        title="Recharge.com Position Distribution in LLM Results",
+        color='Frequency',
+        color_continuous_scale=['#ef4444', '#f59e0b', '#22c55e'][::-1]
+    )
+    
+    fig_bar.update_layout(
+        height=350,
+        showlegend=False,
+        **CHART_LAYOUT,
+        title_font_size=16
+    )
+    
+    return fig_bar
+
+@st.cache_resource(max_entries=64, show_spinner=False)
+def llm_country_figure(country_stats):
+    """Keywords and average Recharge position per country, on two y axes"""
+    fig = go.Figure()
+    
+    fig.add_trace(go.Bar(
+        name='Keywords',
+        x=country_stats.index,
+        y=country_stats['Keywords'],
+        yaxis='y',
+        marker_color='#3b82f6',
+        text=country_stats['Keywords'],
+        textposition='auto',
+    ))
+    
+    fig.add_trace(go.Bar(
+        name='Avg Position',
+        x=country_stats.index,
+        y=country_stats['Avg Position'],
+        yaxis='y2',
+        marker_color='#f59e0b',
+        text=country_stats['Avg Position'],
+        textposition='auto',
+    ))
+    
+    fig.update_layout(
+        title="LLM Performance by Country",
+        height=350,
+        yaxis=dict(title='Keywords', side='left'),
+        yaxis2=dict(title='Avg Position', overlaying='y', side='right'),
+        **CHART_LAYOUT,
+        title_font_size=16,
+        showlegend=True,
+        legend=dict(x=0, y=1, bgcolor='rgba(0,0,0,0)')
+    )
+    
+    return fig
+
+@st.cache_resource(max_entries=64, show_spinner=False)
+def daily_position_figure(daily_avg):
+    """Average daily Recharge position"""
+    fig_daily = px.line(
+        x=daily_avg['Date'],
+        y=daily_avg['Position'],
+        title="Average Daily Position Trend",
+        labels={'x': 'Date', 'y': 'Average Position'},
+        **trend_line_style(len(daily_avg), line_shape='linear')
+    )
+    
+    fig_daily.update_traces(
+        line=dict(width=3, color='#22c55e'),
+        marker=dict(size=8)
+    )
+    
+    fig_daily.update_layout(
+        height=300,
+        yaxis=dict(autorange="reversed", title="Average Position"),
+        xaxis_title="Date",
+        **CHART_LAYOUT,
+        showlegend=False
+    )
+    
+    return fig_daily
+
+@st.cache_resource(max_entries=64, show_spinner=False)
+def daily_visibility_figure(daily_visibility):
+    """Daily share of results that are Recharge pages"""
+    fig_visibility = px.area(
+        x=daily_visibility['Date'],
+        y=daily_visibility['Visibility'],
+        title="Daily Visibility Rate (%)",
+        labels={'x': 'Date', 'y': 'Visibility (%)'}
+    )
+    
+    fig_visibility.update_traces(
+        fill='tozeroy',
+        line=dict(width=2, color='#3b82f6'),
+        fillcolor='rgba(59, 130, 246, 0.3)'
+    )
+    
+    fig_visibility.update_layout(
+        height=300,
+        yaxis=dict(title="Visibility (%)", range=[0, 100]),
+        xaxis_title="Date",
+        **CHART_LAYOUT,
+        showlegend=False
+    )
+    
+    return fig_visibility
+
+@st.cache_resource(max_entries=64, show_spinner=False)
+def llm_keyword_trend_figure(trend_data, keyword, show_all_results):
+    """LLM position trend of one keyword: every result URL, or just Recharge's best position"""
+    if show_all_results:
+        # Create line chart for multiple URLs
+        fig_trend = px.line(
+            trend_data,
+            x='Run_Start',
+            y='Position',
+            color='Result_URL',
+            title=f'Position Trends: {keyword}',
+            **trend_line_style(len(trend_data), line_shape='linear')
+        )
+        
+        # Customize traces
+        for trace in fig_trend.data:
+            if 'recharge.com' in trace.name.lower():
+                trace.line.width = 4
+                trace.line.color = '#f59e0b'
+                trace.name = '🔋 Recharge.com'
+            else:
+                trace.line.width = 2
+                trace.showlegend = False
+    else:
+        fig_trend = px.line(
+            trend_data,
+            x='Run_Start',
+            y='Position',
+            title=f'Recharge.com Position Trend: {keyword}',
+            **trend_line_style(len(trend_data))
+        )
+        
+        fig_trend.update_traces(
+            line=dict(width=3, color='#f59e0b'),
+            marker=dict(size=10, color='#f59e0b')
+        )
+    
+    fig_trend.update_layout(
+        height=400,
+        yaxis=dict(
+            autorange="reversed",
+            title="Search Position",
+            dtick=1,
+            range=[0.5, 10.5]
+        ),
+        xaxis_title="Date/Time",
+        **CHART_LAYOUT,
+        title_font_size=16,
+        hovermode='x unified'
+    )
+    
+    # Add reference lines
+    fig_trend.add_hline(
+        y=3.5, 
+        line_dash="dash", 
+        line_color="rgba(34, 197, 94, 0.5)",
+        annotation_text="Top 3"
+    )
+    
+    return fig_trend
+
+def build_position_history(keyword_data):
+    """Numeric Recharge position history of one keyword, for the trend chart"""
+    plot_data = keyword_data.copy()
+    plot_data['Position_Numeric'] = plot_data['Recharge Position']
+    return plot_data.dropna(subset=['Position_Numeric'])
+
+@instrumentation.timed('page.keyword_analysis')
+def show_keyword_analysis(df_processed):
+    """Detailed keyword analysis view"""
+    
+    if df_processed.empty:
+        st.error("No data available.")
+        return
+    
+    # Header
+    st.markdown('<div class="section-title">🔍 Keyword Performance Analysis</div>', unsafe_allow_html=True)
+    
+    # Keyword selector
+    if 'Keyword' in df_processed.columns:
+        available_keywords = sorted(df_processed['Keyword'].dropna().unique())
+        selected_keyword = st.selectbox(
+            "Select keyword to analyze:",
+            available_keywords,
+            key="keyword_selector"
+        )
+    else:
+        st.error("No keywords found in data")
+        return
+    
+    if selected_keyword:
+        # Filter data for selected keyword
+        keyword_data = df_processed[df_processed['Keyword'] == selected_keyword].copy()
+        keyword_data = keyword_data.sort_values('DateTime')
+        
+        if keyword_data.empty:
+            st.error(f"No data found for keyword: {selected_keyword}")
+            return
+        
+        instrumentation.section('keyword_analysis.metrics', rows=len(keyword_data))
+        
+        # Latest metrics
+        latest_row = keyword_data.iloc[-1]
+        
+        col1, col2, col3, col4 = st.columns(4)
+        
+        with col1:
+            current_pos = recharge_position_label(latest_row)
+            st.markdown(create_metric_card("Current Position", current_pos), unsafe_allow_html=True)
+        
+        with col2:
+            market = latest_row.get('Market', 'Unknown')
+            st.markdown(create_metric_card("Market", market), unsafe_allow_html=True)
         
         with col3:
             change = latest_row.get('Position Change', 'Unknown')
@@ -836,67 +1818,139 @@ def show_keyword_analysis(df_processed):
             ai_display = '✅ Present' if has_ai_overview(ai_status) else '❌ Missing'
             st.markdown(create_metric_card("AI Overview", ai_display), unsafe_allow_html=True)
         
+        instrumentation.section('keyword_analysis.trend', rows=len(keyword_data))
+        
         # Position trend chart
         st.markdown('<div class="section-title">📈 Position Trend</div>', unsafe_allow_html=True)
         st.markdown('<div class="chart-container">', unsafe_allow_html=True)
         
         # Create position trend
-        plot_data = keyword_data.copy()
-        plot_data['Position_Numeric'] = plot_data['Recharge Position'].apply(
-            lambda x: int(x) if isinstance(x, (int, float)) and not pd.isna(x) else None
-        )
-        plot_data = plot_data.dropna(subset=['Position_Numeric'])
+        plot_data = downsample_trend(build_position_history(keyword_data), 'DateTime', 'Position_Numeric',
+                                     chart_point_budget())
         
         if not plot_data.empty:
-            fig = px.line(
-                plot_data,
-                x='DateTime',
-                y='Position_Numeric',
-                title=f'Position History: {selected_keyword}',
-                markers=True,
-                line_shape='spline'
-            )
-            
-            fig.update_layout(
-                height=400,
-                yaxis=dict(autorange="reversed", title="Search Position"),
-                xaxis_title="Date",
-                paper_bgcolor='rgba(0,0,0,0)',
-                plot_bgcolor='rgba(0,0,0,0)',
-                font_color='#f8fafc',
-                title_font_color='#f8fafc'
-            )
-            
-            # Add reference lines
-            fig.add_hline(y=3.5, line_dash="dash", line_color="rgba(34, 197, 94, 0.7)", 
-                         annotation_text="Top 3 Threshold")
-            fig.add_hline(y=10.5, line_dash="dash", line_color="rgba(245, 158, 11, 0.7)", 
-                         annotation_text="Page 1 Threshold")
-            
-            fig.update_traces(
-                line=dict(width=3, color='#22c55e'),
-                marker=dict(size=8, color='#22c55e')
-            )
-            
+            fig = position_history_figure(plot_data[['DateTime', 'Position_Numeric']], selected_keyword)
             st.plotly_chart(fig, use_container_width=True)
         else:
             st.info("No numeric position data available for trend analysis.")
         
         st.markdown('</div>', unsafe_allow_html=True)
 
+def extract_serp_results(data_row, depth=5):
+    """Extract the top ``depth`` organic results of a keyword tab row, keyed by position"""
+    if data_row is None:
+        return {}
+    
+    results = {}
+    for i in range(1, depth + 1):
+        col_name = f'Position {i}'
+        if col_name in data_row and pd.notna(data_row[col_name]) and str(data_row[col_name]).strip():
+            url = str(data_row[col_name]).strip()
+            # Skip if it's just HTML tags or empty content
+            if url.startswith('<') or url in ['</div>', '<div>', '']:
+                continue
+                
+            try:
+                domain = urlparse(url).netloc.replace('www.', '')
+                # Extract title from URL or use domain
+                title = domain.split('.')[0].title() if domain else url[:50]
+                if not title:
+                    title = f"Result {i}"
+            except:
+                domain = url[:50] + "..." if len(url) > 50 else url
+                title = domain
+            
+            results[i] = {
+                'url': url,
+                'domain': domain,
+                'title': title,
+                'is_recharge': 'recharge.com' in url.lower()
+            }
+    return results
+
+def compute_serp_movements(serp1, serp2):
+    """Map every URL in either SERP to its baseline and comparison positions"""
+    url_movements = {}
+    all_urls = set()
+    
+    # Collect all URLs
+    for pos, result in serp1.items():
+        all_urls.add(result['url'])
+    for pos, result in serp2.items():
+        all_urls.add(result['url'])
+    
+    # Calculate movements
+    for url in all_urls:
+        pos1 = None
+        pos2 = None
+        
+        for pos, result in serp1.items():
+            if result['url'] == url:
+                pos1 = pos
+                break
+        
+        for pos, result in serp2.items():
+            if result['url'] == url:
+                pos2 = pos
+                break
+        
+        if pos1 is not None or pos2 is not None:
+            url_movements[url] = {'pos1': pos1, 'pos2': pos2}
+    
+    return url_movements
+
+SERP_DEPTHS = [5, 10, 20, 30, 50, 100]
+POSITION_COLUMN = re.compile(r'Position (\d+)')
+
+def serp_depth_options(df):
+    """Comparison depths up to the number of ``Position N`` columns in the keyword tabs"""
+    available = max((int(match.group(1)) for match in map(POSITION_COLUMN.fullmatch, map(str, df.columns)) if match),
+                    default=5)
+    return [depth for depth in SERP_DEPTHS if depth < available] + [available]
+
+def serp_result_html(position, url=None, title=None, css_class='', color='#64748b', badges='',
+                     url_style='', row_style=''):
+    """One SERP result row as single-line HTML; an empty slot when ``url`` is None.
+
+    Rows are joined into one ``st.markdown`` payload, so a column of 100 results
+    is a single delta; keeping each row on one line stops Markdown from reading
+    indented markup as a code block.
+    """
+    if url is None:
+        return (f'<div class="serp-result" style="opacity: 0.3;"><div class="position-number" style="background: #64748b;">{position}</div>'
+                '<div class="result-content"><div class="result-title">No result</div></div></div>')
+    
+    title_html = f'<div class="result-title">{html.escape(title)}</div>' if title else ''
+    row_attr = f' style="{row_style}"' if row_style else ''
+    url_attr = f' style="{url_style}"' if url_style else ''
+    return (f'<div class="serp-result {css_class}"{row_attr}>'
+            f'<div class="position-number" style="background: {color};">{position}</div>'
+            f'<div class="result-content">{title_html}<div class="result-url"{url_attr}>{html.escape(url)}</div>{badges}</div></div>')
+
+def serp_columns_html(columns):
+    """Side-by-side SERP columns as one HTML payload; ``columns`` holds (header, row markup list) pairs"""
+    return '<div class="serp-comparison">' + ''.join(
+        f'<div class="serp-column"><div class="serp-header">{header}</div>{"".join(rows)}</div>'
+        for header, rows in columns
+    ) + '</div>'
+
+@instrumentation.timed('page.serp_comparison')
+def keyword_run_rows(df, keyword, market=None):
+    """Last crawl of ``keyword`` (in ``market``, if given) within each crawl run, indexed by Run_ID"""
+    rows = df[df['Keyword'] == keyword]
+    if market is not None:
+        rows = rows[rows['Market'] == market]
+    return rows.dropna(subset=['Run_ID']).sort_values('DateTime').groupby('Run_ID').tail(1).set_index('Run_ID')
+
 def show_serp_comparison(df_processed):
-    """Professional SERP comparison view - Top 5 results only"""
+    """Professional SERP comparison view of the top N results of two crawl runs"""
     
     if df_processed.empty:
         st.error("No data available.")
         return
     
-    # Process datetime
-    df_processed['DateTime'] = df_processed['Date/Time'].apply(parse_excel_datetime)
-    df_processed = df_processed.dropna(subset=['DateTime'])
-    
     # Header
-    st.markdown('<div class="section-title">⚖️ SERP Results Comparison (Top 5)</div>', unsafe_allow_html=True)
+    st.markdown('<div class="section-title">⚖️ SERP Results Comparison</div>', unsafe_allow_html=True)
     
     # Keyword selector
     if 'Keyword' in df_processed.columns:
@@ -913,122 +1967,87 @@ def show_serp_comparison(df_processed):
     if not selected_keyword:
         return
     
-    # Get available datetimes for selected keyword
-    keyword_data = df_processed[df_processed['Keyword'] == selected_keyword].copy()
-    available_datetimes = sorted(keyword_data['DateTime'].dropna().unique())
+    # A keyword is crawled in several markets; only compare crawls of one
+    selected_market = None
+    if 'Market' in df_processed.columns:
+        available_markets = sorted(df_processed.loc[df_processed['Keyword'] == selected_keyword, 'Market']
+                                   .dropna().unique())
+        selected_market = st.selectbox(
+            "Select market:",
+            available_markets,
+            key="serp_comparison_market"
+        )
+    
+    # Crawl runs of the selected keyword and market
+    run_rows = keyword_run_rows(df_processed, selected_keyword, selected_market)
+    run_starts = run_rows['Run_Start']
+    available_runs = run_starts.index.tolist()
     
-    if len(available_datetimes) < 2:
+    if len(available_runs) < 2:
         st.warning("Need at least 2 data points for comparison.")
         return
     
-    # Date selectors
-    datetime_options = [(dt.strftime('%b %d, %Y at %I:%M %p'), dt) for dt in available_datetimes]
-    
-    col1, col2 = st.columns(2)
+    col1, col2, col3 = st.columns([2, 2, 1])
     
     with col1:
-        selected_dt1_display = st.selectbox(
+        selected_run1 = st.selectbox(
             "📅 Baseline Date:",
-            options=[opt[0] for opt in datetime_options],
+            options=available_runs,
+            format_func=lambda run_id: format_run_label(run_starts[run_id]),
             index=0,
             key="datetime1"
         )
-        selected_dt1 = next(opt[1] for opt in datetime_options if opt[0] == selected_dt1_display)
+        selected_dt1 = run_starts[selected_run1]
     
     with col2:
-        selected_dt2_display = st.selectbox(
+        selected_run2 = st.selectbox(
             "📅 Comparison Date:",
-            options=[opt[0] for opt in datetime_options],
-            index=len(datetime_options)-1,
+            options=available_runs,
+            format_func=lambda run_id: format_run_label(run_starts[run_id]),
+            index=len(available_runs)-1,
             key="datetime2"
         )
-        selected_dt2 = next(opt[1] for opt in datetime_options if opt[0] == selected_dt2_display)
+        selected_dt2 = run_starts[selected_run2]
     
-    if selected_dt1 == selected_dt2:
+    with col3:
+        depth = st.selectbox(
+            "🔢 Results:",
+            options=serp_depth_options(df_processed),
+            format_func=lambda n: f"Top {n}",
+            key="serp_comparison_depth"
+        )
+    
+    if selected_run1 == selected_run2:
         st.warning("Please select two different times for comparison.")
         return
     
-    # Get data for comparison
-    data1 = keyword_data[keyword_data['DateTime'] == selected_dt1].iloc[0] if not keyword_data[keyword_data['DateTime'] == selected_dt1].empty else None
-    data2 = keyword_data[keyword_data['DateTime'] == selected_dt2].iloc[0] if not keyword_data[keyword_data['DateTime'] == selected_dt2].empty else None
+    # Get data for comparison (last crawl of the keyword and market within each run)
+    data1 = run_rows.loc[selected_run1] if selected_run1 in run_rows.index else None
+    data2 = run_rows.loc[selected_run2] if selected_run2 in run_rows.index else None
     
     if data1 is None or data2 is None:
         st.error("No data found for selected times.")
         return
     
-    # Extract SERP results (Top 5 only)
-    def extract_serp_results(data_row):
-        if data_row is None:
-            return {}
-        
-        results = {}
-        for i in range(1, 6):  # Top 5 positions only
-            col_name = f'Position {i}'
-            if col_name in data_row and pd.notna(data_row[col_name]) and str(data_row[col_name]).strip():
-                url = str(data_row[col_name]).strip()
-                # Skip if it's just HTML tags or empty content
-                if url.startswith('<') or url in ['</div>', '<div>', '']:
-                    continue
-                    
-                try:
-                    domain = urlparse(url).netloc.replace('www.', '')
-                    # Extract title from URL or use domain
-                    title = domain.split('.')[0].title() if domain else url[:50]
-                    if not title:
-                        title = f"Result {i}"
-                except:
-                    domain = url[:50] + "..." if len(url) > 50 else url
-                    title = domain
-                
-                results[i] = {
-                    'url': url,
-                    'domain': domain,
-                    'title': title,
-                    'is_recharge': 'recharge.com' in url.lower()
-                }
-        return results
-    
-    serp1 = extract_serp_results(data1)
-    serp2 = extract_serp_results(data2)
+    # Extract SERP results (Top N)
+    serp1 = extract_serp_results(data1, depth)
+    serp2 = extract_serp_results(data2, depth)
     
     # Track URL movements for arrows
-    url_movements = {}
-    all_urls = set()
-    
-    # Collect all URLs
-    for pos, result in serp1.items():
-        all_urls.add(result['url'])
-    for pos, result in serp2.items():
-        all_urls.add(result['url'])
-    
-    # Calculate movements
-    for url in all_urls:
-        pos1 = None
-        pos2 = None
-        
-        for pos, result in serp1.items():
-            if result['url'] == url:
-                pos1 = pos
-                break
-        
-        for pos, result in serp2.items():
-            if result['url'] == url:
-                pos2 = pos
-                break
-        
-        if pos1 is not None or pos2 is not None:
-            url_movements[url] = {'pos1': pos1, 'pos2': pos2}
+    url_movements = compute_serp_movements(serp1, serp2)
     
     # Recharge position analysis
     recharge_pos1 = data1.get('Recharge Position', None)
     recharge_pos2 = data2.get('Recharge Position', None)
     
+    instrumentation.section('serp_comparison.overview')
+    
     # Overview metrics
     st.markdown(f'<div class="section-title">🔍 SERP Overview: {selected_keyword}</div>', unsafe_allow_html=True)
     
     col1, col2, col3, col4 = st.columns(4)
     
-    # Calculate changes (only for top 5)
+    # Calculate changes (only for top N)
     improved = sum(1 for url, moves in url_movements.items() 
                   if moves['pos1'] and moves['pos2'] and moves['pos1'] > moves['pos2'])
     declined = sum(1 for url, moves in url_movements.items() 
@@ -1070,22 +2089,24 @@ def show_serp_comparison(df_processed):
         </div>
         """, unsafe_allow_html=True)
     
+    instrumentation.section('serp_comparison.recharge')
+    
     # Recharge.com Position Tracking
     st.markdown('<div class="section-title">🔋 Recharge.com Position Analysis</div>', unsafe_allow_html=True)
     
     col1, col2, col3 = st.columns(3)
     
     with col1:
-        pos1_display = f"#{int(recharge_pos1)}" if isinstance(recharge_pos1, (int, float)) else "Not Ranking"
+        pos1_display = f"#{int(recharge_pos1)}" if pd.notna(recharge_pos1) else "Not Ranking"
         st.markdown(create_metric_card("Baseline Position", pos1_display), unsafe_allow_html=True)
     
     with col2:
-        pos2_display = f"#{int(recharge_pos2)}" if isinstance(recharge_pos2, (int, float)) else "Not Ranking"
+        pos2_display = f"#{int(recharge_pos2)}" if pd.notna(recharge_pos2) else "Not Ranking"
         st.markdown(create_metric_card("Current Position", pos2_display), unsafe_allow_html=True)
     
     with col3:
-        if isinstance(recharge_pos1, (int, float)) and isinstance(recharge_pos2, (int, float)):
-            change = recharge_pos1 - recharge_pos2
+        if pd.notna(recharge_pos1) and pd.notna(recharge_pos2):
+            change = int(recharge_pos1 - recharge_pos2)
             if change > 0:
                 change_text = f"📈 +{change}"
                 change_color = "#22c55e"
@@ -1106,110 +2127,77 @@ def show_serp_comparison(df_processed):
         </div>
         """, unsafe_allow_html=True)
     
-    # Side-by-side SERP comparison (Top 5 only)
-    st.markdown('<div class="section-title">🔍 Top 5 SERP Results Comparison</div>', unsafe_allow_html=True)
+    instrumentation.section('serp_comparison.results', rows=depth)
     
-    # Create side-by-side comparison using columns
-    col_left, col_right = st.columns(2)
+    # Side-by-side SERP comparison (Top N), rendered as one payload
+    st.markdown(f'<div class="section-title">🔍 Top {depth} SERP Results Comparison</div>', unsafe_allow_html=True)
     
-    with col_left:
-        st.markdown(f"""
-        <div class="serp-column">
-            <div class="serp-header">📅 {selected_dt1.strftime('%b %d, %Y at %I:%M %p')}</div>
-        """, unsafe_allow_html=True)
+    # Baseline SERP results
+    baseline_rows = []
+    for position in range(1, depth + 1):
+        result = serp1.get(position)
+        if result is None:
+            baseline_rows.append(serp_result_html(position))
+            continue
         
-        # Show baseline SERP results (Top 5)
-        for position in range(1, 6):
-            if position in serp1:
-                result = serp1[position]
-                result_class = "recharge" if result['is_recharge'] else ""
-                position_color = "#f59e0b" if result['is_recharge'] else "#64748b"
-                
-                st.markdown(f"""
-                <div class="serp-result {result_class}">
-                    <div class="position-number" style="background: {position_color};">
-                        {position}
-                    </div>
-                    <div class="result-content">
-                        <div class="result-title">{result['title']}</div>
-                        <div class="result-url">{result['url'][:60]}{'...' if len(result['url']) > 60 else ''}</div>
-                        {'<span class="result-badge badge-recharge">🔋 Recharge.com</span>' if result['is_recharge'] else ''}
-                    </div>
-                </div>
-                """, unsafe_allow_html=True)
-            else:
-                st.markdown(f"""
-                <div class="serp-result" style="opacity: 0.3;">
-                    <div class="position-number" style="background: #64748b;">
-                        {position}
-                    </div>
-                    <div class="result-content">
-                        <div class="result-title">No result</div>
-                    </div>
-                </div>
-                """, unsafe_allow_html=True)
-        
-        st.markdown("</div>", unsafe_allow_html=True)
-    
-    with col_right:
-        st.markdown(f"""
-        <div class="serp-column">
-            <div class="serp-header">📅 {selected_dt2.strftime('%b %d, %Y at %I:%M %p')}</div>
-        """, unsafe_allow_html=True)
+        baseline_rows.append(serp_result_html(
+            position,
+            f"{result['url'][:60]}{'...' if len(result['url']) > 60 else ''}",
+            result['title'],
+            css_class="recharge" if result['is_recharge'] else "",
+            color="#f59e0b" if result['is_recharge'] else "#64748b",
+            badges='<span class="result-badge badge-recharge">🔋 Recharge.com</span>' if result['is_recharge'] else ''
+        ))
+    
+    # Comparison SERP results with change indicators
+    comparison_rows = []
+    for position in range(1, depth + 1):
+        result = serp2.get(position)
+        if result is None:
+            comparison_rows.append(serp_result_html(position))
+            continue
         
-        # Show comparison SERP results with change indicators (Top 5)
-        for position in range(1, 6):
-            if position in serp2:
-                result = serp2[position]
-                url = result['url']
-                movement = url_movements.get(url, {})
-                pos1 = movement.get('pos1')
-                pos2 = movement.get('pos2')
-                
-                # Determine change type and styling
-                if pos1 is None:
-                    change_class = "new"
-                    change_text = "🆕 NEW"
-                    change_color = "#3b82f6"
-                elif pos1 and pos2 and pos1 > pos2:
-                    change_class = "improved"
-                    change_text = f"📈 +{pos1 - pos2}"
-                    change_color = "#22c55e"
-                elif pos1 and pos2 and pos1 < pos2:
-                    change_class = "declined"
-                    change_text = f"📉 -{pos2 - pos1}"
-                    change_color = "#ef4444"
-                else:
-                    change_class = "recharge" if result['is_recharge'] else ""
-                    change_text = ""
-                    change_color = "#f59e0b" if result['is_recharge'] else "#64748b"
-                
-                st.markdown(f"""
-                <div class="serp-result {change_class}">
-                    <div class="position-number" style="background: {change_color};">
-                        {position}
-                    </div>
-                    <div class="result-content">
-                        <div class="result-title">{result['title']}</div>
-                        <div class="result-url">{result['url'][:60]}{'...' if len(result['url']) > 60 else ''}</div>
-                        {'<span class="result-badge badge-recharge">🔋 Recharge.com</span>' if result['is_recharge'] else ''}
-                        {f'<span class="result-badge badge-{change_class}">{change_text}</span>' if change_text else ''}
-                    </div>
-                </div>
-                """, unsafe_allow_html=True)
-            else:
-                st.markdown(f"""
-                <div class="serp-result" style="opacity: 0.3;">
-                    <div class="position-number" style="background: #64748b;">
-                        {position}
-                    </div>
-                    <div class="result-content">
-                        <div class="result-title">No result</div>
-                    </div>
-                </div>
-                """, unsafe_allow_html=True)
-        
-        st.markdown("</div>", unsafe_allow_html=True)
+        movement = url_movements.get(result['url'], {})
+        pos1 = movement.get('pos1')
+        pos2 = movement.get('pos2')
+        
+        # Determine change type and styling
+        if pos1 is None:
+            change_class = "new"
+            change_text = "🆕 NEW"
+            change_color = "#3b82f6"
+        elif pos1 and pos2 and pos1 > pos2:
+            change_class = "improved"
+            change_text = f"📈 +{pos1 - pos2}"
+            change_color = "#22c55e"
+        elif pos1 and pos2 and pos1 < pos2:
+            change_class = "declined"
+            change_text = f"📉 -{pos2 - pos1}"
+            change_color = "#ef4444"
+        else:
+            change_class = "recharge" if result['is_recharge'] else ""
+            change_text = ""
+            change_color = "#f59e0b" if result['is_recharge'] else "#64748b"
+        
+        badges = '<span class="result-badge badge-recharge">🔋 Recharge.com</span>' if result['is_recharge'] else ''
+        if change_text:
+            badges += f'<span class="result-badge badge-{change_class}">{change_text}</span>'
+        
+        comparison_rows.append(serp_result_html(
+            position,
+            f"{result['url'][:60]}{'...' if len(result['url']) > 60 else ''}",
+            result['title'],
+            css_class=change_class,
+            color=change_color,
+            badges=badges
+        ))
+    
+    st.markdown(serp_columns_html([
+        (f"📅 {selected_dt1.strftime('%b %d, %Y at %I:%M %p')}", baseline_rows),
+        (f"📅 {selected_dt2.strftime('%b %d, %Y at %I:%M %p')}", comparison_rows),
+    ]), unsafe_allow_html=True)
+    
+    instrumentation.section('serp_comparison.ai_overview')
     
     # AI Overview Comparison
     st.markdown('<div class="section-title">🤖 AI Overview Comparison</div>', unsafe_allow_html=True)
@@ -1256,212 +2244,166 @@ def show_serp_comparison(df_processed):
         
         st.markdown('</div>', unsafe_allow_html=True)
 
-def show_llm_position_tracking(llm_df):
-    """Show LLM/ChatGPT position tracking dashboard"""
+def apply_llm_filters(llm_df, selected_country, start_date, end_date, keyword_search):
+    """Apply the LLM page country, date range and keyword search filters"""
+    filtered_df = llm_df.copy()
     
-    if llm_df.empty:
-        st.error("No LLM data available.")
-        return
+    if selected_country != 'All':
+        filtered_df = filtered_df[filtered_df['Country'] == selected_country]
     
-    # Header
-    st.markdown("""
-    <div class="dashboard-header">
-        <h1>🤖 LLM Position Tracking</h1>
-        <p>Recharge.com visibility in AI-powered search results</p>
-    </div>
-    """, unsafe_allow_html=True)
+    if start_date and end_date:
+        # Convert dates to datetime for comparison
+        start_datetime = pd.Timestamp(start_date)
+        end_datetime = pd.Timestamp(end_date) + pd.Timedelta(days=1) - pd.Timedelta(seconds=1)
+        
+        mask = (filtered_df['DateTime'] >= start_datetime) & (filtered_df['DateTime'] <= end_datetime)
+        filtered_df = filtered_df[mask]
     
-    # Parse dates for filtering
-    llm_df['DateTime'] = pd.to_datetime(llm_df['Date'], errors='coerce')
-    llm_df['DateTime'] = llm_df['DateTime'].fillna(pd.to_datetime(llm_df['Time'], errors='coerce'))
+    if keyword_search:
+        filtered_df = filtered_df[
+            filtered_df['Keyword'].str.contains(keyword_search, case=False, na=False)
+        ]
     
-    # Filters Section
-    st.markdown('<div class="section-title">🔧 Filters</div>', unsafe_allow_html=True)
+    return filtered_df
+
+def build_llm_keyword_summary(filtered_df, keywords):
+    """Latest Recharge position and run-over-run change per keyword"""
+    # Create summary by keyword
+    keyword_summary = []
+    
+    for keyword in keywords:
+        keyword_data = filtered_df[filtered_df['Keyword'] == keyword]
+        recharge_data = keyword_data[keyword_data['Result_URL'].str.contains('recharge.com', na=False, case=False)]
+        
+        # Best Recharge position per crawl run, oldest run first
+        run_positions = recharge_data.groupby('Run_ID')['Position'].min().sort_index()
+        
+        # Get latest position if multiple entries
+        latest_position = run_positions.iloc[-1] if not run_positions.empty else None
+        
+        # Calculate position change between the last two runs
+        position_change = None
+        if len(run_positions) >= 2:
+            latest = run_positions.iloc[-1]
+            previous = run_positions.iloc[-2]
+            position_change = previous - latest
+        
+        summary = {
+            'Keyword': keyword,
+            'Country': keyword_data['Country'].iloc[0] if not keyword_data.empty else 'Unknown',
+            'Total Results': len(keyword_data['Result_URL'].unique()),
+            'Recharge Position': latest_position,
+            'Change': f"+{position_change}" if position_change and position_change > 0 else f"{position_change}" if position_change else "-",
+            'Status': '✅ Ranking' if pd.notna(latest_position) else '❌ Not Ranking'
+        }
+        keyword_summary.append(summary)
     
-    filter_col1, filter_col2, filter_col3 = st.columns(3)
+    summary_df = pd.DataFrame(keyword_summary)
     
-    with filter_col1:
-        # Country Filter
-        available_countries = ['All'] + sorted(llm_df['Country'].dropna().unique().tolist())
-        selected_country = st.selectbox(
-            "🌍 Select Country",
-            available_countries,
-            key="llm_country_filter"
-        )
+    # Sort by Recharge Position (ranking first, then not ranking)
+    summary_df = summary_df.sort_values('Recharge Position', na_position='last')
     
-    with filter_col2:
-        # Date Range Filter
-        if not llm_df['DateTime'].isna().all():
-            min_date = llm_df['DateTime'].min()
-            max_date = llm_df['DateTime'].max()
-            
-            date_range = st.date_input(
-                "📅 Select Date Range",
-                value=(min_date, max_date),
-                min_value=min_date,
-                max_value=max_date,
-                key="llm_date_filter"
-            )
-            
-            # Handle single date selection
-            if isinstance(date_range, tuple) and len(date_range) == 2:
-                start_date, end_date = date_range
-            else:
-                start_date = end_date = date_range if not isinstance(date_range, tuple) else date_range[0]
-        else:
-            start_date = end_date = None
-    
-    with filter_col3:
-        # Keyword Search Filter
-        keyword_search = st.text_input(
-            "🔍 Search Keywords",
-            placeholder="Type to search...",
-            key="llm_keyword_search"
-        )
-    
-    # Apply filters
-    filtered_df = llm_df.copy()
-    
-    if selected_country != 'All':
-        filtered_df = filtered_df[filtered_df['Country'] == selected_country]
+    # Format the position column
+    summary_df['Recharge Position'] = summary_df['Recharge Position'].apply(
+        lambda x: f"#{int(x)}" if pd.notna(x) else 'Not Ranking'
+    )
     
-    if start_date and end_date:
-        # Convert dates to datetime for comparison
-        start_datetime = pd.Timestamp(start_date)
-        end_datetime = pd.Timestamp(end_date) + pd.Timedelta(days=1) - pd.Timedelta(seconds=1)
-        
-        mask = (filtered_df['DateTime'] >= start_datetime) & (filtered_df['DateTime'] <= end_datetime)
-        filtered_df = filtered_df[mask]
+    # Apply country flags
+    summary_df['Country'] = summary_df['Country'].apply(
+        lambda x: get_country_flag(x) if x != 'Unknown' else x
+    )
     
-    if keyword_search:
-        filtered_df = filtered_df[
-            filtered_df['Keyword'].str.contains(keyword_search, case=False, na=False)
+    return summary_df
+
+def build_position_matrix(latest_df, keywords):
+    """Top 5 result URLs and the Recharge position of each keyword's latest run"""
+    # Create matrix data for all keywords
+    matrix_data = []
+    
+    for keyword in sorted(keywords):
+        keyword_data = latest_df[latest_df['Keyword'] == keyword].copy()
+        
+        # Clean URLs in keyword data
+        keyword_data['Result_URL'] = keyword_data['Result_URL'].apply(clean_html_from_url)
+        
+        # Remove invalid URLs
+        keyword_data = keyword_data[
+            (keyword_data['Result_URL'].notna()) & 
+            (keyword_data['Result_URL'] != '') &
+            (keyword_data['Result_URL'].str.startswith('http'))
         ]
-    
-    # Filter for Recharge.com entries
-    recharge_df = filtered_df[filtered_df['Result_URL'].str.contains('recharge.com', na=False, case=False)].copy()
-    
-    # Get unique keywords
-    all_keywords = filtered_df['Keyword'].dropna().unique()
-    recharge_keywords = recharge_df['Keyword'].dropna().unique()
-    
-    # Key Metrics Row
-    col1, col2, col3, col4 = st.columns(4)
-    
-    with col1:
-        st.markdown(create_metric_card("Total Keywords", len(all_keywords)), unsafe_allow_html=True)
-    
-    with col2:
-        ranking_rate = round((len(recharge_keywords)/len(all_keywords)*100)) if len(all_keywords) > 0 else 0
-        st.markdown(create_metric_card("Recharge Visibility", f"{len(recharge_keywords)} ({ranking_rate}%)"), unsafe_allow_html=True)
-    
-    with col3:
-        # Top 3 positions for Recharge
-        top_3_keywords = recharge_df[recharge_df['Position'] <= 3]['Keyword'].nunique() if not recharge_df.empty else 0
-        st.markdown(create_metric_card("Top 3 Keywords", top_3_keywords), unsafe_allow_html=True)
-    
-    with col4:
-        # Average position
-        avg_position = round(recharge_df['Position'].mean(), 1) if not recharge_df.empty else 'N/A'
-        st.markdown(create_metric_card("Avg Position", avg_position), unsafe_allow_html=True)
-    
-    # Charts Section
-    st.markdown('<div class="section-title">📊 LLM Performance Analytics</div>', unsafe_allow_html=True)
-    
-    col1, col2 = st.columns(2)
-    
-    with col1:
-        # Position Distribution for Recharge
-        st.markdown('<div class="chart-container">', unsafe_allow_html=True)
         
-        if not recharge_df.empty:
-            position_counts = recharge_df['Position'].value_counts().sort_index()
-            
-            # Convert Series to DataFrame for plotly
-            position_df = pd.DataFrame({
-                'Position': position_counts.index,
-                'Frequency': position_counts.values
-            })
-            
-            fig_bar = px.bar(
-                position_df,
-                x='Position',
-                y='Frequency',
-                title="Recharge.com Position Distribution in LLM Results",
-                color='Frequency',
-                color_continuous_scale=['#ef4444', '#f59e0b', '#22c55e'][::-1]
-            )
-            
-            fig_bar.update_layout(
-                height=350,
-                showlegend=False,
-                paper_bgcolor='rgba(0,0,0,0)',
-                plot_bgcolor='rgba(0,0,0,0)',
-                font_color='#f8fafc',
-                title_font_size=16,
-                title_font_color='#f8fafc'
-            )
-            
-            st.plotly_chart(fig_bar, use_container_width=True)
-        else:
-            st.info("No Recharge.com entries found in LLM results")
+        # Keep the newest run when the keyword is tracked in several countries
+        if not keyword_data['Run_ID'].isna().all():
+            latest_run = keyword_data['Run_ID'].max()
+            keyword_data = keyword_data[keyword_data['Run_ID'] == latest_run]
         
-        st.markdown('</div>', unsafe_allow_html=True)
-    
-    with col2:
-        # Country Performance
-        st.markdown('<div class="chart-container">', unsafe_allow_html=True)
+        # Remove duplicates - keep only first URL for each position
+        keyword_data = keyword_data.drop_duplicates(subset=['Position'], keep='first')
         
-        if not recharge_df.empty and 'Country' in recharge_df.columns:
-            country_stats = recharge_df.groupby('Country').agg({
-                'Position': 'mean',
-                'Keyword': 'nunique'
-            }).round(1)
-            country_stats.columns = ['Avg Position', 'Keywords']
-            
-            # Create grouped bar chart
-            fig = go.Figure()
-            
-            fig.add_trace(go.Bar(
-                name='Keywords',
-                x=country_stats.index,
-                y=country_stats['Keywords'],
-                yaxis='y',
-                marker_color='#3b82f6',
-                text=country_stats['Keywords'],
-                textposition='auto',
-            ))
-            
-            fig.add_trace(go.Bar(
-                name='Avg Position',
-                x=country_stats.index,
-                y=country_stats['Avg Position'],
-                yaxis='y2',
-                marker_color='#f59e0b',
-                text=country_stats['Avg Position'],
-                textposition='auto',
-            ))
-            
-            fig.update_layout(
-                title="LLM Performance by Country",
-                height=350,
-                yaxis=dict(title='Keywords', side='left'),
-                yaxis2=dict(title='Avg Position', overlaying='y', side='right'),
-                paper_bgcolor='rgba(0,0,0,0)',
-                plot_bgcolor='rgba(0,0,0,0)',
-                font_color='#f8fafc',
-                title_font_size=16,
-                title_font_color='#f8fafc',
-                showlegend=True,
-                legend=dict(x=0, y=1, bgcolor='rgba(0,0,0,0)')
-            )
-            
-            st.plotly_chart(fig, use_container_width=True)
+        # Get top 5 positions
+        top_5 = keyword_data[keyword_data['Position'] <= 5].sort_values('Position')
+        
+        # Create row data
+        row_data = {
+            'Keyword': keyword,
+            'Country': get_country_flag(keyword_data['Country'].iloc[0]) if not keyword_data.empty else 'Unknown'
+        }
+        
+        # Add position columns with clean URLs only
+        for pos in range(1, 6):
+            pos_data = top_5[top_5['Position'] == pos]
+            if not pos_data.empty:
+                url = pos_data['Result_URL'].iloc[0]
+                # Show full URL, truncate if very long
+                row_data[f'Pos {pos}'] = url if len(url) <= 100 else url[:97] + "..."
+            else:
+                row_data[f'Pos {pos}'] = "-"
+        
+        # Add Recharge position
+        recharge_pos = keyword_data[
+            keyword_data['Result_URL'].str.contains('recharge.com', case=False, na=False)
+        ]['Position'].min()
+        
+        if pd.notna(recharge_pos):
+            row_data['Recharge Pos'] = f"#{int(recharge_pos)}"
         else:
-            st.info("No country data available")
+            row_data['Recharge Pos'] = "Not Ranking"
         
-        st.markdown('</div>', unsafe_allow_html=True)
+        matrix_data.append(row_data)
+    
+    # Create DataFrame
+    matrix_df = pd.DataFrame(matrix_data)
     
+    # Sort by Recharge position
+    matrix_df['Sort_Key'] = matrix_df['Recharge Pos'].apply(
+        lambda x: int(x.replace('#', '')) if x.startswith('#') else 999
+    )
+    matrix_df = matrix_df.sort_values('Sort_Key').drop('Sort_Key', axis=1)
+    
+    return matrix_df
+
+@contextlib.contextmanager
+def lazy_section(label, key):
+    """Collapsed expander that yields whether it is open, so a closed section skips its work.
+    
+    Opening or closing it reruns the script (or the enclosing fragment).
+    Streamlit versions whose expanders don't track state get an open expander
+    with a toggle instead.
+    """
+    try:
+        section = st.expander(label, key=key, on_change='rerun')
+        is_open = section.open
+    except TypeError:
+        section = st.expander(label, expanded=True)
+        is_open = section.toggle(f"Show {label.lower()}", key=key)
+    with section:
+        yield is_open
+
+@fragment
+@instrumentation.timed('llm.keyword_trend')
+def show_llm_keyword_trend(filtered_df, all_keywords):
+    """Position trend of one keyword over the filtered crawl runs"""
     # Individual Keyword Time Analysis
     st.markdown('<div class="section-title">📈 Keyword Position Trends Over Time</div>', unsafe_allow_html=True)
     
@@ -1497,28 +2439,9 @@ def show_llm_position_tracking(llm_df):
                 
                 if show_all_results:
                     # Show all top positions over time
-                    trend_data = keyword_trend_data.groupby(['DateTime', 'Result_URL'])['Position'].min().reset_index()
-                    
-                    # Create line chart for multiple URLs
-                    fig_trend = px.line(
-                        trend_data,
-                        x='DateTime',
-                        y='Position',
-                        color='Result_URL',
-                        title=f'Position Trends: {selected_keyword_for_trend}',
-                        markers=True,
-                        line_shape='linear'
-                    )
-                    
-                    # Customize traces
-                    for trace in fig_trend.data:
-                        if 'recharge.com' in trace.name.lower():
-                            trace.line.width = 4
-                            trace.line.color = '#f59e0b'
-                            trace.name = '🔋 Recharge.com'
-                        else:
-                            trace.line.width = 2
-                            trace.showlegend = False
+                    trend_data = keyword_trend_data.groupby(['Run_Start', 'Result_URL'])['Position'].min().reset_index()
+                    trend_data = downsample_trend(trend_data, 'Run_Start', 'Position', chart_point_budget(),
+                                                  by='Result_URL')
                 else:
                     # Show only Recharge.com positions
                     recharge_trend = keyword_trend_data[
@@ -1526,128 +2449,580 @@ def show_llm_position_tracking(llm_df):
                     ]
                     
                     if not recharge_trend.empty:
-                        trend_summary = recharge_trend.groupby('DateTime')['Position'].min().reset_index()
-                        
-                        fig_trend = px.line(
-                            trend_summary,
-                            x='DateTime',
-                            y='Position',
-                            title=f'Recharge.com Position Trend: {selected_keyword_for_trend}',
-                            markers=True,
-                            line_shape='spline'
-                        )
-                        
-                        fig_trend.update_traces(
-                            line=dict(width=3, color='#f59e0b'),
-                            marker=dict(size=10, color='#f59e0b')
-                        )
+                        trend_data = recharge_trend.groupby('Run_Start')['Position'].min().reset_index()
+                        trend_data = downsample_trend(trend_data, 'Run_Start', 'Position', chart_point_budget())
                     else:
                         st.info(f"Recharge.com not found in results for '{selected_keyword_for_trend}'")
-                        fig_trend = None
+                        trend_data = None
                 
-                if fig_trend:
-                    fig_trend.update_layout(
-                        height=400,
-                        yaxis=dict(
-                            autorange="reversed",
-                            title="Search Position",
-                            dtick=1,
-                            range=[0.5, 10.5]
-                        ),
-                        xaxis_title="Date/Time",
-                        paper_bgcolor='rgba(0,0,0,0)',
-                        plot_bgcolor='rgba(0,0,0,0)',
-                        font_color='#f8fafc',
-                        title_font_size=16,
-                        title_font_color='#f8fafc',
-                        hovermode='x unified'
-                    )
-                    
-                    # Add reference lines
-                    fig_trend.add_hline(
-                        y=3.5, 
-                        line_dash="dash", 
-                        line_color="rgba(34, 197, 94, 0.5)",
-                        annotation_text="Top 3"
-                    )
-                    
+                if trend_data is not None:
+                    fig_trend = llm_keyword_trend_figure(trend_data, selected_keyword_for_trend, show_all_results)
                     st.plotly_chart(fig_trend, use_container_width=True)
             else:
                 st.info("No time data available for this keyword")
             
             st.markdown('</div>', unsafe_allow_html=True)
-    
+
+@fragment
+@instrumentation.timed('llm.keyword_table')
+def show_llm_keyword_table(filtered_df, llm_df, llm_filters, all_keywords):
+    """Paged per-keyword summary of the filtered LLM results, with a CSV export"""
     # Keyword Performance Table
     st.markdown('<div class="section-title">🔍 Keyword-Level LLM Performance</div>', unsafe_allow_html=True)
     
-    if not filtered_df.empty:
+    with lazy_section("Keyword table", "llm_keyword_table_section") as table_open:
+        if table_open and not filtered_df.empty:
+            st.markdown('<div class="chart-container">', unsafe_allow_html=True)
+            
+            summary_df = cached_view('llm_keyword_summary', llm_df, llm_filters,
+                                     lambda: build_llm_keyword_summary(filtered_df, all_keywords))
+            
+            paginated_table(summary_df, key="llm_keyword_table")
+            
+            # Export button
+            csv = summary_df.to_csv(index=False)
+            st.download_button(
+                label="📥 Download CSV",
+                data=csv,
+                file_name=f"llm_position_tracking_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+                mime="text/csv"
+            )
+            
+            st.markdown('</div>', unsafe_allow_html=True)
+
+@fragment
+@instrumentation.timed('llm.position_matrix')
+def show_llm_position_matrix(filtered_df, latest_df, latest_llm, llm_filters, all_keywords):
+    """Paged top 5 results of every keyword in its latest run"""
+    # Compact Position Matrix View
+    st.markdown('<div class="section-title">📋 All Keywords Position Matrix (Top 5)</div>', unsafe_allow_html=True)
+    
+    with lazy_section("Position matrix", "llm_matrix_section") as matrix_open:
+        if matrix_open and not filtered_df.empty:
+            st.markdown('<div class="chart-container">', unsafe_allow_html=True)
+            
+            matrix_df = cached_view('llm_position_matrix', latest_llm, llm_filters,
+                                    lambda: build_position_matrix(latest_df, all_keywords))
+            
+            # Display the matrix with custom column configuration for better readability
+            paginated_table(
+                matrix_df,
+                key="llm_matrix_table",
+                column_config={
+                    "Keyword": st.column_config.TextColumn("Keyword", width="small"),
+                    "Country": st.column_config.TextColumn("Country", width="small"),
+                    "Pos 1": st.column_config.TextColumn("Position 1", width="large"),
+                    "Pos 2": st.column_config.TextColumn("Position 2", width="large"),
+                    "Pos 3": st.column_config.TextColumn("Position 3", width="large"),
+                    "Pos 4": st.column_config.TextColumn("Position 4", width="large"),
+                    "Pos 5": st.column_config.TextColumn("Position 5", width="large"),
+                    "Recharge Pos": st.column_config.TextColumn("Recharge", width="small")
+                }
+            )
+            
+            # Summary stats
+            col1, col2, col3 = st.columns(3)
+            
+            with col1:
+                ranking_count = len([x for x in matrix_df['Recharge Pos'] if x != 'Not Ranking'])
+                st.metric("Keywords with Recharge", f"{ranking_count}/{len(matrix_df)}")
+            
+            with col2:
+                top_3_count = len([x for x in matrix_df['Recharge Pos'] if x.startswith('#') and int(x[1:]) <= 3])
+                st.metric("In Top 3", top_3_count)
+            
+            with col3:
+                pos_1_count = len([x for x in matrix_df['Recharge Pos'] if x == '#1'])
+                st.metric("Position #1", pos_1_count)
+            
+            st.markdown('</div>', unsafe_allow_html=True)
+
+@fragment
+@instrumentation.timed('llm.position_rankings')
+def show_llm_position_rankings(filtered_df, latest_df, all_keywords):
+    """Every result position of one keyword, latest run or all runs"""
+    # Complete Position Rankings by Keyword
+    st.markdown('<div class="section-title">🎯 Complete Position Rankings by Keyword</div>', unsafe_allow_html=True)
+    
+    with lazy_section("All positions", "llm_rankings_section") as rankings_open:
+        if rankings_open and not filtered_df.empty:
+            # Keyword selector for detailed SERP view
+            col1, col2, col3, col4 = st.columns([2, 1, 1, 1])
+            
+            with col1:
+                selected_keyword_detail = st.selectbox(
+                    "Select keyword to see all positions:",
+                    sorted(all_keywords),
+                    key="llm_keyword_detail_selector"
+                )
+            
+            with col2:
+                max_positions = st.slider(
+                    "Show top N positions:",
+                    min_value=5,
+                    max_value=100,
+                    value=10,
+                    step=5,
+                    key="llm_max_positions"
+                )
+            
+            with col3:
+                show_latest_only = st.checkbox(
+                    "Latest results only",
+                    value=True,
+                    key="llm_latest_only",
+                    help="Show only the most recent results for this keyword"
+                )
+            
+            with col4:
+                show_full_urls = st.checkbox(
+                    "Show full URLs",
+                    value=True,
+                    key="llm_show_full_urls",
+                    help="Toggle between full URLs and domain names"
+                )
+            
+            if selected_keyword_detail:
+                st.markdown('<div class="chart-container">', unsafe_allow_html=True)
+                
+                # Filter data for selected keyword
+                detail_source = latest_df if show_latest_only else filtered_df
+                keyword_detail_data = detail_source[
+                    detail_source['Keyword'] == selected_keyword_detail
+                ].copy()
+                
+                if not keyword_detail_data.empty:
+                    # Get latest or all timestamps
+                    if show_latest_only and not keyword_detail_data['Run_ID'].isna().all():
+                        latest_run = keyword_detail_data['Run_ID'].max()
+                        keyword_detail_data = keyword_detail_data[
+                            keyword_detail_data['Run_ID'] == latest_run
+                        ]
+                        latest_time = keyword_detail_data['Run_Start'].iloc[0]
+                        display_time = latest_time.strftime('%B %d, %Y at %I:%M %p') if pd.notna(latest_time) else "Unknown"
+                    else:
+                        display_time = "All available data"
+                    
+                    # Get country for this keyword
+                    keyword_country = keyword_detail_data['Country'].iloc[0] if 'Country' in keyword_detail_data.columns else 'Unknown'
+                    
+                    # Create position summary
+                    st.markdown(f"**📍 Keyword:** `{selected_keyword_detail}` | **🌍 Country:** {get_country_flag(keyword_country)} | **🕐 Data:** {display_time}")
+                    
+                    # Clean and sort position data
+                    position_data = keyword_detail_data[
+                        keyword_detail_data['Position'] <= max_positions
+                    ].copy()
+                    
+                    # Clean URLs using the utility function
+                    position_data['Result_URL'] = position_data['Result_URL'].apply(clean_html_from_url)
+                    
+                    # Remove any rows with empty or invalid URLs after cleaning
+                    position_data = position_data[
+                        (position_data['Result_URL'].notna()) & 
+                        (position_data['Result_URL'] != '') &
+                        (position_data['Result_URL'].str.startswith('http'))
+                    ]
+                    
+                    # Remove duplicates - keep only first URL for each position
+                    position_data = position_data.drop_duplicates(subset=['Position'], keep='first')
+                    position_data = position_data.sort_values('Position')
+                    
+                    if not position_data.empty:
+                        # Create single column layout for better readability
+                        st.markdown("**Search Results:**")
+                        
+                        # Display positions in order - one URL per position, as one payload
+                        result_rows = []
+                        for entry in position_data[['Position', 'Result_URL']].itertuples(index=False):
+                            url = entry.Result_URL
+                            
+                            # Determine if it's Recharge
+                            is_recharge = 'recharge.com' in url.lower()
+                            
+                            # Choose display format based on toggle
+                            if show_full_urls:
+                                display_url = url
+                            else:
+                                try:
+                                    display_url = urlparse(url).netloc.replace('www.', '')
+                                    if not display_url:
+                                        display_url = url
+                                except:
+                                    display_url = url
+                            
+                            result_rows.append(serp_result_html(
+                                int(entry.Position),
+                                display_url,
+                                css_class="recharge" if is_recharge else "",
+                                color="#f59e0b" if is_recharge else "#64748b",
+                                url_style="word-break: break-all; font-size: 0.85rem;",
+                                row_style="margin-bottom: 0.75rem;"
+                            ))
+                        
+                        st.markdown(''.join(result_rows), unsafe_allow_html=True)
+                        
+                        # Summary statistics
+                        st.markdown("---")
+                        col_stat1, col_stat2, col_stat3 = st.columns(3)
+                        
+                        with col_stat1:
+                            recharge_pos = position_data[
+                                position_data['Result_URL'].str.contains('recharge.com', case=False, na=False)
+                            ]['Position'].min()
+                            
+                            if pd.notna(recharge_pos):
+                                st.metric("Recharge Position", f"#{int(recharge_pos)}")
+                            else:
+                                st.metric("Recharge Position", "Not Ranking")
+                        
+                        with col_stat2:
+                            total_results = len(position_data['Position'].unique())
+                            st.metric("Positions Shown", f"{total_results}/{max_positions}")
+                        
+                        with col_stat3:
+                            unique_domains = position_data['Result_URL'].apply(
+                                lambda x: urlparse(x).netloc.replace('www.', '') if x else ''
+                            ).nunique()
+                            st.metric("Unique Domains", unique_domains)
+                    
+                    else:
+                        st.info(f"No results found in top {max_positions} positions")
+                else:
+                    st.warning(f"No data available for keyword: {selected_keyword_detail}")
+                
+                st.markdown('</div>', unsafe_allow_html=True)
+
+@fragment
+@instrumentation.timed('llm.serp_comparison')
+def show_llm_serp_comparison(filtered_df, all_keywords):
+    """Side-by-side LLM results of one keyword in two crawl runs"""
+    # LLM SERP Comparison
+    st.markdown('<div class="section-title">⚖️ LLM SERP Comparison</div>', unsafe_allow_html=True)
+    
+    with lazy_section("Run comparison", "llm_comparison_section") as comparison_open:
+        if comparison_open and not filtered_df.empty and not filtered_df['DateTime'].isna().all():
+            # Keyword selector for comparison
+            comparison_keyword = st.selectbox(
+                "Select keyword for comparison:",
+                sorted(all_keywords),
+                key="llm_comparison_keyword"
+            )
+            
+            if comparison_keyword:
+                # Get data for selected keyword
+                comparison_data = filtered_df[filtered_df['Keyword'] == comparison_keyword].copy()
+                
+                # Clean URLs using the utility function
+                comparison_data['Result_URL'] = comparison_data['Result_URL'].apply(clean_html_from_url)
+                
+                # Remove invalid URLs
+                comparison_data = comparison_data[
+                    (comparison_data['Result_URL'].notna()) & 
+                    (comparison_data['Result_URL'] != '') &
+                    (comparison_data['Result_URL'].str.startswith('http'))
+                ]
+                
+                # Get available crawl runs
+                run_starts = comparison_data.dropna(subset=['Run_ID']).groupby('Run_ID')['Run_Start'].first()
+                available_times = run_starts.index.tolist()
+                
+                if len(available_times) >= 2:
+                    col1, col2 = st.columns(2)
+                    
+                    with col1:
+                        run1 = st.selectbox(
+                            "📅 Select first date/time:",
+                            available_times,
+                            format_func=lambda run_id: run_starts[run_id].strftime('%B %d, %Y at %I:%M %p'),
+                            key="llm_time1"
+                        )
+                    
+                    with col2:
+                        run2 = st.selectbox(
+                            "📅 Select second date/time:",
+                            available_times,
+                            format_func=lambda run_id: run_starts[run_id].strftime('%B %d, %Y at %I:%M %p'),
+                            index=len(available_times)-1,
+                            key="llm_time2"
+                        )
+                    
+                    time1 = run_starts[run1]
+                    time2 = run_starts[run2]
+                    
+                    if run1 != run2:
+                        # Get data for both runs
+                        data1 = comparison_data[comparison_data['Run_ID'] == run1].copy()
+                        data2 = comparison_data[comparison_data['Run_ID'] == run2].copy()
+                        
+                        # Remove duplicates - keep only first URL for each position
+                        data1 = data1.drop_duplicates(subset=['Position'], keep='first')
+                        data2 = data2.drop_duplicates(subset=['Position'], keep='first')
+                        
+                        # Track movements
+                        col1, col2, col3, col4 = st.columns(4)
+                        
+                        # Calculate changes
+                        urls1 = set(data1['Result_URL'].unique())
+                        urls2 = set(data2['Result_URL'].unique())
+                        
+                        improved = 0
+                        declined = 0
+                        new_entries = len(urls2 - urls1)
+                        lost_entries = len(urls1 - urls2)
+                        
+                        # Calculate position changes for common URLs
+                        for url in urls1.intersection(urls2):
+                            pos1 = data1[data1['Result_URL'] == url]['Position'].min()
+                            pos2 = data2[data2['Result_URL'] == url]['Position'].min()
+                            if pos2 < pos1:
+                                improved += 1
+                            elif pos2 > pos1:
+                                declined += 1
+                        
+                        with col1:
+                            st.markdown(f"""
+                            <div class="metric-card" style="border-left: 4px solid #22c55e;">
+                                <div class="metric-number" style="color: #22c55e;">{improved}</div>
+                                <div class="metric-label">📈 Improved</div>
+                            </div>
+                            """, unsafe_allow_html=True)
+                        
+                        with col2:
+                            st.markdown(f"""
+                            <div class="metric-card" style="border-left: 4px solid #ef4444;">
+                                <div class="metric-number" style="color: #ef4444;">{declined}</div>
+                                <div class="metric-label">📉 Declined</div>
+                            </div>
+                            """, unsafe_allow_html=True)
+                        
+                        with col3:
+                            st.markdown(f"""
+                            <div class="metric-card" style="border-left: 4px solid #3b82f6;">
+                                <div class="metric-number" style="color: #3b82f6;">{new_entries}</div>
+                                <div class="metric-label">🆕 New</div>
+                            </div>
+                            """, unsafe_allow_html=True)
+                        
+                        with col4:
+                            st.markdown(f"""
+                            <div class="metric-card" style="border-left: 4px solid #f59e0b;">
+                                <div class="metric-number" style="color: #f59e0b;">{lost_entries}</div>
+                                <div class="metric-label">❌ Lost</div>
+                            </div>
+                            """, unsafe_allow_html=True)
+                        
+                        # Side-by-side comparison of the top 10 results - one per position
+                        st.markdown("---")
+                        
+                        first_rows = []
+                        for entry in data1.sort_values('Position').head(10).itertuples(index=False):
+                            url = entry.Result_URL
+                            is_recharge = 'recharge.com' in url.lower()
+                            
+                            first_rows.append(serp_result_html(
+                                int(entry.Position),
+                                url,
+                                css_class='recharge' if is_recharge else '',
+                                color="#f59e0b" if is_recharge else "#64748b",
+                                url_style="font-size: 0.75rem; word-break: break-all;"
+                            ))
+                        
+                        second_rows = []
+                        first_positions = data1.groupby('Result_URL')['Position'].min()
+                        for entry in data2.sort_values('Position').head(10).itertuples(index=False):
+                            url = entry.Result_URL
+                            pos = entry.Position
+                            is_recharge = 'recharge.com' in url.lower()
+                            
+                            # Check if this URL moved
+                            change_indicator = ""
+                            change_color = "#64748b"
+                            if url in first_positions.index:
+                                old_pos = first_positions[url]
+                                if old_pos > pos:
+                                    change_indicator = f" ↑{int(old_pos - pos)}"
+                                    change_color = "#22c55e"
+                                elif old_pos < pos:
+                                    change_indicator = f" ↓{int(pos - old_pos)}"
+                                    change_color = "#ef4444"
+                            else:
+                                change_indicator = " (NEW)"
+                                change_color = "#3b82f6"
+                            
+                            second_rows.append(serp_result_html(
+                                int(pos),
+                                f"{url}{change_indicator}",
+                                css_class='recharge' if is_recharge else '',
+                                color="#f59e0b" if is_recharge else change_color,
+                                url_style=f"font-size: 0.75rem; word-break: break-all; color: {change_color if not is_recharge else '#f59e0b'};"
+                            ))
+                        
+                        st.markdown(serp_columns_html([
+                            (f"📅 {time1.strftime('%B %d, %Y at %I:%M %p')}", first_rows),
+                            (f"📅 {time2.strftime('%B %d, %Y at %I:%M %p')}", second_rows),
+                        ]), unsafe_allow_html=True)
+                    else:
+                        st.warning("Please select two different times for comparison")
+                else:
+                    st.info(f"Need at least 2 data points for comparison. Currently have {len(available_times)}")
+        elif comparison_open:
+            st.info("No temporal data available for comparison")
+
+@instrumentation.timed('page.llm')
+def show_llm_position_tracking(llm_df, latest_llm):
+    """Show LLM/ChatGPT position tracking dashboard"""
+    
+    if llm_df.empty:
+        st.error("No LLM data available.")
+        return
+    
+    # Header
+    st.markdown("""
+    <div class="dashboard-header">
+        <h1>🤖 LLM Position Tracking</h1>
+        <p>Recharge.com visibility in AI-powered search results</p>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    instrumentation.section('llm.filters')
+    
+    # Filters Section
+    st.markdown('<div class="section-title">🔧 Filters</div>', unsafe_allow_html=True)
+    
+    filter_col1, filter_col2, filter_col3 = st.columns(3)
+    
+    with filter_col1:
+        # Country Filter
+        available_countries = ['All'] + sorted(llm_df['Country'].dropna().unique().tolist())
+        selected_country = st.selectbox(
+            "🌍 Select Country",
+            available_countries,
+            key="llm_country_filter"
+        )
+    
+    with filter_col2:
+        # Date Range Filter
+        if not llm_df['DateTime'].isna().all():
+            min_date = llm_df['DateTime'].min()
+            max_date = llm_df['DateTime'].max()
+            
+            date_range = st.date_input(
+                "📅 Select Date Range",
+                value=(min_date, max_date),
+                min_value=min_date,
+                max_value=max_date,
+                key="llm_date_filter"
+            )
+            
+            # Handle single date selection
+            if isinstance(date_range, tuple) and len(date_range) == 2:
+                start_date, end_date = date_range
+            else:
+                start_date = end_date = date_range if not isinstance(date_range, tuple) else date_range[0]
+        else:
+            start_date = end_date = None
+    
+    with filter_col3:
+        # Keyword Search Filter
+        keyword_search = st.text_input(
+            "🔍 Search Keywords",
+            placeholder="Type to search...",
+            key="llm_keyword_search"
+        )
+    
+    # Apply filters
+    llm_filters = (selected_country, start_date, end_date, keyword_search)
+    filtered_df = apply_llm_filters(llm_df, *llm_filters)
+    
+    # Latest run per keyword: the maintained current-state table is valid as long
+    # as the date range reaches the newest crawl, otherwise derive it from the filtered history
+    if end_date is None or pd.Timestamp(end_date) >= llm_df['DateTime'].max().normalize():
+        latest_df = apply_llm_filters(latest_llm, selected_country, start_date, end_date, keyword_search)
+    else:
+        latest_df = select_latest_rows(filtered_df, LLM_STATE_KEYS, whole_run=True)
+    
+    # Filter for Recharge.com entries
+    recharge_df = filtered_df[filtered_df['Result_URL'].str.contains('recharge.com', na=False, case=False)].copy()
+    
+    # Get unique keywords
+    all_keywords = filtered_df['Keyword'].dropna().unique()
+    recharge_keywords = recharge_df['Keyword'].dropna().unique()
+    
+    instrumentation.section('llm.metrics', rows=len(filtered_df))
+    
+    # Key Metrics Row
+    col1, col2, col3, col4 = st.columns(4)
+    
+    with col1:
+        st.markdown(create_metric_card("Total Keywords", len(all_keywords)), unsafe_allow_html=True)
+    
+    with col2:
+        ranking_rate = round((len(recharge_keywords)/len(all_keywords)*100)) if len(all_keywords) > 0 else 0
+        st.markdown(create_metric_card("Recharge Visibility", f"{len(recharge_keywords)} ({ranking_rate}%)"), unsafe_allow_html=True)
+    
+    with col3:
+        # Top 3 positions for Recharge
+        top_3_keywords = recharge_df[recharge_df['Position'] <= 3]['Keyword'].nunique() if not recharge_df.empty else 0
+        st.markdown(create_metric_card("Top 3 Keywords", top_3_keywords), unsafe_allow_html=True)
+    
+    with col4:
+        # Average position
+        avg_position = round(recharge_df['Position'].mean(), 1) if not recharge_df.empty else 'N/A'
+        st.markdown(create_metric_card("Avg Position", avg_position), unsafe_allow_html=True)
+    
+    instrumentation.section('llm.charts', rows=len(recharge_df))
+    
+    # Charts Section
+    st.markdown('<div class="section-title">📊 LLM Performance Analytics</div>', unsafe_allow_html=True)
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        # Position Distribution for Recharge
         st.markdown('<div class="chart-container">', unsafe_allow_html=True)
         
-        # Create summary by keyword
-        keyword_summary = []
-        
-        for keyword in all_keywords:
-            keyword_data = filtered_df[filtered_df['Keyword'] == keyword]
-            recharge_data = keyword_data[keyword_data['Result_URL'].str.contains('recharge.com', na=False, case=False)]
-            
-            # Get latest position if multiple entries
-            latest_position = recharge_data.sort_values('DateTime', na_position='last')['Position'].iloc[-1] if not recharge_data.empty else None
+        if not recharge_df.empty:
+            position_counts = recharge_df['Position'].value_counts().sort_index()
             
-            # Calculate position change if we have time data
-            position_change = None
-            if not recharge_data.empty and len(recharge_data) > 1:
-                sorted_data = recharge_data.sort_values('DateTime', na_position='last')
-                if len(sorted_data) >= 2:
-                    latest = sorted_data['Position'].iloc[-1]
-                    previous = sorted_data['Position'].iloc[-2]
-                    position_change = previous - latest
+            # Convert Series to DataFrame for plotly
+            position_df = pd.DataFrame({
+                'Position': position_counts.index,
+                'Frequency': position_counts.values
+            })
             
-            summary = {
-                'Keyword': keyword,
-                'Country': keyword_data['Country'].iloc[0] if not keyword_data.empty else 'Unknown',
-                'Total Results': len(keyword_data['Result_URL'].unique()),
-                'Recharge Position': latest_position if latest_position else 'Not Ranking',
-                'Change': f"+{position_change}" if position_change and position_change > 0 else f"{position_change}" if position_change else "-",
-                'Status': '✅ Ranking' if latest_position else '❌ Not Ranking'
-            }
-            keyword_summary.append(summary)
-        
-        summary_df = pd.DataFrame(keyword_summary)
-        
-        # Sort by Recharge Position (ranking first, then not ranking)
-        summary_df['Sort_Key'] = summary_df['Recharge Position'].apply(
-            lambda x: x if isinstance(x, (int, float)) else 999
-        )
-        summary_df = summary_df.sort_values('Sort_Key').drop('Sort_Key', axis=1)
-        
-        # Format the position column
-        summary_df['Recharge Position'] = summary_df['Recharge Position'].apply(
-            lambda x: f"#{int(x)}" if isinstance(x, (int, float)) else x
-        )
-        
-        # Apply country flags
-        summary_df['Country'] = summary_df['Country'].apply(
-            lambda x: get_country_flag(x) if x != 'Unknown' else x
-        )
+            fig_bar = llm_position_distribution_figure(position_df)
+            st.plotly_chart(fig_bar, use_container_width=True)
+        else:
+            st.info("No Recharge.com entries found in LLM results")
         
-        st.dataframe(
-            summary_df,
-            use_container_width=True,
-            hide_index=True,
-            height=400
-        )
+        st.markdown('</div>', unsafe_allow_html=True)
+    
+    with col2:
+        # Country Performance
+        st.markdown('<div class="chart-container">', unsafe_allow_html=True)
         
-        # Export button
-        csv = summary_df.to_csv(index=False)
-        st.download_button(
-            label="📥 Download CSV",
-            data=csv,
-            file_name=f"llm_position_tracking_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-            mime="text/csv"
-        )
+        if not recharge_df.empty and 'Country' in recharge_df.columns:
+            country_stats = recharge_df.groupby('Country').agg({
+                'Position': 'mean',
+                'Keyword': 'nunique'
+            }).round(1)
+            country_stats.columns = ['Avg Position', 'Keywords']
+            
+            # Create grouped bar chart
+            fig = llm_country_figure(country_stats)
+            st.plotly_chart(fig, use_container_width=True)
+        else:
+            st.info("No country data available")
         
         st.markdown('</div>', unsafe_allow_html=True)
     
+    show_llm_keyword_trend(filtered_df, all_keywords)
+    
+    show_llm_keyword_table(filtered_df, llm_df, llm_filters, all_keywords)
+    
+    instrumentation.section('llm.top_keywords', rows=len(recharge_df))
+    
     # Top Performing Keywords
     st.markdown('<div class="section-title">🏆 Top Performing Keywords in LLM Results</div>', unsafe_allow_html=True)
     
@@ -1688,542 +3063,101 @@ def show_llm_position_tracking(llm_df):
             
             st.markdown('</div>', unsafe_allow_html=True)
     
-    # Compact Position Matrix View
-    st.markdown('<div class="section-title">📋 All Keywords Position Matrix (Top 5)</div>', unsafe_allow_html=True)
-    
-    if not filtered_df.empty:
-        st.markdown('<div class="chart-container">', unsafe_allow_html=True)
-        
-        # Create matrix data for all keywords
-        matrix_data = []
-        
-        for keyword in sorted(all_keywords):
-            keyword_data = filtered_df[filtered_df['Keyword'] == keyword].copy()
-            
-            # Clean URLs in keyword data
-            keyword_data['Result_URL'] = keyword_data['Result_URL'].apply(clean_html_from_url)
-            
-            # Remove invalid URLs
-            keyword_data = keyword_data[
-                (keyword_data['Result_URL'].notna()) & 
-                (keyword_data['Result_URL'] != '') &
-                (keyword_data['Result_URL'].str.startswith('http'))
-            ]
-            
-            # Get latest data if datetime available
-            if not keyword_data['DateTime'].isna().all():
-                latest_time = keyword_data['DateTime'].max()
-                keyword_data = keyword_data[keyword_data['DateTime'] == latest_time]
-            
-            # Remove duplicates - keep only first URL for each position
-            keyword_data = keyword_data.drop_duplicates(subset=['Position'], keep='first')
-            
-            # Get top 5 positions
-            top_5 = keyword_data[keyword_data['Position'] <= 5].sort_values('Position')
-            
-            # Create row data
-            row_data = {
-                'Keyword': keyword,
-                'Country': get_country_flag(keyword_data['Country'].iloc[0]) if not keyword_data.empty else 'Unknown'
-            }
-            
-            # Add position columns with clean URLs only
-            for pos in range(1, 6):
-                pos_data = top_5[top_5['Position'] == pos]
-                if not pos_data.empty:
-                    url = pos_data['Result_URL'].iloc[0]
-                    # Show full URL, truncate if very long
-                    row_data[f'Pos {pos}'] = url if len(url) <= 100 else url[:97] + "..."
-                else:
-                    row_data[f'Pos {pos}'] = "-"
-            
-            # Add Recharge position
-            recharge_pos = keyword_data[
-                keyword_data['Result_URL'].str.contains('recharge.com', case=False, na=False)
-            ]['Position'].min()
-            
-            if pd.notna(recharge_pos):
-                row_data['Recharge Pos'] = f"#{int(recharge_pos)}"
-            else:
-                row_data['Recharge Pos'] = "Not Ranking"
-            
-            matrix_data.append(row_data)
-        
-        # Create DataFrame
-        matrix_df = pd.DataFrame(matrix_data)
-        
-        # Sort by Recharge position
-        matrix_df['Sort_Key'] = matrix_df['Recharge Pos'].apply(
-            lambda x: int(x.replace('#', '')) if x.startswith('#') else 999
-        )
-        matrix_df = matrix_df.sort_values('Sort_Key').drop('Sort_Key', axis=1)
-        
-        # Display the matrix with custom column configuration for better readability
-        st.dataframe(
-            matrix_df,
-            use_container_width=True,
-            hide_index=True,
-            height=min(600, 40 * len(matrix_df) + 50),
-            column_config={
-                "Keyword": st.column_config.TextColumn("Keyword", width="small"),
-                "Country": st.column_config.TextColumn("Country", width="small"),
-                "Pos 1": st.column_config.TextColumn("Position 1", width="large"),
-                "Pos 2": st.column_config.TextColumn("Position 2", width="large"),
-                "Pos 3": st.column_config.TextColumn("Position 3", width="large"),
-                "Pos 4": st.column_config.TextColumn("Position 4", width="large"),
-                "Pos 5": st.column_config.TextColumn("Position 5", width="large"),
-                "Recharge Pos": st.column_config.TextColumn("Recharge", width="small")
-            }
-        )
-        
-        # Summary stats
-        col1, col2, col3 = st.columns(3)
-        
-        with col1:
-            ranking_count = len([x for x in matrix_df['Recharge Pos'] if x != 'Not Ranking'])
-            st.metric("Keywords with Recharge", f"{ranking_count}/{len(matrix_df)}")
-        
-        with col2:
-            top_3_count = len([x for x in matrix_df['Recharge Pos'] if x.startswith('#') and int(x[1:]) <= 3])
-            st.metric("In Top 3", top_3_count)
-        
-        with col3:
-            pos_1_count = len([x for x in matrix_df['Recharge Pos'] if x == '#1'])
-            st.metric("Position #1", pos_1_count)
-        
-        st.markdown('</div>', unsafe_allow_html=True)
+    show_llm_position_matrix(filtered_df, latest_df, latest_llm, llm_filters, all_keywords)
     
-    # Complete Position Rankings by Keyword
-    st.markdown('<div class="section-title">🎯 Complete Position Rankings by Keyword</div>', unsafe_allow_html=True)
+    show_llm_position_rankings(filtered_df, latest_df, all_keywords)
     
-    if not filtered_df.empty:
-        # Keyword selector for detailed SERP view
-        col1, col2, col3, col4 = st.columns([2, 1, 1, 1])
-        
-        with col1:
-            selected_keyword_detail = st.selectbox(
-                "Select keyword to see all positions:",
-                sorted(all_keywords),
-                key="llm_keyword_detail_selector"
-            )
-        
-        with col2:
-            max_positions = st.slider(
-                "Show top N positions:",
-                min_value=5,
-                max_value=30,
-                value=10,
-                step=5,
-                key="llm_max_positions"
-            )
-        
-        with col3:
-            show_latest_only = st.checkbox(
-                "Latest results only",
-                value=True,
-                key="llm_latest_only",
-                help="Show only the most recent results for this keyword"
-            )
-        
-        with col4:
-            show_full_urls = st.checkbox(
-                "Show full URLs",
-                value=True,
-                key="llm_show_full_urls",
-                help="Toggle between full URLs and domain names"
-            )
-        
-        if selected_keyword_detail:
-            st.markdown('<div class="chart-container">', unsafe_allow_html=True)
-            
-            # Filter data for selected keyword
-            keyword_detail_data = filtered_df[
-                filtered_df['Keyword'] == selected_keyword_detail
-            ].copy()
-            
-            if not keyword_detail_data.empty:
-                # Get latest or all timestamps
-                if show_latest_only and not keyword_detail_data['DateTime'].isna().all():
-                    latest_time = keyword_detail_data['DateTime'].max()
-                    keyword_detail_data = keyword_detail_data[
-                        keyword_detail_data['DateTime'] == latest_time
-                    ]
-                    display_time = latest_time.strftime('%B %d, %Y at %I:%M %p') if pd.notna(latest_time) else "Unknown"
-                else:
-                    display_time = "All available data"
-                
-                # Get country for this keyword
-                keyword_country = keyword_detail_data['Country'].iloc[0] if 'Country' in keyword_detail_data.columns else 'Unknown'
-                
-                # Create position summary
-                st.markdown(f"**📍 Keyword:** `{selected_keyword_detail}` | **🌍 Country:** {get_country_flag(keyword_country)} | **🕐 Data:** {display_time}")
-                
-                # Clean and sort position data
-                position_data = keyword_detail_data[
-                    keyword_detail_data['Position'] <= max_positions
-                ].copy()
-                
-                # Clean URLs using the utility function
-                position_data['Result_URL'] = position_data['Result_URL'].apply(clean_html_from_url)
-                
-                # Remove any rows with empty or invalid URLs after cleaning
-                position_data = position_data[
-                    (position_data['Result_URL'].notna()) & 
-                    (position_data['Result_URL'] != '') &
-                    (position_data['Result_URL'].str.startswith('http'))
-                ]
-                
-                # Remove duplicates - keep only first URL for each position
-                position_data = position_data.drop_duplicates(subset=['Position'], keep='first')
-                position_data = position_data.sort_values('Position')
-                
-                if not position_data.empty:
-                    # Create single column layout for better readability
-                    st.markdown("**Search Results:**")
-                    
-                    # Display positions in order - one URL per position
-                    for pos in sorted(position_data['Position'].unique()):
-                        entry = position_data[position_data['Position'] == pos].iloc[0]
-                        url = entry['Result_URL']
-                        
-                        # Determine if it's Recharge
-                        is_recharge = 'recharge.com' in url.lower()
-                        
-                        # Choose display format based on toggle
-                        if show_full_urls:
-                            display_url = url
-                        else:
-                            try:
-                                display_url = urlparse(url).netloc.replace('www.', '')
-                                if not display_url:
-                                    display_url = url
-                            except:
-                                display_url = url
-                        
-                        # Style based on whether it's Recharge
-                        if is_recharge:
-                            position_color = "#f59e0b"
-                            result_class = "recharge"
-                        else:
-                            position_color = "#64748b"
-                            result_class = ""
-                        
-                        st.markdown(f"""
-                        <div class="serp-result {result_class}" style="margin-bottom: 0.75rem;">
-                            <div class="position-number" style="background: {position_color};">
-                                {int(pos)}
-                            </div>
-                            <div class="result-content" style="flex: 1;">
-                                <div class="result-url" style="word-break: break-all; font-size: 0.85rem;">{display_url}</div>
-                            </div>
-                        </div>
-                        """, unsafe_allow_html=True)
-                    
-                    # Summary statistics
-                    st.markdown("---")
-                    col_stat1, col_stat2, col_stat3 = st.columns(3)
-                    
-                    with col_stat1:
-                        recharge_pos = position_data[
-                            position_data['Result_URL'].str.contains('recharge.com', case=False, na=False)
-                        ]['Position'].min()
-                        
-                        if pd.notna(recharge_pos):
-                            st.metric("Recharge Position", f"#{int(recharge_pos)}")
-                        else:
-                            st.metric("Recharge Position", "Not Ranking")
-                    
-                    with col_stat2:
-                        total_results = len(position_data['Position'].unique())
-                        st.metric("Positions Shown", f"{total_results}/{max_positions}")
-                    
-                    with col_stat3:
-                        unique_domains = position_data['Result_URL'].apply(
-                            lambda x: urlparse(x).netloc.replace('www.', '') if x else ''
-                        ).nunique()
-                        st.metric("Unique Domains", unique_domains)
-                
-                else:
-                    st.info(f"No results found in top {max_positions} positions")
-            else:
-                st.warning(f"No data available for keyword: {selected_keyword_detail}")
-            
-            st.markdown('</div>', unsafe_allow_html=True)
+    show_llm_serp_comparison(filtered_df, all_keywords)
     
-    # LLM SERP Comparison
-    st.markdown('<div class="section-title">⚖️ LLM SERP Comparison</div>', unsafe_allow_html=True)
+    instrumentation.section('llm.history')
     
-    if not filtered_df.empty and not filtered_df['DateTime'].isna().all():
-        # Keyword selector for comparison
-        comparison_keyword = st.selectbox(
-            "Select keyword for comparison:",
-            sorted(all_keywords),
-            key="llm_comparison_keyword"
-        )
+    # Historical Performance Summary
+    if not filtered_df['DateTime'].isna().all() and not recharge_df.empty:
+        st.markdown('<div class="section-title">📊 Historical Performance Summary</div>', unsafe_allow_html=True)
         
-        if comparison_keyword:
-            # Get data for selected keyword
-            comparison_data = filtered_df[filtered_df['Keyword'] == comparison_keyword].copy()
-            
-            # Clean URLs using the utility function
-            comparison_data['Result_URL'] = comparison_data['Result_URL'].apply(clean_html_from_url)
-            
-            # Remove invalid URLs
-            comparison_data = comparison_data[
-                (comparison_data['Result_URL'].notna()) & 
-                (comparison_data['Result_URL'] != '') &
-                (comparison_data['Result_URL'].str.startswith('http'))
-            ]
-            
-            # Get available timestamps
-            available_times = sorted(comparison_data['DateTime'].dropna().unique())
-            
-            if len(available_times) >= 2:
+        with lazy_section("Daily trends", "llm_history_section") as history_open:
+            if history_open:
                 col1, col2 = st.columns(2)
                 
                 with col1:
-                    time1 = st.selectbox(
-                        "📅 Select first date/time:",
-                        available_times,
-                        format_func=lambda x: x.strftime('%B %d, %Y at %I:%M %p'),
-                        key="llm_time1"
-                    )
-                
-                with col2:
-                    time2 = st.selectbox(
-                        "📅 Select second date/time:",
-                        available_times,
-                        format_func=lambda x: x.strftime('%B %d, %Y at %I:%M %p'),
-                        index=len(available_times)-1,
-                        key="llm_time2"
-                    )
-                
-                if time1 != time2:
-                    # Get data for both times
-                    data1 = comparison_data[comparison_data['DateTime'] == time1].copy()
-                    data2 = comparison_data[comparison_data['DateTime'] == time2].copy()
-                    
-                    # Remove duplicates - keep only first URL for each position
-                    data1 = data1.drop_duplicates(subset=['Position'], keep='first')
-                    data2 = data2.drop_duplicates(subset=['Position'], keep='first')
-                    
-                    # Track movements
-                    col1, col2, col3, col4 = st.columns(4)
-                    
-                    # Calculate changes
-                    urls1 = set(data1['Result_URL'].unique())
-                    urls2 = set(data2['Result_URL'].unique())
-                    
-                    improved = 0
-                    declined = 0
-                    new_entries = len(urls2 - urls1)
-                    lost_entries = len(urls1 - urls2)
+                    st.markdown('<div class="chart-container">', unsafe_allow_html=True)
                     
-                    # Calculate position changes for common URLs
-                    for url in urls1.intersection(urls2):
-                        pos1 = data1[data1['Result_URL'] == url]['Position'].min()
-                        pos2 = data2[data2['Result_URL'] == url]['Position'].min()
-                        if pos2 < pos1:
-                            improved += 1
-                        elif pos2 > pos1:
-                            declined += 1
+                    # Position trend over time (aggregated)
+                    daily_avg = recharge_df.set_index('DateTime').resample('D')['Position'].mean().dropna()
+                    daily_avg = downsample_trend(daily_avg.rename_axis('Date').reset_index(), 'Date', 'Position',
+                                                 chart_point_budget(0.5))
                     
-                    with col1:
-                        st.markdown(f"""
-                        <div class="metric-card" style="border-left: 4px solid #22c55e;">
-                            <div class="metric-number" style="color: #22c55e;">{improved}</div>
-                            <div class="metric-label">📈 Improved</div>
-                        </div>
-                        """, unsafe_allow_html=True)
-                    
-                    with col2:
-                        st.markdown(f"""
-                        <div class="metric-card" style="border-left: 4px solid #ef4444;">
-                            <div class="metric-number" style="color: #ef4444;">{declined}</div>
-                            <div class="metric-label">📉 Declined</div>
-                        </div>
-                        """, unsafe_allow_html=True)
-                    
-                    with col3:
-                        st.markdown(f"""
-                        <div class="metric-card" style="border-left: 4px solid #3b82f6;">
-                            <div class="metric-number" style="color: #3b82f6;">{new_entries}</div>
-                            <div class="metric-label">🆕 New</div>
-                        </div>
-                        """, unsafe_allow_html=True)
+                    if not daily_avg.empty:
+                        fig_daily = daily_position_figure(daily_avg)
+                        st.plotly_chart(fig_daily, use_container_width=True)
+                    else:
+                        st.info("Not enough historical data")
                     
-                    with col4:
-                        st.markdown(f"""
-                        <div class="metric-card" style="border-left: 4px solid #f59e0b;">
-                            <div class="metric-number" style="color: #f59e0b;">{lost_entries}</div>
-                            <div class="metric-label">❌ Lost</div>
-                        </div>
-                        """, unsafe_allow_html=True)
+                    st.markdown('</div>', unsafe_allow_html=True)
+                
+                with col2:
+                    st.markdown('<div class="chart-container">', unsafe_allow_html=True)
                     
-                    # Side-by-side comparison
-                    st.markdown("---")
-                    col_left, col_right = st.columns(2)
+                    # Visibility trend over time
+                    # Share of Recharge results per day (0 on days without results)
+                    is_recharge = filtered_df['Result_URL'].str.contains('recharge.com', case=False, na=False)
+                    daily_visibility = (
+                        is_recharge.astype(float).set_axis(filtered_df['DateTime']).resample('D').mean() * 100
+                    ).fillna(0)
+                    daily_visibility = downsample_trend(daily_visibility.rename_axis('Date').reset_index(name='Visibility'),
+                                                        'Date', 'Visibility', chart_point_budget(0.5))
                     
-                    with col_left:
-                        st.markdown(f"""
-                        <div class="serp-column">
-                            <div class="serp-header">📅 {time1.strftime('%B %d, %Y at %I:%M %p')}</div>
-                        </div>
-                        """, unsafe_allow_html=True)
-                        
-                        # Show top 10 results from time1 - one per position
-                        for pos in sorted(data1['Position'].unique())[:10]:
-                            entry = data1[data1['Position'] == pos].iloc[0]
-                            url = entry['Result_URL']
-                            is_recharge = 'recharge.com' in url.lower()
-                            
-                            position_color = "#f59e0b" if is_recharge else "#64748b"
-                            
-                            st.markdown(f"""
-                            <div class="serp-result {'recharge' if is_recharge else ''}">
-                                <div class="position-number" style="background: {position_color};">
-                                    {int(pos)}
-                                </div>
-                                <div class="result-content">
-                                    <div class="result-url" style="font-size: 0.75rem; word-break: break-all;">{url}</div>
-                                </div>
-                            </div>
-                            """, unsafe_allow_html=True)
+                    if not daily_visibility.empty:
+                        fig_visibility = daily_visibility_figure(daily_visibility)
+                        st.plotly_chart(fig_visibility, use_container_width=True)
+                    else:
+                        st.info("Not enough historical data")
                     
-                    with col_right:
-                        st.markdown(f"""
-                        <div class="serp-column">
-                            <div class="serp-header">📅 {time2.strftime('%B %d, %Y at %I:%M %p')}</div>
-                        </div>
-                        """, unsafe_allow_html=True)
-                        
-                        # Show top 10 results from time2 - one per position
-                        for pos in sorted(data2['Position'].unique())[:10]:
-                            entry = data2[data2['Position'] == pos].iloc[0]
-                            url = entry['Result_URL']
-                            is_recharge = 'recharge.com' in url.lower()
-                            
-                            # Check if this URL moved
-                            change_indicator = ""
-                            change_color = "#64748b"
-                            if url in urls1:
-                                old_pos = data1[data1['Result_URL'] == url]['Position'].min()
-                                if old_pos > pos:
-                                    change_indicator = f" ↑{int(old_pos - pos)}"
-                                    change_color = "#22c55e"
-                                elif old_pos < pos:
-                                    change_indicator = f" ↓{int(pos - old_pos)}"
-                                    change_color = "#ef4444"
-                            else:
-                                change_indicator = " (NEW)"
-                                change_color = "#3b82f6"
-                            
-                            position_color = "#f59e0b" if is_recharge else change_color
-                            
-                            st.markdown(f"""
-                            <div class="serp-result {'recharge' if is_recharge else ''}">
-                                <div class="position-number" style="background: {position_color};">
-                                    {int(pos)}
-                                </div>
-                                <div class="result-content">
-                                    <div class="result-url" style="font-size: 0.75rem; word-break: break-all; color: {change_color if not is_recharge else '#f59e0b'};">
-                                        {url}{change_indicator}
-                                    </div>
-                                </div>
-                            </div>
-                            """, unsafe_allow_html=True)
-                else:
-                    st.warning("Please select two different times for comparison")
-            else:
-                st.info(f"Need at least 2 data points for comparison. Currently have {len(available_times)}")
-    else:
-        st.info("No temporal data available for comparison")
+                    st.markdown('</div>', unsafe_allow_html=True)
+
+def format_age(seconds):
+    """Short human-readable age, e.g. 45s, 12 min, 3.5 h"""
+    if seconds < 60:
+        return f"{seconds:.0f}s"
+    if seconds < 3600:
+        return f"{seconds / 60:.0f} min"
+    return f"{seconds / 3600:.1f} h"
+
+def show_tab_freshness(scheduler, sheet_id):
+    """Sidebar summary of keyword tab refreshes, listing stale tabs with their age"""
+    report = scheduler.reports.get(sheet_id)
+    plan = scheduler.plans.get(sheet_id)
+    if report is None or plan is None:
+        return
     
-    # Historical Performance Summary
-    if not filtered_df['DateTime'].isna().all() and not recharge_df.empty:
-        st.markdown('<div class="section-title">📊 Historical Performance Summary</div>', unsafe_allow_html=True)
-        
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            st.markdown('<div class="chart-container">', unsafe_allow_html=True)
-            
-            # Position trend over time (aggregated)
-            daily_avg = recharge_df.set_index('DateTime').resample('D')['Position'].mean().dropna()
-            
-            if not daily_avg.empty:
-                fig_daily = px.line(
-                    x=daily_avg.index,
-                    y=daily_avg.values,
-                    title="Average Daily Position Trend",
-                    labels={'x': 'Date', 'y': 'Average Position'}
-                )
-                
-                fig_daily.update_traces(
-                    line=dict(width=3, color='#22c55e'),
-                    mode='lines+markers',
-                    marker=dict(size=8)
-                )
-                
-                fig_daily.update_layout(
-                    height=300,
-                    yaxis=dict(autorange="reversed", title="Average Position"),
-                    xaxis_title="Date",
-                    paper_bgcolor='rgba(0,0,0,0)',
-                    plot_bgcolor='rgba(0,0,0,0)',
-                    font_color='#f8fafc',
-                    showlegend=False
-                )
-                
-                st.plotly_chart(fig_daily, use_container_width=True)
-            else:
-                st.info("Not enough historical data")
-            
-            st.markdown('</div>', unsafe_allow_html=True)
-        
-        with col2:
-            st.markdown('<div class="chart-container">', unsafe_allow_html=True)
-            
-            # Visibility trend over time
-            daily_visibility = filtered_df.set_index('DateTime').resample('D').apply(
-                lambda x: (x['Result_URL'].str.contains('recharge.com', case=False, na=False).sum() / len(x) * 100) if len(x) > 0 else 0
-            ).dropna()
-            
-            if not daily_visibility.empty:
-                fig_visibility = px.area(
-                    x=daily_visibility.index,
-                    y=daily_visibility.values,
-                    title="Daily Visibility Rate (%)",
-                    labels={'x': 'Date', 'y': 'Visibility (%)'}
-                )
-                
-                fig_visibility.update_traces(
-                    fill='tozeroy',
-                    line=dict(width=2, color='#3b82f6'),
-                    fillcolor='rgba(59, 130, 246, 0.3)'
-                )
-                
-                fig_visibility.update_layout(
-                    height=300,
-                    yaxis=dict(title="Visibility (%)", range=[0, 100]),
-                    xaxis_title="Date",
-                    paper_bgcolor='rgba(0,0,0,0)',
-                    plot_bgcolor='rgba(0,0,0,0)',
-                    font_color='#f8fafc',
-                    showlegend=False
-                )
-                
-                st.plotly_chart(fig_visibility, use_container_width=True)
-            else:
-                st.info("Not enough historical data")
-            
-            st.markdown('</div>', unsafe_allow_html=True)
+    summary = report.summary()
+    st.sidebar.markdown(f"**Keyword Tabs:**")
+    st.sidebar.markdown(f"Refreshed: {summary['fetched']} · Up to date: {summary['cached']} · "
+                        f"Refreshing: {summary['revalidating']}")
+    
+    stale = [(plan['labels'].get(gid, f"GID {gid}"), age, reason)
+             for gid, age, reason in scheduler.stale_tabs(sheet_id, plan['gids'])]
+    stale += [(name, age, reason) for _, name, age, reason in scheduler.stale_results()]
+    if not stale:
+        return
+    
+    lines = []
+    for label, age, reason in stale:
+        shown = f"showing data from {format_age(age)} ago" if age is not None else "not loaded yet"
+        lines.append(f"- {label}: {reason}, {shown}")
+    st.sidebar.warning(f"⏳ {len(stale)} tabs are stale:\n" + "\n".join(lines))
 
-def main():
+def show_dashboard():
+    """Load the datasets and render the sidebar and the selected page"""
+    # Kick off background refreshes of due keyword tabs; new content bumps the tab version
+    scheduler = get_fetch_scheduler()
+    serp_sheet_id = get_setting('serp_sheet_id', SERP_SHEET_ID)
+    with instrumentation.span('revalidate'):
+        scheduler.revalidate(get_data_source(), serp_sheet_id)
+    
     # Load data
-    with st.spinner('Loading data...'):
-        df = load_data_from_google_sheets()
-        llm_df = load_llm_data()
+    with st.spinner('Loading data...'), instrumentation.span('load'):
+        df, latest_serp, llm_df, latest_llm = load_datasets(scheduler, serp_sheet_id)
     
     if df.empty and llm_df.empty:
         st.markdown("""
@@ -2245,8 +3179,23 @@ def main():
         ["🏠 Executive Dashboard", "🎯 Keyword Analysis", "⚖️ SERP Comparison", "🤖 LLM Position Tracking"],
         key="main_nav"
     )
+    instrumentation.annotate(page=page)
+    
+    show_data_summary(df, llm_df, scheduler, serp_sheet_id)
     
-    # Show data summary in sidebar
+    # Route to appropriate page
+    if page == "🏠 Executive Dashboard":
+        show_executive_dashboard(latest_serp)
+    elif page == "🎯 Keyword Analysis":
+        show_keyword_analysis(df)
+    elif page == "⚖️ SERP Comparison":
+        show_serp_comparison(df)
+    elif page == "🤖 LLM Position Tracking":
+        show_llm_position_tracking(llm_df, latest_llm)
+
+@instrumentation.timed('sidebar')
+def show_data_summary(df, llm_df, scheduler, serp_sheet_id):
+    """Dataset sizes, snapshot, result cache, fetch and tab freshness stats in the sidebar"""
     st.sidebar.markdown("---")
     st.sidebar.markdown("**📈 Data Summary**")
     
@@ -2261,15 +3210,109 @@ def main():
         st.sidebar.markdown(f"Total Results: {len(llm_df)}")
         st.sidebar.markdown(f"Keywords: {llm_df['Keyword'].nunique()}")
     
-    # Route to appropriate page
-    if page == "🏠 Executive Dashboard":
-        show_executive_dashboard(df)
-    elif page == "🎯 Keyword Analysis":
-        show_keyword_analysis(df)
-    elif page == "⚖️ SERP Comparison":
-        show_serp_comparison(df)
-    elif page == "🤖 LLM Position Tracking":
-        show_llm_position_tracking(llm_df)
+    snapshot_dir = get_setting('snapshot_dir', '')
+    if snapshot_dir:
+        snapshot_store = get_snapshot_store(snapshot_dir)
+        snapshot_version = snapshot_store.current()
+        if snapshot_version:
+            st.sidebar.caption(f"Shared snapshot from {format_age(snapshot_store.age(snapshot_version))} ago")
+    
+    results = shared_result_cache()
+    if results is not None:
+        cache_stats = results.stats()
+        if cache_stats['hit_rate'] is not None:
+            lookups = cache_stats['hits'] + cache_stats['misses']
+            st.sidebar.caption(f"Result cache: {cache_stats['hit_rate']:.0%} hits ({cache_stats['hits']}/{lookups}), "
+                               f"{cache_stats['bytes'] / 1024 / 1024:.1f} MB")
+    
+    transport = getattr(get_data_source(), 'transport', None)
+    if transport is not None:
+        fetch_stats = transport.stats()
+        if fetch_stats['requests']:
+            st.sidebar.markdown(f"**Sheet Fetches:**")
+            st.sidebar.markdown(f"Requests: {fetch_stats['requests']} ({fetch_stats['errors']} failed)")
+            st.sidebar.markdown(f"Avg Time: {fetch_stats['seconds'] / fetch_stats['requests'] * 1000:.0f} ms")
+            st.sidebar.markdown(f"Downloaded: {fetch_stats['bytes'] / 1024 / 1024:.1f} MB")
+    
+    show_tab_freshness(scheduler, serp_sheet_id)
+
+def show_performance_panel(trace):
+    """Sidebar table of the spans of the rerun that just ended"""
+    st.sidebar.markdown("---")
+    st.sidebar.markdown(f"**⏱️ Performance:** {trace.seconds * 1000:.0f} ms")
+    
+    spans = pd.DataFrame({
+        'Span': ['\u2003' * span.depth + span.name for span in trace.spans],
+        'ms': [round(span.seconds * 1000, 1) for span in trace.spans],
+        'Rows': pd.array([span.rows for span in trace.spans], dtype='Int64'),
+        'Cache': [span.cache or '' for span in trace.spans],
+    })
+    st.sidebar.dataframe(spans, hide_index=True, use_container_width=True)
+
+def query_param(name):
+    """Value of a URL query parameter, with or without st.query_params (Streamlit < 1.30)"""
+    params = getattr(st, 'query_params', None)
+    if params is not None:
+        return params.get(name)
+    values = st.experimental_get_query_params().get(name)
+    return values[0] if values else None
+
+def profiling_requested():
+    """Profile this rerun: the profile setting, or ?profile=<profile_token> in the URL"""
+    if setting_enabled('profile', 'false'):
+        return True
+    
+    token = str(get_setting('profile_token', ''))
+    requested = query_param('profile')
+    return bool(token) and requested is not None and hmac.compare_digest(str(requested), token)
+
+@st.cache_resource
+def get_profile_store(directory, keep):
+    """Directory of the saved rerun profiles"""
+    return profiling.ProfileStore(directory, keep)
+
+def show_profile_download(path, profile):
+    """Sidebar download of the newest saved profile"""
+    st.sidebar.markdown("---")
+    if profile.seconds is not None:
+        st.sidebar.markdown(f"**🔬 Profiled:** {profile.seconds * 1000:.0f} ms ({profile.kind})")
+    else:
+        st.sidebar.markdown("**🔬 Profiler busy**, showing the previous profile")
+    
+    with open(path, 'rb') as f:
+        st.sidebar.download_button(
+            label="📥 Download latest profile",
+            data=f.read(),
+            file_name=os.path.basename(path),
+            mime="application/json" if path.endswith('.json') else "application/octet-stream",
+            key="profile_download"
+        )
+
+def main():
+    """One rerun of the dashboard, timed section by section and profiled on request"""
+    if setting_enabled('perf_log', 'true'):
+        instrumentation.enable_logging()
+    get_process_metrics()
+    
+    if profiling_requested():
+        profiler = profiling.profiled(get_setting('profiler', 'cprofile'))
+    else:
+        profiler = contextlib.nullcontext()
+    
+    with profiler as profile, instrumentation.trace('rerun') as trace:
+        show_dashboard()
+    
+    if setting_enabled('perf_panel', 'false'):
+        show_performance_panel(trace)
+    
+    if profile is not None:
+        store = get_profile_store(get_setting('profile_dir', 'profiles'), int(get_setting('profile_keep', 20)))
+        if profile.data is not None:
+            path = store.save(profile, trace.fields.get('page', 'rerun'))
+        else:
+            path = store.latest()
+        if path:
+            show_profile_download(path, profile)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,33 @@
+import io
+
+import pandas as pd
+
+import data_sources
+
+def multiline_csv(rows=40000):
+    """A CSV of several Arrow blocks (1 MB each) with quoted multi-line cells throughout"""
+    lines = ['Keyword,Position,AI Overview']
+    for index in range(rows):
+        overview = f'"First line of overview {index}\nsecond line, with a comma\n\nfourth line"'
+        lines.append(f"mobile top up {index},{index % 10 + 1},{overview}")
+    return '\n'.join(lines) + '\n'
+
+def test_read_csv_text_multiline_cells_past_block_size():
+    text = multiline_csv()
+    assert len(text.encode('utf-8')) > 3 * (1 << 20)
+
+    df = data_sources.read_csv_text(io.BytesIO(text.encode('utf-8')))
+    expected = pd.read_csv(io.StringIO(text), dtype=str)
+
+    assert list(df.columns) == list(expected.columns)
+    assert len(df) == len(expected)
+    assert df['AI Overview'].tolist() == expected['AI Overview'].tolist()
+    assert df['AI Overview'].iloc[-1] == 'First line of overview 39999\nsecond line, with a comma\n\nfourth line'
+
+def test_read_csv_text_multiline_cells_with_names():
+    text = multiline_csv().split('\n', 1)[1]
+
+    df = data_sources.read_csv_text(io.BytesIO(text.encode('utf-8')), names=['Keyword', 'Position', 'AI Overview'])
+
+    assert len(df) == 40000
+    assert df['Keyword'].iloc[-1] == 'mobile top up 39999'
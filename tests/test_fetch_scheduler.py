@@ -0,0 +1,94 @@
+import time
+
+import pandas as pd
+
+import fetch_scheduler
+from fetch_scheduler import TokenBucket
+
+def test_acquire_spends_the_burst_then_fails_without_waiting():
+    bucket = TokenBucket(rate=1, capacity=3)
+
+    assert [bucket.acquire() for _ in range(3)] == [True, True, True]
+    assert not bucket.acquire()
+
+def test_acquire_waits_for_a_refill():
+    bucket = TokenBucket(rate=20, capacity=1)
+    assert bucket.acquire()
+
+    started = time.monotonic()
+    assert bucket.acquire(wait=1.0)
+    assert 0.02 < time.monotonic() - started < 0.5
+
+def test_acquire_times_out_when_the_next_token_comes_too_late():
+    bucket = TokenBucket(rate=0.5, capacity=1)
+    assert bucket.acquire()
+
+    started = time.monotonic()
+    assert not bucket.acquire(wait=0.1)
+    # Gives up at once instead of sleeping until the deadline
+    assert time.monotonic() - started < 0.05
+
+def test_rate_zero_is_unlimited():
+    bucket = TokenBucket(rate=0, capacity=1)
+
+    assert all(bucket.acquire() for _ in range(100))
+
+def test_throttle_blocks_until_retry_after():
+    bucket = TokenBucket(rate=1000, capacity=10)
+    bucket.throttle(0.1)
+
+    assert not bucket.acquire()
+    started = time.monotonic()
+    assert bucket.acquire(wait=1.0)
+    assert time.monotonic() - started >= 0.08
+
+def test_acquire_survives_a_ready_time_already_in_the_past(monkeypatch):
+    bucket = TokenBucket(rate=10, capacity=1)
+    assert bucket.acquire()
+
+    # Time passes between computing ready_at under the lock and sleeping
+    clock = iter([0.0, 0.0, 1.0, 1.0, 1.0, 1.0])
+    real_sleep = time.sleep
+    monkeypatch.setattr(fetch_scheduler.time, 'monotonic', lambda: next(clock))
+    bucket.updated = 0.0
+    bucket.tokens = 0.0
+
+    sleeps = []
+    monkeypatch.setattr(fetch_scheduler.time, 'sleep', lambda seconds: (sleeps.append(seconds), real_sleep(0)))
+    assert bucket.acquire(wait=5.0)
+    assert sleeps == [0.0]
+
+class StubSource:
+    """Source without a rate limit whose tabs all come back valid"""
+
+    credential_key = None
+    tabs_per_request = None
+
+    def read_tabs(self, sheet_id, gids):
+        return {gid: pd.DataFrame({'Date/Time': [str(gid)], 'Recharge Position': ['1']}) for gid in gids}
+
+def test_cold_start_spreads_refreshes_over_one_interval_with_prefetched_tabs():
+    scheduler = fetch_scheduler.FetchScheduler(refresh_interval=100)
+    prefetched = {gid: pd.DataFrame({'Date/Time': ['x'], 'Recharge Position': ['1']}) for gid in range(10)}
+
+    started = time.monotonic()
+    tabs, report = scheduler.refresh_tabs(StubSource(), 'sheet', list(range(14)), prefetched=prefetched)
+
+    assert sorted(tabs) == list(range(14))
+    assert len(report.fetched) == 14
+    fetched_due = [scheduler.cached_tabs('sheet')[gid].next_due - started for gid in range(10, 14)]
+    # The 4 fetched tabs are due after 1/4, 2/4, 3/4 and 4/4 of the interval
+    assert [round(due / 25) for due in fetched_due] == [1, 2, 3, 4]
+
+def test_invalid_prefetched_tab_keeps_its_last_good_version():
+    scheduler = fetch_scheduler.FetchScheduler()
+    validate = lambda gid, df: None if 'Date/Time' in df else 'missing Date/Time column'
+    good = pd.DataFrame({'Date/Time': ['1'], 'Recharge Position': ['2']})
+    scheduler.refresh_tabs(StubSource(), 'sheet', [1], validate=validate, prefetched={1: good})
+
+    tabs, report = scheduler.refresh_tabs(StubSource(), 'sheet', [1], validate=validate,
+                                          prefetched={1: pd.DataFrame({'Other': ['x']})})
+
+    assert tabs[1] is good
+    assert report.failed == {1: 'missing Date/Time column'}
+    assert scheduler.stale_tabs('sheet', [1])[0][2] == 'invalid: missing Date/Time column'
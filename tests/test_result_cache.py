@@ -0,0 +1,54 @@
+import itertools
+
+import result_cache
+
+def fake_clock(monkeypatch):
+    """Make every last_used timestamp distinct, so the LRU order is exact"""
+    ticks = itertools.count(1)
+    monkeypatch.setattr(result_cache.time, 'time', lambda: float(next(ticks)))
+
+def test_hit_returns_the_stored_result(tmp_path):
+    cache = result_cache.ResultCache(str(tmp_path / 'results.sqlite'))
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return {'rows': 3}
+
+    assert cache.get_or_compute('v1', 'summary', ('ES',), compute) == {'rows': 3}
+    assert cache.get_or_compute('v1', 'summary', ('ES',), compute) == {'rows': 3}
+    assert len(calls) == 1
+
+    cache.get_or_compute('v1', 'summary', ('FR',), compute)
+    cache.get_or_compute('v2', 'summary', ('ES',), compute)
+    assert len(calls) == 3
+
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['entries']) == (1, 3, 3)
+    assert stats['hit_rate'] == 0.25
+
+def test_evicts_the_least_recently_used_entries(tmp_path, monkeypatch):
+    fake_clock(monkeypatch)
+    value = b'x' * 1000
+    cache = result_cache.ResultCache(str(tmp_path / 'results.sqlite'), max_bytes=2500)
+
+    cache.get_or_compute('v1', 'a', (), lambda: value)
+    cache.get_or_compute('v1', 'b', (), lambda: value)
+    cache.get_or_compute('v1', 'a', (), lambda: value)  # a is now more recent than b
+    cache.get_or_compute('v1', 'c', (), lambda: value)
+
+    stats = cache.stats()
+    assert stats['evictions'] == 1
+    assert stats['entries'] == 2
+    assert stats['bytes'] <= 2500
+
+    calls = []
+    cache.get_or_compute('v1', 'a', (), lambda: calls.append('a'))
+    cache.get_or_compute('v1', 'b', (), lambda: calls.append('b'))
+    assert calls == ['b']
+
+def test_results_larger_than_the_cache_are_not_stored(tmp_path):
+    cache = result_cache.ResultCache(str(tmp_path / 'results.sqlite'), max_bytes=100)
+
+    assert cache.get_or_compute('v1', 'big', (), lambda: b'x' * 1000) == b'x' * 1000
+    assert cache.stats()['entries'] == 0
@@ -0,0 +1,51 @@
+import os
+
+import pandas as pd
+
+import snapshots
+
+def frames(positions):
+    return {
+        'serp': pd.DataFrame({'Keyword': [f'kw {index}' for index in range(len(positions))], 'Position': positions}),
+        'llm': pd.DataFrame({'Keyword': ['a'], 'Country': ['ES']}),
+    }
+
+def version_dirs(directory):
+    return sorted(entry for entry in os.listdir(directory) if entry.startswith('v'))
+
+def test_publish_and_open(tmp_path):
+    store = snapshots.SnapshotStore(str(tmp_path))
+    assert store.current() is None
+
+    version = store.publish(frames([1, 2, 3]))
+
+    assert store.current() == version
+    assert snapshots.version_hash(version) == snapshots.content_hash(frames([1, 2, 3]))
+    opened = store.open(version)
+    assert sorted(opened) == ['llm', 'serp']
+    assert opened['serp']['Position'].tolist() == [1, 2, 3]
+    assert opened['serp']['Keyword'].tolist() == ['kw 0', 'kw 1', 'kw 2']
+    assert opened['serp'].attrs['snapshot_version'] == version
+
+def test_publish_same_content_renews_the_current_version(tmp_path):
+    store = snapshots.SnapshotStore(str(tmp_path))
+    version = store.publish(frames([1, 2, 3]))
+    os.utime(tmp_path / version, (0, 0))
+    assert store.age(version) > 3600
+
+    assert store.publish(frames([1, 2, 3])) == version
+    assert store.age(version) < 60
+    assert version_dirs(tmp_path) == [version]
+
+    changed = store.publish(frames([1, 2, 4]))
+    assert changed != version
+    assert store.current() == changed
+
+def test_prune_keeps_the_newest_versions(tmp_path):
+    store = snapshots.SnapshotStore(str(tmp_path), keep=2)
+    (tmp_path / 'v1-unfinished.tmp-123').mkdir()  # another process is still writing it
+
+    versions = [store.publish(frames([index])) for index in range(4)]
+
+    assert version_dirs(tmp_path) == sorted(versions[-2:] + ['v1-unfinished.tmp-123'])
+    assert store.current() == versions[-1]
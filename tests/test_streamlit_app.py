@@ -0,0 +1,176 @@
+import numpy as np
+import pandas as pd
+
+import streamlit_app as app
+
+def crawls(rows):
+    """Keyword tab rows of (keyword, market, timestamp, position)"""
+    df = pd.DataFrame(rows, columns=['Keyword', 'Market', 'DateTime', 'Recharge Position'])
+    df['DateTime'] = pd.to_datetime(df['DateTime'])
+    return df
+
+def test_assign_crawl_runs_groups_timestamps_within_the_gap():
+    df = crawls([
+        ('a', 'ES', '2025-01-01 08:00', 1),
+        ('b', 'ES', '2025-01-01 08:20', 2),
+        ('a', 'ES', '2025-01-01 08:45', 3),  # 25 min after the previous crawl: same run
+        ('a', 'ES', '2025-01-02 08:00', 4),
+        ('b', 'ES', None, 5),
+    ])
+
+    df = app.assign_crawl_runs(df, gap_minutes=30)
+
+    assert df['Run_ID'].tolist()[:4] == [0, 0, 0, 1]
+    assert pd.isna(df['Run_ID'].iloc[4])
+    assert df['Run_Start'].iloc[2] == pd.Timestamp('2025-01-01 08:00')
+    assert df['Run_Start'].iloc[3] == pd.Timestamp('2025-01-02 08:00')
+
+def test_assign_crawl_runs_without_timestamps():
+    df = app.assign_crawl_runs(crawls([('a', 'ES', None, 1)]), gap_minutes=30)
+
+    assert df['Run_ID'].isna().all()
+    assert df['Run_Start'].isna().all()
+
+def test_keyword_run_rows_keeps_one_market():
+    # Each run crawls the keyword in both markets; France is crawled last
+    df = app.assign_crawl_runs(crawls([
+        ('a', 'ES', '2025-01-01 08:00', 1),
+        ('a', 'FR', '2025-01-01 08:10', 7),
+        ('b', 'ES', '2025-01-01 08:15', 9),
+        ('a', 'ES', '2025-01-02 08:00', 2),
+        ('a', 'FR', '2025-01-02 08:10', 8),
+    ]), gap_minutes=30)
+
+    rows = app.keyword_run_rows(df, 'a', 'ES')
+
+    assert rows.index.tolist() == [0, 1]
+    assert rows['Market'].tolist() == ['ES', 'ES']
+    assert rows['Recharge Position'].tolist() == [1, 2]
+    assert app.keyword_run_rows(df, 'a', 'FR')['Recharge Position'].tolist() == [7, 8]
+
+def test_keyword_run_rows_skips_runs_without_the_market():
+    df = app.assign_crawl_runs(crawls([
+        ('a', 'ES', '2025-01-01 08:00', 1),
+        ('a', 'FR', '2025-01-02 08:00', 7),
+        ('a', 'ES', '2025-01-03 08:00', 2),
+    ]), gap_minutes=30)
+
+    assert app.keyword_run_rows(df, 'a', 'ES').index.tolist() == [0, 2]
+
+def test_select_latest_rows_per_key():
+    df = app.assign_crawl_runs(crawls([
+        ('a', 'ES', '2025-01-01 08:00', 5),
+        ('a', 'ES', '2025-01-02 08:00', 3),
+        ('a', 'ES', '2025-01-02 08:10', 2),
+        ('a', 'FR', '2025-01-01 08:05', 9),
+    ]), gap_minutes=30)
+
+    latest = app.select_latest_rows(df, app.SERP_STATE_KEYS).sort_values('Market')
+    assert latest['Recharge Position'].tolist() == [2, 9]
+
+    whole_run = app.select_latest_rows(df, app.SERP_STATE_KEYS, whole_run=True).sort_values('DateTime')
+    assert whole_run['Recharge Position'].tolist() == [9, 3, 2]
+
+def test_cached_view_is_keyed_on_the_data_version():
+    df = crawls([('a', 'ES', '2025-01-01 08:00', 1)])
+    calls = []
+    def compute():
+        calls.append(1)
+        return len(calls)
+
+    app.stamp_data_version(df)
+    assert app.cached_view('test_view', df, ('ES',), compute) == 1
+    df.loc[0, 'Recharge Position'] = 2  # same version: the frame is not hashed
+    assert app.cached_view('test_view', df, ('ES',), compute) == 1
+    assert app.cached_view('test_view', df, ('FR',), compute) == 2
+
+    app.stamp_data_version(df)
+    assert app.cached_view('test_view', df, ('ES',), compute) == 3
+
+def sheet(count):
+    """Raw append-only sheet rows; the Value column holds 1.0, 2.0, ... as a full read returns them"""
+    return pd.DataFrame({'Keyword': [f'kw {index}' for index in range(count)],
+                         'Value': [float(index + 1) for index in range(count)]})
+
+def count_rows(rows, carry):
+    """Parser that keeps the rows and counts them in its carry-forward state"""
+    return rows.copy(), {'rows': (carry or {}).get('rows', 0) + len(rows)}
+
+class SheetReads:
+    def __init__(self, rows):
+        self.rows = rows
+        self.full = 0
+        self.tails = []
+
+    def read_all(self):
+        self.full += 1
+        return self.rows.copy()
+
+    def read_tail(self, start, columns):
+        self.tails.append(start)
+        # A range read returns the cells as displayed text
+        rows = self.rows.iloc[start:][columns].reset_index(drop=True)
+        rows['Value'] = rows['Value'].map('{:g}'.format)
+        return rows
+
+def test_incremental_sheet_log_parses_only_appended_rows():
+    reads = SheetReads(sheet(3))
+    log = app.IncrementalSheetLog(count_rows)
+    assert len(log.refresh(reads.read_all, reads.read_tail)) == 3
+
+    reads.rows = sheet(5)
+    parsed = log.refresh(reads.read_all, reads.read_tail)
+
+    assert reads.full == 1
+    assert reads.tails == [2]  # one row of overlap
+    assert parsed['Keyword'].tolist() == ['kw 0', 'kw 1', 'kw 2', 'kw 3', 'kw 4']
+    assert log.carry == {'rows': 5}
+
+def test_incremental_sheet_log_reparses_a_rewritten_sheet():
+    reads = SheetReads(sheet(3))
+    log = app.IncrementalSheetLog(count_rows)
+    log.refresh(reads.read_all, reads.read_tail)
+
+    reads.rows = sheet(4)
+    reads.rows.loc[2, 'Keyword'] = 'edited'
+    parsed = log.refresh(reads.read_all, reads.read_tail)
+
+    assert reads.tails == [2]
+    assert reads.full == 2
+    assert parsed['Keyword'].tolist() == ['kw 0', 'kw 1', 'edited', 'kw 3']
+    assert log.carry == {'rows': 4}
+
+def test_incremental_sheet_log_falls_back_to_a_full_read():
+    reads = SheetReads(sheet(3))
+    log = app.IncrementalSheetLog(count_rows)
+    log.refresh(reads.read_all, reads.read_tail)
+
+    def failing_tail(start, columns):
+        raise OSError('range read failed')
+
+    reads.rows = sheet(4)
+    assert len(log.refresh(reads.read_all, failing_tail)) == 4
+    assert reads.full == 2
+
+    # Past full_refresh_seconds the whole sheet is read again
+    log.full_refresh_seconds = 0
+    log.refresh(reads.read_all, reads.read_tail)
+    assert reads.full == 3
+    assert reads.tails == []
+
+def test_lttb_indices_keeps_the_ends_and_the_peaks():
+    x = np.arange(100, dtype=float)
+    y = np.zeros(100)
+    y[37], y[71] = 10.0, -10.0
+
+    kept = app.lttb_indices(x, y, 10)
+
+    assert len(kept) == 10
+    assert kept[0] == 0 and kept[-1] == 99
+    assert (np.diff(kept) > 0).all()
+    assert 37 in kept and 71 in kept
+
+def test_lttb_indices_keeps_short_lines_whole():
+    x = np.arange(5, dtype=float)
+    assert app.lttb_indices(x, x, 10).tolist() == [0, 1, 2, 3, 4]
+    assert app.lttb_indices(x, x, 2).tolist() == [0, 1, 2, 3, 4]